@@ -0,0 +1,149 @@
+"""
+Aggregation pipelines behind the admin patient/doctor lists
+
+Each list is one aggregate() call: $match on the profile collection,
+$sort/$limit on _id, a $lookup into the user collection by uid for the
+email, and a $project down to the listed fields. The server never touches
+more documents than the page it returns (email filtering is the exception,
+since it can only be applied after the $lookup).
+"""
+import json
+import re
+from flask import request
+from models import User, Patient, Doctor
+from pagination import encode_cursor
+
+STREAM_BATCH_SIZE = 500
+
+PATIENT_PROJECTION = {
+    '_id': 1,
+    'patientId': 1,
+    'name': 1,
+    'phone': {'$ifNull': ['$personalInfo.phone', '']},
+    'email': {'$ifNull': [{'$arrayElemAt': ['$user.email', 0]}, '']},
+    'createdAt': 1,
+}
+
+DOCTOR_PROJECTION = {
+    '_id': 1,
+    'doctorId': 1,
+    'name': 1,
+    'email': {'$ifNull': [{'$arrayElemAt': ['$user.email', 0]}, '']},
+    'specialization': {'$ifNull': ['$specialization', None]},
+    'status': {'$ifNull': ['$account.status', 'pending']},
+    'createdAt': 1,
+    'clinicHours': {'$ifNull': ['$clinicHours', []]},
+}
+
+
+class AdminListQuery:
+    """One admin list: profile collection, uid field and output projection"""
+    def __init__(self, document, id_field, projection, filter_status=False):
+        self.document = document
+        self.id_field = id_field
+        self.projection = projection
+        self.filter_status = filter_status
+
+    def _filters(self):
+        """
+        Build the $match for ?name=, ?email= and (doctors) ?status=
+
+        Returns:
+            tuple: (profile_match, email_match) - email_match is None when not filtering by email
+        """
+        match = {}
+        name = request.args.get('name', '').strip()
+        if name:
+            match['name'] = {'$regex': re.escape(name), '$options': 'i'}
+
+        if self.filter_status:
+            status = request.args.get('status', '').strip()
+            if status == 'pending':
+                # Doctors without an account status are shown as pending
+                match['account.status'] = {'$ne': 'verified'}
+            elif status:
+                match['account.status'] = status
+
+        email = request.args.get('email', '').strip()
+        email_match = None
+        if email:
+            email_match = {'user.email': {'$regex': re.escape(email), '$options': 'i'}}
+        return match, email_match
+
+    def pipeline(self, page=None):
+        """
+        Build the aggregation pipeline for the current request
+
+        Args:
+            page: PageRequest, or None for the full (streamed) list
+
+        Returns:
+            list: Aggregation stages
+        """
+        match, email_match = self._filters()
+        if page is not None and page.cursor is not None:
+            if len(page.cursor) != 1:
+                raise ValueError("Invalid cursor")
+            match['_id'] = {'$lt': page.cursor[0]}
+
+        lookup = {'$lookup': {
+            'from': User._get_collection_name(),
+            'localField': self.id_field,
+            'foreignField': 'uid',
+            'as': 'user'
+        }}
+
+        # Pages are newest first; the full list keeps insertion order
+        stages = [{'$match': match}, {'$sort': {'_id': -1 if page is not None else 1}}]
+        limit = [{'$limit': page.limit + 1}] if page is not None else []
+        if email_match is not None:
+            stages += [lookup, {'$match': email_match}] + limit
+        else:
+            stages += limit + [lookup]
+        stages.append({'$project': self.projection})
+        return stages
+
+    def _serialize(self, row):
+        row.pop('_id', None)
+        created = row.get('createdAt')
+        row['createdAt'] = created.isoformat() if created else None
+        return row
+
+    def fetch_page(self, page):
+        """
+        Run the pipeline for one page
+
+        Returns:
+            tuple: (items, next_cursor) - cursor format matches paginate() on ['-id']
+        """
+        rows = list(self.document._get_collection().aggregate(self.pipeline(page)))
+        next_cursor = None
+        if len(rows) > page.limit:
+            rows = rows[:page.limit]
+            next_cursor = encode_cursor([rows[-1]['_id']])
+        return [self._serialize(row) for row in rows], next_cursor
+
+    def stream(self):
+        """
+        Run the full-list pipeline and return a generator of JSON array chunks
+
+        The aggregate() call is made eagerly so query errors surface before
+        the response starts; rows are then encoded one batch at a time.
+        """
+        cursor = self.document._get_collection().aggregate(
+            self.pipeline(), batchSize=STREAM_BATCH_SIZE
+        )
+
+        def generate():
+            yield '['
+            first = True
+            for row in cursor:
+                yield ('' if first else ',') + json.dumps(self._serialize(row))
+                first = False
+            yield ']'
+
+        return generate()
+
+
+patient_list = AdminListQuery(Patient, 'patientId', PATIENT_PROJECTION)
+doctor_list = AdminListQuery(Doctor, 'doctorId', DOCTOR_PROJECTION, filter_status=True)
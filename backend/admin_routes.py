@@ -1,7 +1,18 @@
-from flask import Blueprint, request, jsonify
-from models import User, Patient, Doctor
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from models import User, Doctor, DeletionJob
 from flask_jwt_extended import jwt_required
 from admin_middleware import admin_required
+from pagination import get_page_request, paginate, page_envelope
+from serializers import ADMIN_APPOINTMENT_FIELDS
+from identity_cache import identity_cache
+from admin_queries import patient_list, doctor_list
+import admin_stats
+import deletion_jobs
+from availability import availability_cache
+import slot_reservations
+from doctor_patients import refresh_pair
+from email_outbox import outbox
+import notifications
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -9,24 +20,15 @@ admin_bp = Blueprint('admin', __name__)
 @jwt_required()
 @admin_required
 def get_all_patients():
-    """Get all patients in the system"""
-    try:
-        patients = Patient.objects()
-        
-        results = []
-        for patient in patients:
-            # Fetch user info for email
-            user = User.objects(uid=patient.patientId).first()
-            
-            results.append({
-                "patientId": patient.patientId,
-                "name": patient.name,
-                "phone": patient.personalInfo.get('phone', '') if patient.personalInfo else '',
-                "email": user.email if user else "",
-                "createdAt": patient.createdAt.isoformat() if patient.createdAt else None
-            })
-        
-        return jsonify(results), 200
+    """Get all patients in the system (filters: ?name=, ?email=)"""
+    try:
+        page = get_page_request()
+        if page is not None:
+            results, next_cursor = patient_list.fetch_page(page)
+            return jsonify(page_envelope(results, next_cursor, page)), 200
+        return Response(stream_with_context(patient_list.stream()), mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -34,26 +36,15 @@ def get_all_patients():
 @jwt_required()
 @admin_required
 def get_all_doctors():
-    """Get all doctors in the system"""
-    try:
-        doctors = Doctor.objects()
-        
-        results = []
-        for doctor in doctors:
-            # Fetch user info for email
-            user = User.objects(uid=doctor.doctorId).first()
-            
-            results.append({
-                "doctorId": doctor.doctorId,
-                "name": doctor.name,
-                "email": user.email if user else "",
-                "specialization": doctor.specialization,
-                "status": doctor.account.get('status', 'pending') if doctor.account else 'pending',
-                "createdAt": doctor.createdAt.isoformat() if doctor.createdAt else None,
-                "clinicHours": doctor.clinicHours
-            })
-        
-        return jsonify(results), 200
+    """Get all doctors in the system (filters: ?name=, ?email=, ?status=)"""
+    try:
+        page = get_page_request()
+        if page is not None:
+            results, next_cursor = doctor_list.fetch_page(page)
+            return jsonify(page_envelope(results, next_cursor, page)), 200
+        return Response(stream_with_context(doctor_list.stream()), mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -61,55 +52,127 @@ def get_all_doctors():
 @jwt_required()
 @admin_required
 def delete_user(uid):
-    """Delete a user and their associated records"""
+    """
+    Delete a user and their associated records
+    The user is tombstoned immediately; records are removed by a background job
+    """
     try:
         # Find the user
         user = User.objects(uid=uid).first()
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        role = user.role
-        
-        # Delete associated records based on role
-        if role == 'patient':
-            # Delete patient record
-            patient = Patient.objects(patientId=uid).first()
-            if patient:
-                patient.delete()
-            
-            # Delete assessments
-            from models import Assessment
-            Assessment.objects(patientId=uid).delete()
-            
-            # Delete diet plans
-            from models import DietPlan
-            DietPlan.objects(patientId=uid).delete()
-            
-            # Delete progress records
-            from models import Progress
-            Progress.objects(patientId=uid).delete()
-            
-        elif role == 'doctor':
-            # Delete doctor record
-            doctor = Doctor.objects(doctorId=uid).first()
-            if doctor:
-                doctor.delete()
-            
-            # Delete assessments created by this doctor
-            from models import Assessment
-            Assessment.objects(doctorId=uid).delete()
-        
-        # Delete appointments
-        from models import Appointment
-        Appointment.objects(patientId=uid).delete()
-        Appointment.objects(doctorId=uid).delete()
+        job = deletion_jobs.enqueue_user_deletion(user)
+        
+        return jsonify({
+            "message": f"User {uid} scheduled for deletion",
+            "jobId": job.jobId,
+            "status": job.status
+        }), 202
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/jobs/deletion/<job_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_deletion_job(job_id):
+    """Progress of a user deletion job"""
+    try:
+        job = DeletionJob.objects(jobId=job_id).first()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
         
-        # Finally delete the user
-        user.delete()
+        return jsonify(deletion_jobs.job_to_dict(job)), 200
         
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/jobs/deletion/<job_id>/retry', methods=['POST'])
+@jwt_required()
+@admin_required
+def retry_deletion_job(job_id):
+    """Re-queue a failed deletion job"""
+    try:
+        job = deletion_jobs.retry_job(job_id)
+        if not job:
+            return jsonify({"error": "No failed job with this ID"}), 404
+        
+        return jsonify(deletion_jobs.job_to_dict(job)), 202
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/orphans', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_orphans():
+    """Records whose owner no longer exists, plus failed deletion jobs"""
+    try:
+        return jsonify(deletion_jobs.find_orphans()), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/orphans/cleanup', methods=['POST'])
+@jwt_required()
+@admin_required
+def cleanup_orphans():
+    """Queue deletion jobs for orphaned records and retry failed jobs"""
+    try:
+        job_ids = deletion_jobs.cleanup_orphans()
         return jsonify({
-            "message": f"User {uid} and all associated records deleted successfully"
-        }), 200
+            "message": f"{len(job_ids)} cleanup jobs queued",
+            "jobIds": job_ids
+        }), 202
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/email/outbox', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_email_outbox():
+    """Email outbox depth, queue age and delivery latency, plus recent dead letters"""
+    try:
+        metrics = outbox.metrics()
+        metrics['deadLetters'] = outbox.dead_letters()
+        return jsonify(metrics), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/email/outbox/<message_id>/retry', methods=['POST'])
+@jwt_required()
+@admin_required
+def retry_email(message_id):
+    """Re-queue a dead-lettered email"""
+    try:
+        if not outbox.retry(message_id):
+            return jsonify({"error": "No dead message with this ID"}), 404
+        
+        return jsonify({"message": "Email re-queued"}), 202
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/notifications/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_notification_stats():
+    """
+    Hourly notification events vs emails sent, and the sends saved by digests
+    
+    Query params:
+        hours: Window size (default 24, max 720)
+    """
+    try:
+        try:
+            hours = max(1, min(int(request.args.get('hours', 24)), 720))
+        except ValueError:
+            return jsonify({"error": "hours must be an integer"}), 400
+        
+        return jsonify(notifications.get_hourly_stats(hours)), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -128,8 +191,12 @@ def verify_doctor(doctor_id):
         if not doctor.account:
             doctor.account = {}
         
+        was_verified = doctor.account.get('status') == 'verified'
         doctor.account['status'] = 'verified'
         doctor.save()
+        identity_cache.invalidate(doctor_id)
+        if not was_verified:
+            admin_stats.record_doctor_verified()
         
         return jsonify({
             "message": f"Doctor {doctor.name} verified successfully",
@@ -144,27 +211,55 @@ def verify_doctor(doctor_id):
 @jwt_required()
 @admin_required
 def get_admin_stats():
-    """Get system statistics"""
+    """Get system statistics (materialized counters, see admin_stats.py)"""
     try:
-        total_patients = Patient.objects.count()
-        total_doctors = Doctor.objects.count()
-        verified_doctors = Doctor.objects(account__status='verified').count()
-        pending_doctors = total_doctors - verified_doctors
+        return jsonify(admin_stats.get_stats()), 200
         
-        from models import Appointment
-        total_appointments = Appointment.objects.count()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/stats/timeseries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_admin_stats_timeseries():
+    """Per-day signups and bookings (?from=YYYY-MM-DD&to=YYYY-MM-DD, default last 30 days)"""
+    try:
+        from datetime import date, timedelta
+        end_day = request.args.get('to') or admin_stats.get_ist_now().date().isoformat()
+        start_day = request.args.get('from') or (date.fromisoformat(end_day) - timedelta(days=29)).isoformat()
+        date.fromisoformat(start_day)
+        if start_day > end_day:
+            return jsonify({"error": "from must not be after to"}), 400
         
         return jsonify({
-            "totalPatients": total_patients,
-            "totalDoctors": total_doctors,
-            "verifiedDoctors": verified_doctors,
-            "pendingDoctors": pending_doctors,
-            "totalAppointments": total_appointments
+            "from": start_day,
+            "to": end_day,
+            "series": admin_stats.get_daily_series(start_day, end_day)
         }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/stats/reconcile', methods=['POST'])
+@jwt_required()
+@admin_required
+def reconcile_admin_stats():
+    """Recompute the materialized statistics from the source collections"""
+    try:
+        admin_stats.reconcile()
+        return jsonify(admin_stats.get_stats()), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@admin_bp.route('/cache/identity', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_identity_cache_stats():
+    """Identity cache hit rates and size (for this worker process)"""
+    return jsonify(identity_cache.stats()), 200
+
 @admin_bp.route('/appointments', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -172,24 +267,21 @@ def get_all_appointments():
     """Get all appointments in the system"""
     try:
         from models import Appointment
-        appointments = Appointment.objects().order_by('-startTimestamp')
-        
-        results = []
-        for appt in appointments:
-            results.append({
-                "id": str(appt.id),
-                "doctorId": appt.doctorId,
-                "doctorName": appt.doctorName,
-                "patientId": appt.patientId,
-                "patientName": appt.patientName,
-                "startTimestamp": appt.startTimestamp.isoformat() if appt.startTimestamp else None,
-                "endTimestamp": appt.endTimestamp.isoformat() if appt.endTimestamp else None,
-                "status": appt.status,
-                "notes": appt.notes,
-                "createdAt": appt.createdAt.isoformat() if appt.createdAt else None
-            })
+        page = get_page_request()
+        appointments = ADMIN_APPOINTMENT_FIELDS.query(Appointment.objects())
+        next_cursor = None
+        if page is None:
+            appointments = appointments.order_by('-startTimestamp')
+        else:
+            appointments, next_cursor = paginate(appointments, ['-startTimestamp'], page)
+        
+        results = ADMIN_APPOINTMENT_FIELDS.serialize_many(appointments)
         
+        if page is not None:
+            return jsonify(page_envelope(results, next_cursor, page)), 200
         return jsonify(results), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -209,6 +301,10 @@ def delete_appointment(appointment_id):
         doctor_name = appointment.doctorName
         
         appointment.delete()
+        admin_stats.record_appointment_deleted()
+        slot_reservations.release(appointment.id)
+        availability_cache.invalidate(appointment.doctorId, appointment.startTimestamp, appointment.proposedStartTimestamp)
+        refresh_pair(appointment.doctorId, appointment.patientId)
         
         return jsonify({
             "message": f"Appointment between {patient_name} and {doctor_name} deleted successfully"
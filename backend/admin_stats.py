@@ -0,0 +1,265 @@
+"""
+Materialized admin statistics
+
+The dashboard counters live in one AdminStats document that the write paths
+keep current with $inc (register, verify-doctor, delete-user, booking).
+Signups and bookings are also rolled up per IST day in DailyStats.
+
+reconcile() recomputes everything exactly with a single aggregation
+($unionWith + $facet) and corrects the materialized values; run it
+periodically (reconcile_admin_stats.py) to correct any drift. Totals are
+corrected with a $inc guarded on the values read before the snapshot, and
+only days before the run are rewritten, so hook increments that land
+during a reconcile are never lost.
+"""
+from datetime import date, timedelta, timezone
+from pymongo import UpdateOne
+from models import AdminStats, DailyStats, Doctor, Patient, Appointment, get_ist_now
+import traceback
+
+STATS_KEY = 'global'
+IST = timezone(timedelta(hours=5, minutes=30))
+MAX_SERIES_DAYS = 366
+RECONCILE_RETRIES = 5
+
+SIGNUP_FIELDS = {'patient': 'patientSignups', 'doctor': 'doctorSignups'}
+TOTAL_FIELDS = {'patient': 'totalPatients', 'doctor': 'totalDoctors'}
+
+
+def _day(dt=None):
+    dt = dt or get_ist_now()
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(IST)
+    return dt.date().isoformat()
+
+
+def _inc_totals(**counts):
+    """Apply $inc to the global stats document; failures never break the caller"""
+    try:
+        AdminStats.objects(key=STATS_KEY).update_one(
+            upsert=True,
+            set__updatedAt=get_ist_now(),
+            **{f"inc__{field}": n for field, n in counts.items() if n}
+        )
+    except Exception as e:
+        print(f" Error updating admin stats: {e}")
+
+
+def _inc_day(day, field, n=1):
+    try:
+        DailyStats.objects(day=day).update_one(upsert=True, **{f"inc__{field}": n})
+    except Exception as e:
+        print(f" Error updating daily stats: {e}")
+
+
+# ==================== WRITE-PATH HOOKS ====================
+
+def record_signup(role, when=None):
+    """A patient or doctor registered"""
+    if role not in TOTAL_FIELDS:
+        return
+    _inc_totals(**{TOTAL_FIELDS[role]: 1})
+    _inc_day(_day(when), SIGNUP_FIELDS[role])
+
+
+def record_doctor_verified():
+    """A pending doctor was verified"""
+    _inc_totals(verifiedDoctors=1)
+
+
+def record_user_deleted(role, was_verified=False, appointments_deleted=0):
+    """A patient or doctor was removed together with their appointments"""
+    counts = {'totalAppointments': -appointments_deleted}
+    if role in TOTAL_FIELDS:
+        counts[TOTAL_FIELDS[role]] = -1
+    if role == 'doctor' and was_verified:
+        counts['verifiedDoctors'] = -1
+    _inc_totals(**counts)
+
+
+def record_appointment_created(when=None):
+    _inc_totals(totalAppointments=1)
+    _inc_day(_day(when), 'appointments')
+
+
+def record_appointment_deleted():
+    _inc_totals(totalAppointments=-1)
+
+
+# ==================== READS ====================
+
+def get_stats():
+    """
+    Current dashboard counters (one indexed read)
+
+    Falls back to a synchronous reconcile when the document has never been
+    reconciled, e.g. on first deploy.
+    """
+    stats = AdminStats.objects(key=STATS_KEY).first()
+    if stats is None or stats.reconciledAt is None:
+        stats = reconcile()
+
+    return {
+        "totalPatients": stats.totalPatients,
+        "totalDoctors": stats.totalDoctors,
+        "verifiedDoctors": stats.verifiedDoctors,
+        "pendingDoctors": stats.totalDoctors - stats.verifiedDoctors,
+        "totalAppointments": stats.totalAppointments,
+        "reconciledAt": stats.reconciledAt.isoformat() if stats.reconciledAt else None
+    }
+
+
+def get_daily_series(start_day, end_day):
+    """
+    Per-day signups and bookings between two YYYY-MM-DD days (inclusive)
+
+    Days without activity are filled with zeros so charts get a continuous axis.
+    """
+    rows = {
+        row['day']: row for row in
+        DailyStats.objects(day__gte=start_day, day__lte=end_day).only(
+            'day', 'patientSignups', 'doctorSignups', 'appointments'
+        ).as_pymongo()
+    }
+
+    current = date.fromisoformat(start_day)
+    last = date.fromisoformat(end_day)
+    if (last - current).days >= MAX_SERIES_DAYS:
+        raise ValueError(f"Range is limited to {MAX_SERIES_DAYS} days")
+
+    series = []
+    while current <= last:
+        key = current.isoformat()
+        row = rows.get(key, {})
+        series.append({
+            "day": key,
+            "patientSignups": row.get('patientSignups', 0),
+            "doctorSignups": row.get('doctorSignups', 0),
+            "appointments": row.get('appointments', 0)
+        })
+        current += timedelta(days=1)
+    return series
+
+
+# ==================== RECONCILIATION ====================
+
+def _day_expr(field):
+    return {'$dateToString': {'format': '%Y-%m-%d', 'date': field, 'timezone': '+05:30'}}
+
+
+def reconcile():
+    """
+    Recompute the counters and daily rollups from the source collections
+
+    One aggregation: doctors, patients and appointments are unioned into a
+    single stream of {kind, verified, day} rows and $facet computes both the
+    totals and the per-day counts.
+
+    Returns:
+        AdminStats: The reconciled document
+    """
+    pipeline = [
+        {'$project': {
+            '_id': 0, 'kind': 'doctor',
+            'verified': {'$eq': ['$account.status', 'verified']},
+            'day': _day_expr('$createdAt')
+        }},
+        {'$unionWith': {'coll': Patient._get_collection_name(), 'pipeline': [
+            {'$project': {'_id': 0, 'kind': 'patient', 'day': _day_expr('$createdAt')}}
+        ]}},
+        {'$unionWith': {'coll': Appointment._get_collection_name(), 'pipeline': [
+            {'$project': {'_id': 0, 'kind': 'appointment', 'day': _day_expr(
+                {'$ifNull': ['$createdAt', '$startTimestamp']}
+            )}}
+        ]}},
+        {'$facet': {
+            'totals': [
+                {'$group': {
+                    '_id': '$kind',
+                    'count': {'$sum': 1},
+                    'verified': {'$sum': {'$cond': ['$verified', 1, 0]}}
+                }}
+            ],
+            'daily': [
+                {'$match': {'day': {'$ne': None}}},
+                {'$group': {'_id': {'day': '$day', 'kind': '$kind'}, 'count': {'$sum': 1}}}
+            ]
+        }}
+    ]
+    # Totals are applied only if no hook moved the counters while the
+    # aggregation ran; otherwise the snapshot may or may not include those
+    # events, so the whole reconcile is retried
+    for _ in range(RECONCILE_RETRIES):
+        observed = AdminStats._get_collection().find_one({'key': STATS_KEY})
+        today = _day()
+        result = next(Doctor._get_collection().aggregate(pipeline), {'totals': [], 'daily': []})
+
+        totals = {row['_id']: row for row in result['totals']}
+        if _apply_totals(observed, {
+            'totalPatients': totals.get('patient', {}).get('count', 0),
+            'totalDoctors': totals.get('doctor', {}).get('count', 0),
+            'verifiedDoctors': totals.get('doctor', {}).get('verified', 0),
+            'totalAppointments': totals.get('appointment', {}).get('count', 0),
+        }):
+            break
+    else:
+        print(" Admin stats changed during every reconcile attempt; totals left for the next run")
+
+    # Only days before the snapshot are rewritten: hooks keep $inc-ing today's
+    # row while the aggregation runs, and a $set there would drop those
+    kind_fields = {'patient': 'patientSignups', 'doctor': 'doctorSignups', 'appointment': 'appointments'}
+    days = {}
+    for row in result['daily']:
+        if row['_id']['day'] >= today:
+            continue
+        day = days.setdefault(row['_id']['day'], {field: 0 for field in kind_fields.values()})
+        day[kind_fields[row['_id']['kind']]] = row['count']
+
+    if days:
+        DailyStats._get_collection().bulk_write([
+            UpdateOne({'day': day}, {'$set': counts}, upsert=True)
+            for day, counts in days.items()
+        ], ordered=False)
+    DailyStats.objects(day__lt=today, day__nin=list(days)).delete()
+
+    return AdminStats.objects(key=STATS_KEY).first()
+
+
+def _apply_totals(observed, target):
+    """
+    Move the counters from the values read before the snapshot to the
+    reconciled ones, as a $inc guarded on those values
+
+    Returns:
+        bool: False if a hook changed the counters in between (nothing written)
+    """
+    collection = AdminStats._get_collection()
+    now = get_ist_now()
+    if observed is None:
+        inserted = collection.update_one(
+            {'key': STATS_KEY},
+            {'$setOnInsert': dict(target, reconciledAt=now, updatedAt=now)},
+            upsert=True
+        )
+        return inserted.upserted_id is not None
+
+    guard = {'key': STATS_KEY}
+    guard.update({field: observed.get(field) for field in target})
+    delta = {field: value - (observed.get(field) or 0) for field, value in target.items()}
+    updated = collection.update_one(guard, {
+        '$inc': delta,
+        '$set': {'reconciledAt': now, 'updatedAt': now}
+    })
+    return bool(updated.matched_count)
+
+
+def reconcile_safely():
+    """reconcile() for background callers; logs instead of raising"""
+    try:
+        stats = reconcile()
+        print(f"✓ Admin stats reconciled at {stats.reconciledAt}")
+        return stats
+    except Exception as e:
+        print(f" Error reconciling admin stats: {e}")
+        traceback.print_exc()
+        return None
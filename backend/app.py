@@ -26,6 +26,10 @@ def create_app():
     )
     db.init_app(app)
     jwt = JWTManager(app)
+    # Deleted users and superseded tokens are rejected on every protected route
+    from auth_middleware import is_token_revoked, revoked_token_response
+    jwt.token_in_blocklist_loader(is_token_revoked)
+    jwt.revoked_token_loader(revoked_token_response)
     
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -35,6 +39,34 @@ def create_app():
     
     from admin_routes import admin_bp
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    
+    # Queue outgoing email in Mongo and deliver it from background senders
+    import email_outbox
+    email_outbox.start()
+    
+    # Pick up user deletion jobs interrupted by a restart
+    from deletion_jobs import resume_deletion_jobs
+    try:
+        resume_deletion_jobs()
+    except Exception as e:
+        print(f" Could not resume deletion jobs: {e}")
+    
+    # Periodic jobs; only the elected leader process runs them
+    from scheduler import scheduler
+    from appointment_utils import auto_complete_appointments
+    from admin_stats import reconcile_safely
+    scheduler.add_job('autoCompleteAppointments', int(os.getenv("AUTO_COMPLETE_INTERVAL_SECONDS", "60")), auto_complete_appointments)
+    scheduler.add_job('reconcileAdminStats', int(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "3600")), reconcile_safely)
+    scheduler.add_job('resumeDeletionJobs', 30, resume_deletion_jobs)
+    from name_propagation import resume_name_propagation
+    scheduler.add_job('resumeNamePropagation', 300, resume_name_propagation)
+    from slot_reservations import release_stale_reservations
+    scheduler.add_job('releaseStaleReservations', 600, release_stale_reservations)
+    from notifications import flush_digests
+    scheduler.add_job('flushNotificationDigests', int(os.getenv("NOTIFICATION_FLUSH_INTERVAL_SECONDS", "30")), flush_digests)
+    from doctor_patients import rebuild_safely
+    scheduler.add_job('rebuildDoctorPatients', int(os.getenv("DOCTOR_PATIENTS_REBUILD_INTERVAL_SECONDS", "86400")), rebuild_safely)
+    scheduler.start()
         
     return app
 
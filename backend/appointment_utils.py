@@ -1,53 +1,82 @@
 """
 Utility functions for appointment management
 """
-from models import Appointment, User, get_ist_now
-from email_service import email_service, format_appointment_time
+from models import Appointment, get_ist_now
+from identity_cache import identity_cache
+from email_service import format_appointment_time
+from email_queue import enqueue_email
+from doctor_patients import refresh_pair
 import traceback
 
+# Completion emails claimed per sweep; the rest are picked up by the next run
+NOTIFY_BATCH_LIMIT = 500
+
 def get_user_email(user_id):
     """Get user email from User collection"""
-    user = User.objects(uid=user_id).first()
+    user = identity_cache.get_user(user_id)
     return user.email if user else None
 
 def auto_complete_appointments():
     """
     Automatically complete confirmed appointments that have passed their end time.
-    This should be called at the start of any GET endpoint that returns appointments.
-    
+    Run periodically by the scheduler (see scheduler.py), never on the read path.
+
     Returns:
         int: Number of appointments auto-completed
     """
     now = get_ist_now()
-    
-    # Find all confirmed appointments where end time has passed
-    past_appointments = Appointment.objects(
+
+    # One write for every confirmed appointment whose end time has passed
+    count = Appointment.objects(
         status='confirmed',
         endTimestamp__lt=now
+    ).update(
+        set__status='completed',
+        set__updatedAt=now,
+        set__completionEmailPending=True
     )
-    
-    count = 0
-    # Process each appointment to send email and update status
-    for appt in past_appointments:
+
+    notify_completed_appointments()
+    return count
+
+def notify_completed_appointments(limit=NOTIFY_BATCH_LIMIT):
+    """
+    Queue completion emails for appointments flagged by auto_complete_appointments.
+    Each appointment is claimed with find_one_and_update, so concurrent runs never
+    send the same email twice.
+    The claimed appointment's doctor-patient relationship is refreshed too.
+
+    Returns:
+        int: Number of emails queued
+    """
+    collection = Appointment._get_collection()
+    queued = 0
+
+    for _ in range(limit):
+        appt = collection.find_one_and_update(
+            {'completionEmailPending': True},
+            {'$unset': {'completionEmailPending': ''}},
+            projection={'doctorId': 1, 'patientId': 1, 'patientName': 1, 'doctorName': 1, 'startTimestamp': 1}
+        )
+        if appt is None:
+            break
+
+        refresh_pair(appt['doctorId'], appt['patientId'])
+
         try:
-            # Update status
-            appt.status = 'completed'
-            appt.updatedAt = now
-            appt.save()
-            count += 1
-            
-            # Send completion email
-            patient_email = get_user_email(appt.patientId)
+            patient_email = get_user_email(appt['patientId'])
             if patient_email:
-                print(f"📧 Sending completion email to {patient_email}")
-                email_service.send_appointment_completed(
+                print(f"📧 Queueing completion email to {patient_email}")
+                enqueue_email(
+                    'send_appointment_completed',
                     patient_email,
-                    appt.patientName,
-                    appt.doctorName,
-                    format_appointment_time(appt.startTimestamp)
+                    appt.get('patientName'),
+                    appt.get('doctorName'),
+                    format_appointment_time(appt['startTimestamp'])
                 )
+                queued += 1
         except Exception as e:
-            print(f" Error auto-completing appointment {appt.id}: {e}")
+            print(f" Error queueing completion email for {appt['_id']}: {e}")
             traceback.print_exc()
-            
-    return count
+
+    return queued
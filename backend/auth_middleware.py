@@ -0,0 +1,133 @@
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+from functools import wraps
+from flask import g, jsonify
+from datetime import timedelta
+import os
+from identity_cache import identity_cache
+from doctor_patients import has_relationship
+
+ACCESS_TOKEN_EXPIRES = timedelta(days=7)  # matches the frontend cookie
+# How long a cached User may be trusted for revocation (pv / tombstone) checks
+CLAIMS_CACHE_MAX_AGE = float(os.getenv("CLAIMS_CACHE_MAX_AGE", "30"))
+
+
+def issue_access_token(user):
+    """
+    Issue an access token with the uniform claims set:
+    role, display name and profile version (pv)
+    """
+    return create_access_token(
+        identity=user.uid,
+        additional_claims={
+            "role": user.role,
+            "name": user.name,
+            "pv": user.profileVersion or 0
+        },
+        expires_delta=ACCESS_TOKEN_EXPIRES
+    )
+
+
+def current_role():
+    """Role of the authenticated user, as resolved by @claims_required"""
+    return getattr(g, 'current_role', None)
+
+
+def _current_user(uid, claims):
+    """
+    User record to check a token against, or None when missing/deleted.
+
+    Each worker caches users separately, so another worker may still hold
+    the version from before a role or name change. A token newer than the
+    cached version therefore forces a reload from Mongo instead of being
+    rejected; older tokens are revoked once the cache catches up, within
+    CLAIMS_CACHE_MAX_AGE.
+    """
+    user = identity_cache.get_user(uid, max_age=CLAIMS_CACHE_MAX_AGE)
+    if user and claims.get("pv", 0) > (user.profileVersion or 0):
+        identity_cache.invalidate(uid)
+        user = identity_cache.get_user(uid)
+    if not user or user.deletedAt:
+        return None
+    return user
+
+
+def is_stale_token(user, claims):
+    """True when the token predates the user's last role/name change or deletion"""
+    return "pv" in claims and claims["pv"] < (user.profileVersion or 0)
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """
+    JWTManager token_in_blocklist_loader: runs for every @jwt_required()
+    route, so revocation is enforced globally rather than per decorator.
+
+    A token is revoked when its user is missing or tombstoned (deletedAt), or
+    when it predates the user's last role/name change or deletion (pv).
+    The fixed admin login has no User record and is never revoked here.
+    """
+    if jwt_payload.get("role") == "admin":
+        return False
+    user = _current_user(jwt_payload.get("sub"), jwt_payload)
+    return user is None or is_stale_token(user, jwt_payload)
+
+
+def revoked_token_response(jwt_header, jwt_payload):
+    """JWTManager revoked_token_loader: tell the frontend to log in again"""
+    return jsonify({
+        "error": "Your session is out of date. Please log in again.",
+        "staleToken": True
+    }), 401
+
+
+def claims_required(*roles, message=None):
+    """
+    Decorator to authorize a request from its JWT claims.
+    Use this decorator after @jwt_required().
+
+    Revoked tokens never get this far (see is_token_revoked). Tokens issued
+    before claims existed fall back to the User record for the role.
+
+    Args:
+        roles: Allowed roles; empty allows any authenticated user
+        message: Error message when the role is not allowed
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            role = get_jwt().get("role")
+            if role is None:
+                user = identity_cache.get_user(get_jwt_identity())
+                if not user:
+                    return jsonify({"error": "User not found"}), 404
+                role = user.role
+
+            if roles and role not in roles:
+                return jsonify({"error": message or "Unauthorized"}), 403
+
+            g.current_role = role
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def patient_access_required(fn):
+    """
+    Decorator to restrict a patient's records to the patient, admins and
+    doctors with a relationship to them (see doctor_patients.py).
+    Use this decorator after @jwt_required(); the route takes patient_id.
+
+    The role is resolved by @claims_required(). The doctor check is one
+    indexed point read on DoctorPatient.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        user_id = get_jwt_identity()
+        patient_id = kwargs.get('patient_id')
+        if user_id == patient_id:
+            return fn(*args, **kwargs)
+
+        role = current_role()
+        if role == "admin" or (role == "doctor" and has_relationship(user_id, patient_id)):
+            return fn(*args, **kwargs)
+        return jsonify({"error": "Unauthorized"}), 403
+    return claims_required()(wrapper)
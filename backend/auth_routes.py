@@ -4,6 +4,9 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from datetime import timedelta
 from otp_service import otp_service
 from email_service import email_service
+from identity_cache import identity_cache
+from auth_middleware import issue_access_token
+from admin_stats import record_signup
 import uuid
 import os
 
@@ -78,6 +81,7 @@ def register():
             name=name
         )
         patient.save()
+    record_signup(role, new_user.createdAt)
     
     # Send OTP for email verification
     otp_result = otp_service.send_otp(email, 'signup')
@@ -190,6 +194,7 @@ def reset_password():
         # Update password
         user.set_password(new_password)
         user.save()
+        identity_cache.invalidate(user.uid)
 
         # Security notification email (do not fail password reset if email fails)
         try:
@@ -232,9 +237,10 @@ def verify_email():
     user.emailVerified = True
     user.meta_info['verified'] = True
     user.save()
+    identity_cache.invalidate(user.uid)
 
     # Auto-login: Generate token (7 days to match frontend cookie)
-    access_token = create_access_token(identity=user.uid, expires_delta=timedelta(days=7))
+    access_token = issue_access_token(user)
 
     return jsonify({
         "message": "Email verified successfully!",
@@ -288,7 +294,7 @@ def login():
     if email and email.lower() == admin_email.lower() and password == admin_password:
         access_token = create_access_token(
             identity="admin",
-            additional_claims={"role": "admin"},
+            additional_claims={"role": "admin", "name": "Admin", "pv": 0},
             expires_delta=timedelta(days=7)
         )
         return jsonify({
@@ -303,7 +309,7 @@ def login():
     # ---- NORMAL USER LOGIN ----
     user = User.objects(email=email).first()
     
-    if not user:
+    if not user or user.deletedAt:
         return jsonify({"error": "Invalid credentials"}), 401
     
     if not user.check_password(password):
@@ -317,11 +323,7 @@ def login():
             "email": user.email
         }), 403
     
-    access_token = create_access_token(
-        identity=user.uid,
-        additional_claims={"role": user.role},
-        expires_delta=timedelta(days=7)
-    )
+    access_token = issue_access_token(user)
     
     return jsonify({
         "access_token": access_token,
@@ -354,6 +356,7 @@ def request_email_change():
     # Store pending email
     user.pendingEmail = new_email
     user.save()
+    identity_cache.invalidate(current_user_id)
     
     # Send OTP to new email
     result = otp_service.send_otp(new_email, 'email_change', user_id=current_user_id)
@@ -398,6 +401,7 @@ def verify_email_change():
     user.email = user.pendingEmail
     user.pendingEmail = None
     user.save()
+    identity_cache.invalidate(current_user_id)
     
     # Send notification to old email
     email_service.send_email_changed_notification(old_email, user.name)
@@ -413,7 +417,7 @@ def get_current_user():
     """Get current user information from JWT token"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.objects(uid=current_user_id).first()
+        user = identity_cache.get_user(current_user_id)
         
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -424,7 +428,34 @@ def get_current_user():
             "email": user.email,
             "role": user.role,
             "emailVerified": user.emailVerified,
-            "pendingEmail": user.pendingEmail
+            "pendingEmail": user.pendingEmail,
+            "notificationDelivery": user.notificationDelivery or 'digest'
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@auth_bp.route('/notification-preferences', methods=['PUT'])
+@jwt_required()
+def update_notification_preferences():
+    """
+    Choose how appointment emails are delivered
+    
+    Body: {"delivery": "digest" | "immediate"}
+    Digest batches updates that arrive close together into one email
+    (see notifications.py); OTP and security emails are always immediate.
+    """
+    current_user_id = get_jwt_identity()
+    delivery = (request.json or {}).get('delivery')
+    
+    if delivery not in ('digest', 'immediate'):
+        return jsonify({"error": "delivery must be 'digest' or 'immediate'"}), 400
+    
+    updated = User.objects(uid=current_user_id).update_one(set__notificationDelivery=delivery)
+    if not updated:
+        return jsonify({"error": "User not found"}), 404
+    identity_cache.invalidate(current_user_id)
+    
+    return jsonify({
+        "message": "Notification preferences updated",
+        "notificationDelivery": delivery
+    }), 200
@@ -0,0 +1,281 @@
+"""
+Doctor availability engine
+
+Doctor.clinicHours ([{day: 'Monday', from: '09:00', to: '17:00'}], IST) is
+compiled once into a weekly bitmap with one bit per UNIT_MINUTES of the week.
+For a requested window, the doctor's active appointments are loaded with a
+single indexed range query and painted into per-day booked bitmaps; free slots
+are the slot-sized runs of clinic bits with no booked bit.
+
+Free slots are cached per (doctor, day, duration) for CACHE_TTL seconds and
+invalidated on booking, cancellation, reschedule and clinic-hours changes.
+Like the identity cache, each worker process has its own cache; the TTL
+bounds staleness in the workers that did not handle the write.
+"""
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from models import Appointment
+import os
+import threading
+import time
+
+IST = timezone(timedelta(hours=5, minutes=30))
+UNIT_MINUTES = 5
+UNITS_PER_DAY = 24 * 60 // UNIT_MINUTES
+DAY_MASK = (1 << UNITS_PER_DAY) - 1
+SLOT_MINUTES = 30
+MAX_DURATION_MINUTES = 240
+MAX_WINDOW_DAYS = 31
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Statuses that hold the doctor's time
+ACTIVE_STATUSES = ['pending', 'confirmed', 'doctor_rescheduled_pending', 'patient_rescheduled_pending']
+RESCHEDULE_STATUSES = ['doctor_rescheduled_pending', 'patient_rescheduled_pending']
+
+
+# ==================== BITMAPS ====================
+
+def _parse_hhmm(value):
+    hours, minutes = value.split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+@lru_cache(maxsize=1024)
+def _compile_week(hours):
+    """Compile a tuple of (day, from, to) into a weekly bitmap (bit 0 = Monday 00:00 IST)"""
+    week = 0
+    for day, start, end in hours:
+        if day not in WEEKDAYS:
+            continue
+        start_unit = -(-_parse_hhmm(start) // UNIT_MINUTES)  # Round opening up to a unit
+        end_unit = _parse_hhmm(end) // UNIT_MINUTES
+        if end_unit <= start_unit:
+            continue
+        offset = WEEKDAYS.index(day) * UNITS_PER_DAY
+        week |= ((1 << (end_unit - start_unit)) - 1) << (offset + start_unit)
+    return week
+
+
+def compile_clinic_hours(clinic_hours):
+    """
+    Weekly availability bitmap for a doctor's clinicHours
+
+    Args:
+        clinic_hours: [{day, from, to}] as stored on Doctor
+
+    Returns:
+        int: Bitmap with bit i set when unit i of the week (from Monday 00:00 IST) is open
+    """
+    hours = []
+    for entry in clinic_hours or []:
+        try:
+            hours.append((entry['day'], entry['from'], entry['to']))
+        except (KeyError, TypeError):
+            continue
+    try:
+        return _compile_week(tuple(sorted(hours)))
+    except ValueError:
+        return 0
+
+
+def day_bitmap(week, day):
+    """Open units for one calendar day, taken from the weekly bitmap"""
+    return (week >> (day.weekday() * UNITS_PER_DAY)) & DAY_MASK
+
+
+def _as_ist(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)  # Mongo returns naive UTC
+    return dt.astimezone(IST)
+
+
+def _day_start(day):
+    return datetime(day.year, day.month, day.day, tzinfo=IST)
+
+
+def paint_interval(booked, start, end, first_day, last_day):
+    """
+    Mark [start, end) as booked in the per-day bitmaps
+
+    Args:
+        booked: {date: bitmap}, updated in place
+        start, end: Interval datetimes
+        first_day, last_day: Window being computed; other days are ignored
+    """
+    start, end = _as_ist(start), _as_ist(end)
+    day = max(start.date(), first_day)
+    while day <= min(end.date(), last_day):
+        base = _day_start(day)
+        first = max(0, int((start - base).total_seconds() // 60) // UNIT_MINUTES)
+        last = min(UNITS_PER_DAY, -(-int((end - base).total_seconds() // 60) // UNIT_MINUTES))
+        if last > first:
+            booked[day] = booked.get(day, 0) | (((1 << (last - first)) - 1) << first)
+        day += timedelta(days=1)
+
+
+def free_slot_units(open_bits, booked_bits, duration_units, step_units):
+    """
+    Start units of free slots in one day
+
+    Slots are laid out from the start of each open run (as the booking UI
+    does) every step_units, and kept when all duration_units are open and
+    unbooked.
+    """
+    free = open_bits & ~booked_bits
+    needed = (1 << duration_units) - 1
+    starts = []
+    unit = 0
+    while unit < UNITS_PER_DAY:
+        if not (open_bits >> unit) & 1:
+            unit += 1
+            continue
+        run_start = unit
+        while unit < UNITS_PER_DAY and (open_bits >> unit) & 1:
+            unit += 1
+        for start in range(run_start, unit - duration_units + 1, step_units):
+            if (free >> start) & needed == needed:
+                starts.append(start)
+    return starts
+
+
+def load_booked(doctor_id, first_day, last_day, exclude_appointment_id=None):
+    """
+    Booked bitmaps for a window, from one range query on (doctorId, startTimestamp)
+
+    Pending reschedule proposals also hold their proposed time.
+
+    Returns:
+        dict: {date: bitmap}
+    """
+    window_start = _day_start(first_day)
+    window_end = _day_start(last_day + timedelta(days=1))
+    earliest = window_start - timedelta(minutes=MAX_DURATION_MINUTES)
+
+    query = {
+        'doctorId': doctor_id,
+        'status': {'$in': ACTIVE_STATUSES},
+        '$or': [
+            {'startTimestamp': {'$gte': earliest, '$lt': window_end}},
+            {'proposedStartTimestamp': {'$gte': earliest, '$lt': window_end}}
+        ]
+    }
+    rows = Appointment.objects(__raw__=query)
+    if exclude_appointment_id:
+        rows = rows.filter(id__ne=exclude_appointment_id)
+    rows = rows.only(
+        'status', 'startTimestamp', 'endTimestamp', 'proposedStartTimestamp', 'proposedEndTimestamp'
+    ).as_pymongo()
+
+    booked = {}
+    default_length = timedelta(minutes=SLOT_MINUTES)
+    for row in rows:
+        start = row.get('startTimestamp')
+        if start:
+            paint_interval(booked, start, row.get('endTimestamp') or start + default_length, first_day, last_day)
+        proposed = row.get('proposedStartTimestamp')
+        if proposed and row.get('status') in RESCHEDULE_STATUSES:
+            end = row.get('proposedEndTimestamp') or proposed + default_length
+            paint_interval(booked, proposed, end, first_day, last_day)
+    return booked
+
+
+# ==================== CACHE ====================
+
+class AvailabilityCache:
+    """Per (doctor, day, duration) cache of free slot start units"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or float(os.getenv("AVAILABILITY_CACHE_TTL", "60"))
+        self._entries = {}  # (doctorId, date, duration) -> (expires_at, [start units])
+        self._lock = threading.Lock()
+
+    def get_free_slots(self, doctor, first_day, last_day, duration=SLOT_MINUTES):
+        """
+        Free slots for a doctor between two dates (inclusive)
+
+        Args:
+            doctor: Doctor document (clinicHours is read from it)
+            first_day, last_day: datetime.date
+            duration: Slot length in minutes
+
+        Returns:
+            list: [{'date': 'YYYY-MM-DD', 'slots': [{'start', 'end'}]}], past slots excluded
+        """
+        doctor_id = doctor.doctorId
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        now = time.monotonic()
+
+        cached = {}
+        with self._lock:
+            for day in days:
+                entry = self._entries.get((doctor_id, day, duration))
+                if entry and entry[0] > now:
+                    cached[day] = entry[1]
+
+        missing = [day for day in days if day not in cached]
+        if missing:
+            week = compile_clinic_hours(doctor.clinicHours)
+            open_days = [day for day in missing if day_bitmap(week, day)]
+            booked = load_booked(doctor_id, open_days[0], open_days[-1]) if open_days else {}
+            duration_units = -(-duration // UNIT_MINUTES)
+            step_units = SLOT_MINUTES // UNIT_MINUTES
+            with self._lock:
+                for day in missing:
+                    units = free_slot_units(day_bitmap(week, day), booked.get(day, 0), duration_units, step_units)
+                    cached[day] = units
+                    self._entries[(doctor_id, day, duration)] = (now + self.ttl, units)
+
+        current = datetime.now(IST)
+        length = timedelta(minutes=duration)
+        result = []
+        for day in days:
+            base = _day_start(day)
+            slots = []
+            for unit in cached[day]:
+                start = base + timedelta(minutes=unit * UNIT_MINUTES)
+                if start <= current:
+                    continue
+                slots.append({'start': start.isoformat(), 'end': (start + length).isoformat()})
+            result.append({'date': day.isoformat(), 'slots': slots})
+        return result
+
+    def invalidate(self, doctor_id, *times):
+        """
+        Drop cached days for a doctor
+
+        Args:
+            doctor_id: Doctor ID
+            times: Datetimes whose days changed; none drops every day for the doctor
+        """
+        days = {_as_ist(t).date() for t in times if t is not None}
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == doctor_id]:
+                if not times or key[1] in days:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def parse_window(from_arg, to_arg):
+    """
+    Parse ?from=&to= (YYYY-MM-DD, IST); defaults to the next 7 days
+
+    Returns:
+        tuple: (first_day, last_day) as datetime.date
+
+    Raises:
+        ValueError: On malformed dates or a window over MAX_WINDOW_DAYS
+    """
+    today = datetime.now(IST).date()
+    first_day = date.fromisoformat(from_arg) if from_arg else today
+    last_day = date.fromisoformat(to_arg) if to_arg else first_day + timedelta(days=6)
+    if last_day < first_day:
+        raise ValueError("from must not be after to")
+    if (last_day - first_day).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"Window is limited to {MAX_WINDOW_DAYS} days")
+    return first_day, last_day
+
+
+availability_cache = AvailabilityCache()
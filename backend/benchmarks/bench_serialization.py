@@ -0,0 +1,103 @@
+"""
+Benchmark: appointment list serialization, Document path vs raw FieldMap path
+
+Builds N raw appointment rows (as returned by pymongo) and times the CPU cost
+of turning them into the /api/appointments/me JSON shape:
+
+  document: Appointment._from_son(row) + per-field .isoformat() (old path)
+  raw:      APPOINTMENT_FIELDS.serialize(row) on the as_pymongo() dict
+
+No database is needed; the query itself is identical for both paths.
+
+Usage:
+    python benchmarks/bench_serialization.py [rows] [repeats]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import Appointment  # noqa: E402
+from serializers import APPOINTMENT_FIELDS  # noqa: E402
+
+
+def make_rows(n):
+    base = datetime(2025, 1, 1, 9, 0)
+    rows = []
+    for i in range(n):
+        start = base + timedelta(minutes=30 * i)
+        rows.append({
+            '_id': ObjectId(),
+            'doctorId': 'DR-000000000001',
+            'patientId': f'PT-{i:012d}',
+            'patientName': f'Patient {i}',
+            'doctorName': 'Doctor One',
+            'startTimestamp': start,
+            'endTimestamp': start + timedelta(minutes=30),
+            'status': 'confirmed',
+            'notes': 'Follow-up',
+            'createdAt': start - timedelta(days=2),
+            'updatedAt': start - timedelta(days=1),
+        })
+    return rows
+
+
+def serialize_documents(rows):
+    out = []
+    for row in rows:
+        a = Appointment._from_son(row)
+        out.append({
+            "id": str(a.id),
+            "doctorId": a.doctorId,
+            "patientId": a.patientId,
+            "doctorName": a.doctorName,
+            "patientName": a.patientName,
+            "startTimestamp": a.startTimestamp.isoformat(),
+            "endTimestamp": a.endTimestamp.isoformat() if a.endTimestamp else None,
+            "status": a.status,
+            "notes": a.notes,
+            "cancelReason": a.cancelReason,
+            "rescheduleReason": getattr(a, 'rescheduleReason', None),
+            "isRescheduledBy": a.isRescheduledBy,
+            "proposedStartTimestamp": a.proposedStartTimestamp.isoformat() if a.proposedStartTimestamp else None,
+            "proposedEndTimestamp": a.proposedEndTimestamp.isoformat() if a.proposedEndTimestamp else None,
+            "createdAt": a.createdAt.isoformat(),
+            "updatedAt": a.updatedAt.isoformat()
+        })
+    return out
+
+
+def serialize_raw(rows):
+    return APPOINTMENT_FIELDS.serialize_many(rows)
+
+
+def best_of(fn, rows, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rows = make_rows(n)
+
+    assert serialize_documents(rows) == serialize_raw(rows), "JSON shape changed"
+
+    doc_time = best_of(serialize_documents, rows, repeats)
+    raw_time = best_of(serialize_raw, rows, repeats)
+
+    print(f"Rows: {n} (best of {repeats})")
+    print(f"  document path: {doc_time * 1000:8.1f} ms  {n / doc_time:10.0f} rows/s")
+    print(f"  raw path:      {raw_time * 1000:8.1f} ms  {n / raw_time:10.0f} rows/s")
+    print(f"  speedup:       {doc_time / raw_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
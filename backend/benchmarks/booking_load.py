@@ -0,0 +1,386 @@
+"""
+Booking load generator and correctness checker
+
+Simulates many patients booking, cancelling and rescheduling against a few
+doctors through the HTTP API of a locally running server, then checks the
+database:
+
+  - no two active appointments (or pending reschedule proposals) of a doctor overlap
+  - every transition the API accepted is allowed by validate_status_transition
+  - each appointment's stored status matches the last transition the API accepted
+  - cancelled appointments hold no slot reservations; active ones hold their interval
+
+The load mix: patients book (mixed durations) and cancel, doctors confirm and
+propose reschedules, patients accept/reject proposals and request their own
+reschedules. An appointment is never acted on by two requests at once, so
+contention is on the doctors' time, which is what the booking path arbitrates.
+
+Setup (the server must use the same dedicated database):
+    MONGODB_URI=mongodb://localhost:27017/ayurwell_load SMTP_HOST=localhost SMTP_PORT=1025 \\
+        SCHEDULER_ENABLED=false python app.py
+    python benchmarks/booking_load.py --seed --patients 2000 --doctors 5 --operations 20000
+
+JWT_SECRET_KEY must match the server's; tokens are minted locally for the
+seeded users. Exits with status 1 when any invariant is violated.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token  # noqa: E402
+from mongoengine import connect, disconnect  # noqa: E402
+from models import User, Patient, Doctor, Appointment, SlotReservation  # noqa: E402
+from extra_routes import validate_status_transition  # noqa: E402
+import slot_reservations  # noqa: E402
+
+IST = timezone(timedelta(hours=5, minutes=30))
+DURATIONS = [15, 30, 45, 60]
+ACTIVE_STATUSES = {'pending', 'confirmed', 'doctor_rescheduled_pending', 'patient_rescheduled_pending'}
+RESCHEDULE_STATUSES = {'doctor_rescheduled_pending', 'patient_rescheduled_pending'}
+
+# action -> (weight, actor, status the appointment must have, status after success)
+ACTIONS = {
+    'book': (45, 'patient', None, 'pending'),
+    'cancel': (10, 'patient', ('pending', 'confirmed'), 'cancelled'),
+    'confirm': (20, 'doctor', ('pending', 'patient_rescheduled_pending'), 'confirmed'),
+    'doctorReschedule': (8, 'doctor', ('confirmed',), 'doctor_rescheduled_pending'),
+    'patientReschedule': (7, 'patient', ('confirmed',), 'patient_rescheduled_pending'),
+    'accept': (6, 'patient', ('doctor_rescheduled_pending',), 'confirmed'),
+    'reject': (4, 'patient', ('doctor_rescheduled_pending',), 'confirmed'),
+}
+
+
+# ==================== SETUP ====================
+
+def seed(patients, doctors):
+    """Create load-test users directly in the database"""
+    for model in (User, Patient, Doctor, Appointment, SlotReservation):
+        model.drop_collection()
+        model.ensure_indexes()
+
+    now = datetime.utcnow()
+    doctor_ids = [f"DR-LOAD{i:07d}" for i in range(doctors)]
+    patient_ids = [f"PT-LOAD{i:07d}" for i in range(patients)]
+    User._get_collection().insert_many(
+        [{'uid': uid, 'name': uid, 'email': f"{uid.lower()}@load.test", 'password': 'x',
+          'role': 'doctor', 'emailVerified': True, 'profileVersion': 0, 'createdAt': now} for uid in doctor_ids] +
+        [{'uid': uid, 'name': uid, 'email': f"{uid.lower()}@load.test", 'password': 'x',
+          'role': 'patient', 'emailVerified': True, 'profileVersion': 0, 'createdAt': now} for uid in patient_ids]
+    )
+    Doctor._get_collection().insert_many([
+        {'doctorId': uid, 'name': uid, 'account': {'status': 'verified'}, 'createdAt': now} for uid in doctor_ids
+    ])
+    Patient._get_collection().insert_many([
+        {'patientId': uid, 'name': uid, 'createdAt': now} for uid in patient_ids
+    ])
+
+
+def mint_tokens(users):
+    """Access tokens with the same claims the server issues at login"""
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = os.getenv("JWT_SECRET_KEY")
+    JWTManager(app)
+    with app.app_context():
+        return {
+            user['uid']: create_access_token(
+                identity=user['uid'],
+                additional_claims={'role': user['role'], 'name': user['name'], 'pv': user.get('profileVersion', 0)},
+                expires_delta=timedelta(hours=6)
+            )
+            for user in users
+        }
+
+
+# ==================== LOAD ====================
+
+class Recorder:
+    """Latencies and status codes per action"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.codes = {}
+
+    def add(self, action, code, latency):
+        with self.lock:
+            self.latencies.setdefault(action, []).append(latency)
+            counts = self.codes.setdefault(action, {})
+            counts[code] = counts.get(code, 0) + 1
+
+
+class Registry:
+    """Client-side view of every appointment the run created"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.appointments = {}  # id -> {doctorId, patientId, status, busy}
+        self.transitions = []   # (appointment id, action, from, to, status returned)
+
+    def claim(self, rng, actor_field, actor_id, statuses):
+        """Pick an idle appointment of this actor in one of the statuses and mark it busy"""
+        with self.lock:
+            candidates = [
+                (appt_id, appt) for appt_id, appt in self.appointments.items()
+                if appt[actor_field] == actor_id and appt['status'] in statuses and not appt['busy']
+            ]
+            if not candidates:
+                return None, None
+            appt_id, appt = rng.choice(candidates)
+            appt['busy'] = True
+            return appt_id, dict(appt)
+
+    def release(self, appt_id, action=None, new_status=None, returned=None):
+        with self.lock:
+            appt = self.appointments[appt_id]
+            if new_status is not None:
+                self.transitions.append((appt_id, action, appt['status'], new_status, returned))
+                appt['status'] = new_status
+            appt['busy'] = False
+
+
+def request(base_url, method, path, token, body=None):
+    data = json.dumps(body or {}).encode('utf-8')
+    req = urllib.request.Request(
+        base_url + path, data=data if method != 'GET' else None, method=method,
+        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+    )
+    began = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            code, payload = resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        code, payload = e.code, e.read()
+    except Exception:
+        return 0, {}, time.perf_counter() - began
+    latency = time.perf_counter() - began
+    try:
+        return code, json.loads(payload or b'{}'), latency
+    except ValueError:
+        return code, {}, latency
+
+
+def random_start(rng, first_day):
+    day = first_day + timedelta(days=rng.randrange(3))
+    minutes = 9 * 60 + rng.randrange(32) * 15  # 09:00 - 16:45 IST
+    return datetime(day.year, day.month, day.day, tzinfo=IST) + timedelta(minutes=minutes)
+
+
+def worker(index, args, tokens, doctor_ids, patient_ids, registry, recorder, budget):
+    rng = random.Random(index)
+    names = list(ACTIONS)
+    weights = [ACTIONS[name][0] for name in names]
+    first_day = datetime.now(IST).date() + timedelta(days=1)
+    base = args.base_url.rstrip('/') + '/appointments'
+
+    while True:
+        with budget['lock']:
+            if budget['left'] <= 0:
+                return
+            budget['left'] -= 1
+
+        action = rng.choices(names, weights)[0]
+        _, actor, statuses, new_status = ACTIONS[action]
+        actor_id = rng.choice(doctor_ids if actor == 'doctor' else patient_ids)
+        token = tokens[actor_id]
+
+        if action == 'book':
+            body = {
+                'doctor_id': rng.choice(doctor_ids),
+                'startTimestamp': random_start(rng, first_day).isoformat(),
+                'durationMinutes': rng.choice(DURATIONS)
+            }
+            code, payload, latency = request(base, 'POST', '/book', token, body)
+            recorder.add(action, code, latency)
+            if code == 201:
+                with registry.lock:
+                    registry.appointments[payload['id']] = {
+                        'doctorId': body['doctor_id'], 'patientId': actor_id,
+                        'status': 'pending', 'busy': False
+                    }
+            continue
+
+        field = 'doctorId' if actor == 'doctor' else 'patientId'
+        appt_id, _ = registry.claim(rng, field, actor_id, statuses)
+        if appt_id is None:
+            continue
+
+        body = {}
+        if action == 'cancel':
+            path = f'/{appt_id}/cancel'
+            body = {'reason': 'load test'}
+        elif action == 'confirm':
+            path = f'/{appt_id}/confirm'
+        elif action == 'doctorReschedule':
+            path = f'/{appt_id}/reschedule/doctor'
+            body = {'newStartTimestamp': random_start(rng, first_day).isoformat(), 'reason': 'load test'}
+        elif action == 'patientReschedule':
+            path = f'/{appt_id}/reschedule/patient'
+            body = {'newStartTimestamp': random_start(rng, first_day).isoformat()}
+        else:
+            path = f'/{appt_id}/reschedule/{action}'
+
+        code, payload, latency = request(base, 'POST', path, token, body)
+        recorder.add(action, code, latency)
+        if code == 200:
+            returned = payload.get('status') or (payload.get('appointment') or {}).get('status')
+            registry.release(appt_id, action, new_status, returned)
+        else:
+            registry.release(appt_id)
+
+
+# ==================== CHECKS ====================
+
+def check_database(registry):
+    """Invariant checks against the stored appointments and reservations"""
+    violations = []
+
+    # Every accepted transition is allowed and reported as the expected status
+    for appt_id, action, before, after, returned in registry.transitions:
+        ok, error = validate_status_transition(before, after)
+        if not ok:
+            violations.append(f"{action} on {appt_id}: API accepted {before} → {after} ({error})")
+        if returned and returned != after:
+            violations.append(f"{action} on {appt_id}: API reported {returned}, expected {after}")
+
+    rows = list(Appointment._get_collection().find({}, {
+        'doctorId': 1, 'status': 1, 'startTimestamp': 1, 'endTimestamp': 1,
+        'proposedStartTimestamp': 1, 'proposedEndTimestamp': 1
+    }))
+
+    # Stored status matches the client's record of accepted transitions
+    stored = {str(row['_id']): row for row in rows}
+    for appt_id, appt in registry.appointments.items():
+        row = stored.get(appt_id)
+        if row is None:
+            violations.append(f"appointment {appt_id} created by the API is missing")
+        elif row['status'] != appt['status']:
+            violations.append(f"appointment {appt_id}: stored status {row['status']}, expected {appt['status']}")
+
+    # No overlapping held time per doctor (current times and pending proposals)
+    intervals = {}
+    for row in rows:
+        if row['status'] not in ACTIVE_STATUSES:
+            continue
+        held = intervals.setdefault(row['doctorId'], [])
+        held.append((row['startTimestamp'], row['endTimestamp'], row['_id']))
+        if row['status'] in RESCHEDULE_STATUSES and row.get('proposedStartTimestamp'):
+            held.append((row['proposedStartTimestamp'], row['proposedEndTimestamp'], row['_id']))
+    for doctor_id, held in intervals.items():
+        held.sort()
+        latest_end, owner = None, None
+        for start, end, appt_id in held:
+            if latest_end is not None and start < latest_end and appt_id != owner:
+                violations.append(f"doctor {doctor_id}: {owner} and {appt_id} overlap at {start}")
+            if latest_end is None or end > latest_end:
+                latest_end, owner = end, appt_id
+
+    # Reservations follow the appointment lifecycle
+    reserved = {}
+    for res in SlotReservation._get_collection().find({}, {'appointmentId': 1, 'slotStart': 1}):
+        reserved.setdefault(res['appointmentId'], set()).add(res['slotStart'])
+    for row in rows:
+        slices = reserved.get(row['_id'], set())
+        if row['status'] == 'cancelled' and slices:
+            violations.append(f"cancelled appointment {row['_id']} still holds {len(slices)} slices")
+        elif row['status'] in ACTIVE_STATUSES:
+            expected = set(slot_reservations.slot_starts(row['startTimestamp'], row['endTimestamp']))
+            if not expected <= slices:
+                violations.append(f"active appointment {row['_id']} is missing reservations")
+
+    return violations
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(recorder, elapsed, total):
+    print("\n" + "="*60)
+    print("BOOKING LOAD TEST")
+    print("="*60)
+    print(f"  {total} operations in {elapsed:.1f}s → {total / elapsed:.0f} ops/s\n")
+    print(f"  {'action':<18}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  status codes")
+    for action in ACTIONS:
+        latencies = recorder.latencies.get(action, [])
+        if not latencies:
+            continue
+        codes = ', '.join(f"{code}×{n}" for code, n in sorted(recorder.codes[action].items()))
+        print(f"  {action:<18}{len(latencies):>7}{percentile(latencies, 50) * 1000:>9.1f}"
+              f"{percentile(latencies, 95) * 1000:>9.1f}{percentile(latencies, 99) * 1000:>9.1f}  {codes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000/api')
+    parser.add_argument('--uri', default=None, help='MongoDB URI (default: MONGODB_URI or localhost)')
+    parser.add_argument('--db', default='ayurwell_load', help='Load test database name (shared with the server)')
+    parser.add_argument('--seed', action='store_true', help='Drop and seed the load test database first')
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--doctors', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--operations', type=int, default=10000)
+    args = parser.parse_args()
+
+    load_dotenv()
+    connect(db=args.db, host=args.uri or os.getenv('MONGODB_URI') or 'mongodb://localhost:27017')
+    if Appointment._get_db().name != args.db:
+        print(f"✗ URI targets database '{Appointment._get_db().name}', expected '{args.db}'. "
+              f"Pass a URI without a database path.")
+        sys.exit(2)
+
+    try:
+        if args.seed:
+            seed(args.patients, args.doctors)
+
+        users = list(User._get_collection().find(
+            {'uid': {'$regex': '^(DR|PT)-LOAD'}}, {'uid': 1, 'role': 1, 'name': 1, 'profileVersion': 1}
+        ))
+        if not users:
+            print("✗ No load-test users found; run with --seed")
+            sys.exit(2)
+        tokens = mint_tokens(users)
+        doctor_ids = [u['uid'] for u in users if u['role'] == 'doctor']
+        patient_ids = [u['uid'] for u in users if u['role'] == 'patient']
+
+        registry, recorder = Registry(), Recorder()
+        budget = {'left': args.operations, 'lock': threading.Lock()}
+        threads = [
+            threading.Thread(target=worker, args=(i, args, tokens, doctor_ids, patient_ids, registry, recorder, budget))
+            for i in range(args.threads)
+        ]
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - began
+
+        report(recorder, elapsed, args.operations)
+
+        server_errors = sum(n for codes in recorder.codes.values() for code, n in codes.items() if code >= 500 or code == 0)
+        violations = check_database(registry)
+        for line in violations[:30]:
+            print(f"VIOLATION {line}")
+        if violations or server_errors:
+            print(f"\n✗ {len(violations)} invariant violation(s), {server_errors} server/transport error(s)")
+            sys.exit(1)
+        print(f"\n✓ All invariants hold ({len(registry.appointments)} appointments, "
+              f"{len(registry.transitions)} transitions)")
+    finally:
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Concurrent booking stress test
+
+Many threads book overlapping intervals with mixed durations for a handful
+of doctors, calling create_appointment() - the write path of
+POST /api/appointments/book - directly. Afterwards the database is checked:
+
+  - no two active appointments of a doctor overlap
+  - every appointment holds exactly the slices its interval covers
+  - no reservation exists without its appointment
+
+Usage:
+    python benchmarks/booking_stress.py
+    python benchmarks/booking_stress.py --threads 128 --attempts 50 --doctors 2
+
+Exits with status 1 when any invariant is violated. Runs against its own
+database (default 'ayurwell_stress'), never against the application database.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv  # noqa: E402
+from mongoengine import connect, disconnect  # noqa: E402
+from models import Appointment, SlotReservation, DoctorPatient, AdminStats, DailyStats  # noqa: E402
+import slot_reservations  # noqa: E402
+from extra_routes import create_appointment  # noqa: E402
+from slot_reservations import SlotConflict  # noqa: E402
+
+DURATIONS = [15, 30, 45, 60]
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def book(doctor_id, patient_id, start, duration):
+    """Book through the route's write path (reservations, insert, counters)"""
+    end = start + timedelta(minutes=duration)
+    create_appointment(doctor_id, patient_id, doctor_id, patient_id, start, end)
+
+
+def worker(index, args, day_start, results, lock):
+    rng = random.Random(index)
+    booked = conflicts = errors = 0
+    latencies = []
+    units = args.window_hours * 60 // slot_reservations.UNIT_MINUTES
+    for attempt in range(args.attempts):
+        doctor_id = f"DR-STRESS-{rng.randrange(args.doctors):04d}"
+        start = day_start + timedelta(minutes=rng.randrange(units) * slot_reservations.UNIT_MINUTES)
+        began = time.perf_counter()
+        try:
+            book(doctor_id, f"PT-STRESS-{index:04d}", start, rng.choice(DURATIONS))
+            booked += 1
+        except SlotConflict:
+            conflicts += 1
+        except Exception as e:
+            errors += 1
+            print(f"✗ worker {index}: {e}")
+        latencies.append(time.perf_counter() - began)
+    with lock:
+        results['booked'] += booked
+        results['conflicts'] += conflicts
+        results['errors'] += errors
+        results['latencies'].extend(latencies)
+
+
+def _naive_utc(dt):
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def verify():
+    """Check the booking invariants; returns a list of violation messages"""
+    violations = []
+    appointments = list(Appointment._get_collection().find(
+        {}, {'doctorId': 1, 'startTimestamp': 1, 'endTimestamp': 1}
+    ).sort([('doctorId', 1), ('startTimestamp', 1)]))
+
+    previous = None
+    for appt in appointments:
+        if previous and previous['doctorId'] == appt['doctorId'] \
+                and appt['startTimestamp'] < previous['endTimestamp']:
+            violations.append(
+                f"overlap: {previous['_id']} [{previous['startTimestamp']} - {previous['endTimestamp']}) "
+                f"and {appt['_id']} starting {appt['startTimestamp']}"
+            )
+        if previous is None or previous['doctorId'] != appt['doctorId'] \
+                or appt['endTimestamp'] > previous['endTimestamp']:
+            previous = appt
+
+    held = {}
+    for row in SlotReservation._get_collection().find({}, {'appointmentId': 1, 'slotStart': 1}):
+        held.setdefault(row['appointmentId'], set()).add(row['slotStart'])
+
+    ids = set()
+    for appt in appointments:
+        ids.add(appt['_id'])
+        expected = {_naive_utc(s) for s in slot_reservations.slot_starts(appt['startTimestamp'], appt['endTimestamp'])}
+        if held.get(appt['_id'], set()) != expected:
+            violations.append(f"reservations for {appt['_id']} do not match its interval")
+
+    for appointment_id in set(held) - ids:
+        violations.append(f"orphan reservations for {appointment_id}")
+    return violations
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default=None, help='MongoDB URI (default: MONGODB_URI or localhost)')
+    parser.add_argument('--db', default='ayurwell_stress', help='Stress test database name')
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--attempts', type=int, default=25, help='Bookings attempted per thread')
+    parser.add_argument('--doctors', type=int, default=3)
+    parser.add_argument('--window-hours', type=int, default=8, help='Hours of each doctor day being fought over')
+    args = parser.parse_args()
+
+    load_dotenv()
+    connect(db=args.db, host=args.uri or os.getenv('MONGODB_URI') or 'mongodb://localhost:27017',
+            maxPoolSize=args.threads + 10)
+    if Appointment._get_db().name != args.db:
+        print(f"✗ URI targets database '{Appointment._get_db().name}', expected '{args.db}'. "
+              f"Pass a URI without a database path.")
+        sys.exit(2)
+
+    try:
+        # create_appointment also writes admin counters and doctor-patient rows
+        for model in (Appointment, SlotReservation, DoctorPatient, AdminStats, DailyStats):
+            model.drop_collection()
+            model.ensure_indexes()
+
+        tomorrow = datetime.now(IST).date() + timedelta(days=1)
+        day_start = datetime(tomorrow.year, tomorrow.month, tomorrow.day, 9, tzinfo=IST)
+
+        results = {'booked': 0, 'conflicts': 0, 'errors': 0, 'latencies': []}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=worker, args=(i, args, day_start, results, lock))
+            for i in range(args.threads)
+        ]
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - began
+
+        attempts = args.threads * args.attempts
+        latencies = results['latencies']
+        print("\n" + "="*60)
+        print("BOOKING STRESS TEST")
+        print("="*60)
+        print(f"  threads × attempts : {args.threads} × {args.attempts} = {attempts}")
+        print(f"  booked / conflicts : {results['booked']} / {results['conflicts']} ({results['errors']} errors)")
+        print(f"  throughput         : {attempts / elapsed:.0f} attempts/s over {elapsed:.2f}s")
+        print(f"  latency p50/p95/p99: {percentile(latencies, 50) * 1000:.1f} / "
+              f"{percentile(latencies, 95) * 1000:.1f} / {percentile(latencies, 99) * 1000:.1f} ms")
+
+        violations = verify()
+        for line in violations[:20]:
+            print(f"VIOLATION {line}")
+        if violations or results['errors']:
+            print(f"\n✗ {len(violations)} invariant violation(s)")
+            sys.exit(1)
+        print("\n✓ No double bookings")
+    finally:
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
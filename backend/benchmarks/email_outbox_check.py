@@ -0,0 +1,198 @@
+"""
+Email outbox delivery check against a local aiosmtpd server
+
+Queues messages through EmailService.send_email with the outbox attached,
+lets the sender threads deliver them to an in-process aiosmtpd server and
+checks the outcome:
+
+  - every message is delivered exactly once
+  - messages whose first delivery is refused (451) succeed on a retry
+  - messages whose recipient is always refused (550) end up dead-lettered
+    after the configured number of attempts
+  - sent messages no longer store their bodies; dead letters keep them
+    under an expiry, and an admin retry re-queues them and delivers
+
+It also reports the request-path cost of send_email (one insert) and the
+outbox metrics.
+
+Usage:
+    pip install aiosmtpd
+    python benchmarks/email_outbox_check.py
+    python benchmarks/email_outbox_check.py --messages 2000 --workers 8
+
+Exits with status 1 when a check fails. Runs against its own database
+(default 'ayurwell_outbox'), never against the application database.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from email import message_from_bytes
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from mongoengine import connect, disconnect  # noqa: E402
+from models import OutboxMessage  # noqa: E402
+from email_service import email_service  # noqa: E402
+from email_outbox import EmailOutbox  # noqa: E402
+
+FLAKY_EVERY = 10  # Every 10th message is refused once
+MAX_ATTEMPTS = 3
+
+
+class StandInHandler:
+    """aiosmtpd handler that records deliveries and refuses some on purpose"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = Counter()
+        self.refused_once = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('dead-'):
+            return '550 5.1.1 Mailbox unavailable'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        subject = message_from_bytes(envelope.content)['Subject']
+        with self.lock:
+            if subject.endswith('[flaky]') and subject not in self.refused_once:
+                self.refused_once.add(subject)
+                return '451 4.3.0 Try again later'
+            self.received[subject] += 1
+        return '250 Message accepted for delivery'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default=None, help='MongoDB URI (default: MONGODB_URI or localhost)')
+    parser.add_argument('--db', default='ayurwell_outbox', help='Check database name')
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--dead', type=int, default=5, help='Messages to recipients that are always refused')
+    parser.add_argument('--workers', type=int, default=4, help='Sender threads')
+    parser.add_argument('--port', type=int, default=1025, help='aiosmtpd port (1025 skips STARTTLS)')
+    parser.add_argument('--timeout', type=int, default=120, help='Seconds to wait for the queue to drain')
+    args = parser.parse_args()
+
+    load_dotenv()
+    connect(db=args.db, host=args.uri or os.getenv('MONGODB_URI') or 'mongodb://localhost:27017')
+    if OutboxMessage._get_db().name != args.db:
+        print(f"✗ URI targets database '{OutboxMessage._get_db().name}', expected '{args.db}'. "
+              f"Pass a URI without a database path.")
+        sys.exit(2)
+
+    handler = StandInHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+
+    email_service.smtp_host, email_service.smtp_port = '127.0.0.1', args.port
+    email_service.smtp_user = email_service.smtp_password = None
+    email_service.from_email, email_service.from_name = 'check@example.com', 'Outbox Check'
+
+    outbox = EmailOutbox(
+        workers=args.workers,
+        base_delay=timedelta(milliseconds=200),
+        max_attempts=MAX_ATTEMPTS,
+        poll_seconds=0.2
+    )
+    email_service.outbox = outbox
+
+    try:
+        OutboxMessage.drop_collection()
+        OutboxMessage.ensure_indexes()
+
+        expected = []
+        enqueue_latencies = []
+        for i in range(args.messages):
+            subject = f"Check {i:06d}" + (' [flaky]' if i % FLAKY_EVERY == 0 else '')
+            expected.append(subject)
+            began = time.perf_counter()
+            email_service.send_email(f"user-{i}@example.com", subject, f"<p>{subject}</p>", subject)
+            enqueue_latencies.append(time.perf_counter() - began)
+        for i in range(args.dead):
+            email_service.send_email(f"dead-{i}@example.com", f"Dead {i:06d}", "<p>dead</p>")
+
+        began = time.perf_counter()
+        outbox.start()
+        deadline = time.time() + args.timeout
+        while time.time() < deadline:
+            if not OutboxMessage.objects(status__in=['pending', 'sending']).count():
+                break
+            time.sleep(0.2)
+        elapsed = time.perf_counter() - began
+
+        # Admin retry: re-queue one dead letter; the senders fail it through again
+        retry_failures = []
+        collection = OutboxMessage._get_collection()
+        dead = collection.find_one({'status': 'dead'})
+        if dead is not None:
+            if not outbox.retry(str(dead['_id'])):
+                retry_failures.append("retry() did not re-queue a dead letter")
+            elif 'purgeAt' in collection.find_one({'_id': dead['_id']}):
+                retry_failures.append("a retried dead letter still expires")
+            while time.time() < deadline and collection.find_one(
+                    {'_id': dead['_id'], 'status': {'$in': ['pending', 'sending']}}):
+                time.sleep(0.2)
+            if collection.find_one({'_id': dead['_id']})['status'] != 'dead':
+                retry_failures.append("a retried dead letter did not end dead again")
+        outbox.stop(timeout=10)
+
+        failures = retry_failures
+        for subject in expected:
+            if handler.received[subject] != 1:
+                failures.append(f"{subject!r} delivered {handler.received[subject]} times")
+        for row in OutboxMessage.objects(to__startswith='dead-'):
+            if row.status != 'dead' or row.attempts != MAX_ATTEMPTS:
+                failures.append(f"{row.to} is {row.status} after {row.attempts} attempts")
+        flaky = OutboxMessage.objects(subject__endswith='[flaky]')
+        if any(row.attempts != 2 for row in flaky):
+            failures.append("a refused-once message did not succeed on its second attempt")
+
+        if collection.count_documents({'status': 'sent', '$or': [
+            {'htmlBody': {'$exists': True}}, {'textBody': {'$exists': True}}
+        ]}):
+            failures.append("sent messages still store their bodies")
+        if collection.count_documents({'status': 'dead', '$or': [
+            {'htmlBody': {'$exists': False}}, {'purgeAt': None}
+        ]}):
+            failures.append("a dead letter lost its body or has no expiry")
+
+        metrics = outbox.metrics()
+        print("\n" + "="*60)
+        print("EMAIL OUTBOX CHECK")
+        print("="*60)
+        print(f"  messages / dead    : {args.messages} / {args.dead} with {args.workers} senders")
+        print(f"  send_email p50/p99 : {percentile(enqueue_latencies, 50) * 1000:.2f} / "
+              f"{percentile(enqueue_latencies, 99) * 1000:.2f} ms (request-path cost)")
+        print(f"  drained in         : {elapsed:.2f}s ({args.messages / elapsed:.0f} messages/s)")
+        print(f"  depth              : {metrics['depth']}")
+        print(f"  delivery latency   : avg {metrics['deliveryLatency']['avgMs'] or 0:.0f} ms, "
+              f"max {metrics['deliveryLatency']['maxMs'] or 0:.0f} ms")
+        print(f"  counters           : {metrics['process']}")
+
+        for line in failures[:20]:
+            print(f"FAILURE {line}")
+        if failures:
+            print(f"\n✗ {len(failures)} check(s) failed")
+            sys.exit(1)
+        print("\n✓ Every message delivered once; retries and dead letters behaved")
+    finally:
+        email_service.outbox = None
+        controller.stop()
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Email rendering cost per message
+
+Calls every EmailService send_* method through a subclass whose send_email
+captures the rendered message instead of sending it, and reports the CPU
+time per rendered message (and per MIME message built from it). No SMTP
+server or database is needed.
+
+Usage:
+    python benchmarks/email_render_bench.py
+    python benchmarks/email_render_bench.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from email_service import EmailService  # noqa: E402
+
+TIME = "Monday, March 03, 2025 at 10:30 AM"
+NEW_TIME = "Tuesday, March 04, 2025 at 11:00 AM"
+
+CALLS = [
+    ('send_new_booking_request', ('dr@example.com', 'Asha Rao', 'Ravi Kumar', TIME)),
+    ('send_appointment_confirmed', ('pt@example.com', 'Ravi Kumar', 'Asha Rao', TIME)),
+    ('send_appointment_cancelled', ('pt@example.com', 'Ravi Kumar', 'the doctor', 'Asha Rao', 'Ravi Kumar', TIME, 'Clinic closed')),
+    ('send_patient_reschedule_request', ('dr@example.com', 'Asha Rao', 'Ravi Kumar', TIME, NEW_TIME)),
+    ('send_doctor_reschedule_proposal', ('pt@example.com', 'Ravi Kumar', 'Asha Rao', TIME, NEW_TIME, 'Travelling')),
+    ('send_reschedule_accepted', ('dr@example.com', 'Asha Rao', 'Ravi Kumar', NEW_TIME)),
+    ('send_reschedule_rejected_to_doctor', ('dr@example.com', 'Asha Rao', 'Ravi Kumar', TIME, NEW_TIME)),
+    ('send_appointment_completed', ('pt@example.com', 'Ravi Kumar', 'Asha Rao', TIME)),
+    ('send_reschedule_rejected_to_patient', ('pt@example.com', 'Asha Rao', 'Ravi Kumar', TIME, NEW_TIME)),
+    ('send_otp_email', ('pt@example.com', '482913', 'signup')),
+    ('send_email_changed_notification', ('pt@example.com', 'Ravi Kumar')),
+    ('send_password_changed_notification', ('pt@example.com', 'Ravi Kumar')),
+]
+
+
+class CapturingService(EmailService):
+    """Renders messages without sending them"""
+    def send_email(self, to_email, subject, html_body, text_body=None):
+        return to_email, subject, html_body, text_body
+
+
+def measure(fn, iterations):
+    began = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - began) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5000, help='Renders per template')
+    args = parser.parse_args()
+
+    service = CapturingService()
+    print("\n" + "="*60)
+    print("EMAIL RENDERING BENCHMARK")
+    print("="*60)
+    print(f"  {'template':<38} {'render µs':>10} {'+ MIME µs':>10} {'html bytes':>11}")
+
+    total_render = total_mime = 0.0
+    for name, call_args in CALLS:
+        method = getattr(service, name)
+        render_us = measure(lambda: method(*call_args), args.iterations)
+        message = method(*call_args)
+        mime_us = measure(lambda: service._build_message(*message), max(1, args.iterations // 5))
+        total_render += render_us
+        total_mime += mime_us
+        has_text = '' if message[3] else ' (no text part)'
+        print(f"  {name:<38} {render_us:>10.2f} {mime_us:>10.2f} {len(message[2]):>11}{has_text}")
+
+    print(f"\n  mean render: {total_render / len(CALLS):.2f} µs/message, "
+          f"mean MIME build: {total_mime / len(CALLS):.2f} µs/message")
+
+
+if __name__ == '__main__':
+    main()
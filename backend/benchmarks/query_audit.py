@@ -0,0 +1,316 @@
+"""
+Query-plan auditor
+
+Runs each route's representative queries with explain() against a seeded
+database and reports collection scans, in-memory sorts and poor
+docs-examined/returned ratios. For every flagged query it proposes a
+meta['indexes'] entry (equality fields, then sort fields, then range
+fields).
+
+Usage:
+    python benchmarks/query_audit.py --seed                 # seed + audit
+    python benchmarks/query_audit.py --save-baseline audit.json
+    python benchmarks/query_audit.py --baseline audit.json --strict
+
+Strict mode exits with status 1 when any query is flagged, or, with
+--baseline, when any query regressed compared to the saved baseline.
+
+The audit always runs against its own database (default 'ayurwell_audit'),
+never against the application database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv  # noqa: E402
+from mongoengine import connect, disconnect  # noqa: E402
+from models import (  # noqa: E402
+    User, Patient, Doctor, Assessment, Appointment, DietPlan, Progress, OTPVerification,
+    DoctorPatient
+)
+import doctor_patients  # noqa: E402
+
+MAX_EXAMINED_RATIO = 10.0  # docs examined per doc returned before a query is flagged
+ACTIVE_STATUSES = ['pending', 'confirmed', 'doctor_rescheduled_pending', 'patient_rescheduled_pending']
+
+
+# ==================== SEEDING ====================
+
+def seed(patients=2000, doctors=20, appointments_per_patient=10, progress_days=60):
+    """Insert synthetic data shaped like production into the audit database"""
+    rng = random.Random(42)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    for model in (User, Patient, Doctor, Assessment, Appointment, DietPlan, Progress, OTPVerification,
+                  DoctorPatient):
+        model.drop_collection()
+        model.ensure_indexes()
+
+    doctor_ids = [f"DR-{i:012d}" for i in range(doctors)]
+    patient_ids = [f"PT-{i:012d}" for i in range(patients)]
+
+    User._get_collection().insert_many(
+        [{'uid': uid, 'name': uid, 'email': f"{uid.lower()}@example.com", 'password': 'x',
+          'role': 'doctor', 'emailVerified': True, 'createdAt': now} for uid in doctor_ids] +
+        [{'uid': uid, 'name': uid, 'email': f"{uid.lower()}@example.com", 'password': 'x',
+          'role': 'patient', 'emailVerified': True, 'createdAt': now} for uid in patient_ids]
+    )
+    Doctor._get_collection().insert_many([
+        {'doctorId': uid, 'name': uid, 'specialization': 'General',
+         'account': {'status': 'verified' if i % 4 else 'pending'}, 'createdAt': now}
+        for i, uid in enumerate(doctor_ids)
+    ])
+    Patient._get_collection().insert_many([
+        {'patientId': uid, 'name': uid, 'personalInfo': {}, 'medicalInfo': {}, 'createdAt': now}
+        for uid in patient_ids
+    ])
+
+    appts, plans, assessments, progress = [], [], [], []
+    for pid in patient_ids:
+        did = rng.choice(doctor_ids)
+        for _ in range(appointments_per_patient):
+            start = now + timedelta(minutes=30 * rng.randint(-20000, 2000))
+            appts.append({
+                'doctorId': did, 'patientId': pid, 'doctorName': did, 'patientName': pid,
+                'startTimestamp': start, 'endTimestamp': start + timedelta(minutes=30),
+                'status': rng.choice(['pending', 'confirmed', 'completed', 'cancelled']),
+                'createdAt': start - timedelta(days=3), 'updatedAt': start - timedelta(days=1)
+            })
+        for i in range(2):
+            plans.append({
+                'patientId': pid, 'createdBy': did, 'status': rng.choice(['draft', 'active', 'completed']),
+                'content': {'summary': {'totalCalories': 1800}, 'mealPlan': []},
+                'generatedAt': now - timedelta(days=30 * i), 'lastModified': now - timedelta(days=30 * i)
+            })
+            assessments.append({
+                'assessmentId': f"ASMT-{uuid.uuid4().hex[:12].upper()}", 'patientId': pid,
+                'doctorId': did, 'createdAt': now - timedelta(days=30 * i), 'assessment': {}
+            })
+        for day in range(progress_days):
+            progress.append({
+                'patientId': pid,
+                'date': (now - timedelta(days=day)).replace(hour=0, minute=0, second=0),
+                'waterIntake': rng.randint(500, 3000), 'sleepHours': rng.uniform(4, 9)
+            })
+
+    Appointment._get_collection().insert_many(appts)
+    DietPlan._get_collection().insert_many(plans)
+    Assessment._get_collection().insert_many(assessments)
+    Progress._get_collection().insert_many(progress)
+    doctor_patients.rebuild()
+
+    print(f"Seeded {patients} patients, {doctors} doctors, {len(appts)} appointments, "
+          f"{len(progress)} progress rows")
+
+
+# ==================== REPRESENTATIVE QUERIES ====================
+
+def representative_queries():
+    """(name, route, queryset) for the hot query of every list/lookup route"""
+    doctor = Doctor.objects.only('doctorId').first()
+    patient = Patient.objects.only('patientId').first()
+    did = doctor.doctorId if doctor else 'DR-000000000000'
+    pid = patient.patientId if patient else 'PT-000000000000'
+    now = datetime.utcnow()
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return [
+        ('user_by_uid', 'identity lookups', User.objects(uid=pid)),
+        ('user_by_email', 'POST /api/auth/login', User.objects(email=f"{pid.lower()}@example.com")),
+        ('patient_by_id', 'identity lookups', Patient.objects(patientId=pid)),
+        ('doctor_by_id', 'identity lookups', Doctor.objects(doctorId=did)),
+        ('verified_doctors', 'GET /api/doctors', Doctor.objects(account__status='verified')),
+        ('patient_diet_plans', 'GET /api/diet-plans/<patient_id>',
+         DietPlan.objects(patientId=pid, status__in=['active', 'completed', 'cancelled'])
+         .order_by('-lastModified', '-id')),
+        ('doctor_diet_plans', 'GET /api/diet-plans',
+         DietPlan.objects(createdBy=did).order_by('-lastModified', '-id')),
+        ('progress_for_day', 'POST /api/progress',
+         Progress.objects(patientId=pid, date__gte=day, date__lt=day + timedelta(days=1))),
+        ('progress_history', 'GET /api/progress/<patient_id>',
+         Progress.objects(patientId=pid).order_by('-date', '-id')),
+        ('patient_appointments', 'GET /api/appointments/me (patient)',
+         Appointment.objects(patientId=pid).order_by('-startTimestamp', '-id')),
+        ('doctor_appointments', 'GET /api/appointments/me (doctor)',
+         Appointment.objects(doctorId=did).order_by('-startTimestamp', '-id')),
+        ('doctor_upcoming', 'GET /api/appointments/doctor/<id>/upcoming',
+         Appointment.objects(doctorId=did, status__in=['pending', 'confirmed']).order_by('startTimestamp')),
+        ('slot_conflict', 'POST /api/appointments/book',
+         Appointment.objects(doctorId=did, startTimestamp=now, status__in=ACTIVE_STATUSES)),
+        ('auto_complete_sweep', 'auto_complete_appointments',
+         Appointment.objects(status='confirmed', endTimestamp__lt=now)),
+        ('doctor_roster', 'GET /api/appointments/doctor/patients',
+         DoctorPatient.objects(doctorId=did, rostered=True).order_by('-lastAppointmentAt', '-id')),
+        ('doctor_patient_access', 'patient_access_required',
+         DoctorPatient.objects(doctorId=did, patientId=pid)),
+        ('patient_assessments', 'GET /api/appointments/assessments/patient/<id>',
+         Assessment.objects(patientId=pid).order_by('-createdAt', '-id')),
+        ('doctor_assessments', 'GET /api/appointments/assessments/doctor/<id>',
+         Assessment.objects(doctorId=did).order_by('-createdAt', '-id')),
+        ('admin_appointments', 'GET /api/admin/appointments',
+         Appointment.objects().order_by('-startTimestamp', '-id')),
+        ('otp_lookup', 'POST /api/auth/verify-email',
+         OTPVerification.objects(email='x@example.com', purpose='signup', verified=False).order_by('-createdAt')),
+    ]
+
+
+# ==================== PLAN ANALYSIS ====================
+
+def _walk(stage):
+    while stage:
+        yield stage
+        inputs = stage.get('inputStages') or ([stage['inputStage']] if 'inputStage' in stage else [])
+        for child in inputs[1:]:
+            yield from _walk(child)
+        stage = inputs[0] if inputs else None
+
+
+def _propose_index(queryset):
+    """Equality fields, then sort fields, then range fields (ESR rule)"""
+    query = queryset._query
+    equality, ranges = [], []
+    for key, value in query.items():
+        if key.startswith('$'):
+            continue
+        if isinstance(value, dict) and any(k in value for k in ('$gt', '$gte', '$lt', '$lte', '$ne')):
+            ranges.append(key)
+        else:
+            equality.append(key)
+    sort = [('-' if direction < 0 else '') + key for key, direction in (queryset._ordering or [])]
+    fields, seen = [], set()
+    for name in equality + sort + ranges:
+        bare = name.lstrip('-')
+        if bare in seen:
+            continue
+        seen.add(bare)
+        fields.append(name.replace('_id', 'id') if bare == '_id' else name)
+    return {'fields': fields} if fields else None
+
+
+def explain(name, route, queryset):
+    """Run explain() and summarize the winning plan"""
+    plan = queryset.limit(50).explain()
+    winning = plan.get('queryPlanner', {}).get('winningPlan', {})
+    stats = plan.get('executionStats', {})
+    stages = [s.get('stage') for s in _walk(winning.get('queryPlan', winning))]
+
+    examined = stats.get('totalDocsExamined', 0)
+    returned = stats.get('nReturned', 0)
+    ratio = examined / max(returned, 1)
+
+    issues = []
+    if 'COLLSCAN' in stages:
+        issues.append('COLLSCAN')
+    if 'SORT' in stages:
+        issues.append('IN_MEMORY_SORT')
+    if ratio > MAX_EXAMINED_RATIO:
+        issues.append(f'EXAMINED_RATIO>{MAX_EXAMINED_RATIO:g}')
+
+    return {
+        'name': name,
+        'route': route,
+        'collection': queryset._document._get_collection_name(),
+        'model': queryset._document.__name__,
+        'stages': stages,
+        'docsExamined': examined,
+        'keysExamined': stats.get('totalKeysExamined', 0),
+        'returned': returned,
+        'ratio': round(ratio, 2),
+        'issues': issues,
+        'proposedIndex': _propose_index(queryset) if issues else None
+    }
+
+
+def compare(results, baseline):
+    """Return human-readable regressions versus a saved baseline"""
+    previous = {r['name']: r for r in baseline}
+    regressions = []
+    for r in results:
+        before = previous.get(r['name'])
+        if not before:
+            continue
+        new_issues = set(r['issues']) - set(before['issues'])
+        if new_issues:
+            regressions.append(f"{r['name']}: new issues {sorted(new_issues)}")
+        elif r['ratio'] > max(before['ratio'] * 2, 1.0):
+            regressions.append(f"{r['name']}: examined ratio {before['ratio']} -> {r['ratio']}")
+    return regressions
+
+
+def report(results):
+    print(f"\n{'query':<24} {'stages':<34} {'examined':>9} {'returned':>9} {'ratio':>7}  issues")
+    print('-' * 110)
+    for r in results:
+        stages = '>'.join(reversed([s for s in r['stages'] if s]))[:34]
+        print(f"{r['name']:<24} {stages:<34} {r['docsExamined']:>9} {r['returned']:>9} "
+              f"{r['ratio']:>7}  {', '.join(r['issues']) or 'ok'}")
+
+    proposals = {}
+    for r in results:
+        if r['proposedIndex']:
+            proposals.setdefault(r['model'], []).append((r['name'], r['proposedIndex']))
+    if proposals:
+        print("\nProposed meta['indexes'] entries:")
+        for model, entries in proposals.items():
+            print(f"  {model}:")
+            for name, index in entries:
+                print(f"    {json.dumps(index)},  # {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default=None, help='MongoDB URI (default: MONGODB_URI or localhost)')
+    parser.add_argument('--db', default='ayurwell_audit', help='Audit database name')
+    parser.add_argument('--seed', action='store_true', help='Drop and seed the audit database first')
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--doctors', type=int, default=20)
+    parser.add_argument('--strict', action='store_true', help='Exit 1 on any issue or regression')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='Write results as a baseline JSON')
+    args = parser.parse_args()
+
+    load_dotenv()
+    connect(db=args.db, host=args.uri or os.getenv('MONGODB_URI') or 'mongodb://localhost:27017')
+    # A URI that names its own database would override --db; never seed the app database
+    if Appointment._get_db().name != args.db:
+        print(f"✗ URI targets database '{Appointment._get_db().name}', expected '{args.db}'. "
+              f"Pass a URI without a database path.")
+        sys.exit(2)
+
+    try:
+        if args.seed:
+            seed(patients=args.patients, doctors=args.doctors)
+
+        results = [explain(*q) for q in representative_queries()]
+        report(results)
+
+        if args.save_baseline:
+            with open(args.save_baseline, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\nBaseline written to {args.save_baseline}")
+
+        failures = []
+        if args.baseline:
+            with open(args.baseline) as f:
+                failures = compare(results, json.load(f))
+            for line in failures:
+                print(f"REGRESSION {line}")
+        elif args.strict:
+            failures = [f"{r['name']}: {', '.join(r['issues'])}" for r in results if r['issues']]
+
+        if args.strict and failures:
+            print(f"\n✗ Query audit failed ({len(failures)} problem(s))")
+            sys.exit(1)
+        print("\n✓ Query audit complete")
+    finally:
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+SMTP throughput: connection per message versus pooled sessions
+
+Sends the same messages to an in-process aiosmtpd server four ways:
+
+  single      a new connection (EHLO/STARTTLS/LOGIN) for every message,
+              as EmailService did before pooling (SMTP_POOL_SIZE=0)
+  pooled      deliver() one message at a time, reusing pooled sessions
+  threaded    deliver() from several threads sharing the pool
+  send_many   batches over one session per batch
+
+Usage:
+    pip install aiosmtpd
+    python benchmarks/smtp_pool_bench.py
+    python benchmarks/smtp_pool_bench.py --messages 2000 --handshake-ms 40
+
+--handshake-ms delays every EHLO to stand in for the network round trips
+and TLS handshake of a remote server such as Gmail; with 0 the numbers only
+show the local protocol overhead.
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from email_service import EmailService  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self, handshake_seconds):
+        self.handshake_seconds = handshake_seconds
+        self.lock = threading.Lock()
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if self.handshake_seconds:
+            await asyncio.sleep(self.handshake_seconds)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.received += 1
+        return '250 Message accepted for delivery'
+
+
+def make_service(port, pool_size):
+    service = EmailService()
+    service.smtp_host, service.smtp_port = '127.0.0.1', port
+    service.smtp_user = service.smtp_password = None
+    service.from_email, service.from_name = 'bench@example.com', 'SMTP Bench'
+    service.pool.size = pool_size
+    return service
+
+
+def messages(count, tag):
+    return [
+        (f"user-{i}@example.com", f"{tag} {i:06d}", f"<p>Message {i}</p>", f"Message {i}")
+        for i in range(count)
+    ]
+
+
+def run_single(service, batch):
+    for message in batch:
+        service.deliver(*message)
+
+
+def run_threaded(service, batch, threads):
+    chunks = [batch[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=run_single, args=(service, chunk)) for chunk in chunks]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+def run_send_many(service, batch, batch_size):
+    for i in range(0, len(batch), batch_size):
+        errors = [e for e in service.send_many(batch[i:i + batch_size]) if e is not None]
+        if errors:
+            raise errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--handshake-ms', type=float, default=0, help='Artificial delay on every EHLO')
+    parser.add_argument('--port', type=int, default=1025, help='aiosmtpd port (1025 skips STARTTLS)')
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.handshake_ms / 1000)
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+
+    modes = [
+        ('single', 0, lambda s, b: run_single(s, b)),
+        ('pooled', args.pool_size, lambda s, b: run_single(s, b)),
+        ('threaded', args.pool_size, lambda s, b: run_threaded(s, b, args.threads)),
+        ('send_many', args.pool_size, lambda s, b: run_send_many(s, b, args.batch_size)),
+    ]
+
+    results = []
+    try:
+        for name, pool_size, run in modes:
+            service = make_service(args.port, pool_size)
+            batch = messages(args.messages, name)
+            before = handler.received
+            began = time.perf_counter()
+            with redirect_stdout(io.StringIO()):  # EmailService logs every send
+                run(service, batch)
+            elapsed = time.perf_counter() - began
+            service.pool.close()
+            delivered = handler.received - before
+            results.append((name, delivered, elapsed, dict(service.pool.stats)))
+    finally:
+        controller.stop()
+
+    print("\n" + "="*60)
+    print("SMTP POOL BENCHMARK")
+    print("="*60)
+    print(f"  {args.messages} messages per mode, handshake delay {args.handshake_ms:g} ms\n")
+    baseline = results[0][1] / results[0][2]
+    failed = False
+    for name, delivered, elapsed, stats in results:
+        rate = delivered / elapsed
+        print(f"  {name:<10} {rate:8.0f} msg/s  ({rate / baseline:5.1f}x)  "
+              f"connections opened: {stats['opened']}")
+        failed = failed or delivered != args.messages
+    if failed:
+        print("\n✗ Some messages were not delivered")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
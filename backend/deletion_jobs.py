@@ -0,0 +1,339 @@
+"""
+Background cascade deletion of users
+
+Deleting a user tombstones the User record (deletedAt, profileVersion bump)
+and queues a DeletionJob; the JWT blocklist check (auth_middleware.
+is_token_revoked) then rejects the user's tokens on every protected route. A worker thread then
+removes the user's records step by step in _id batches, recording the step
+index and per-step counts on the job so a crashed or restarted worker
+resumes where it stopped. Every step is idempotent. A failed attempt is
+retried by resume_deletion_jobs once its exponential backoff has passed.
+
+Orphans (records whose owner no longer has a User) can be listed with
+find_orphans() and removed with cleanup_orphans(), which reuses the same
+cascade.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pymongo import ReturnDocument
+from models import (
+    User, Patient, Doctor, Assessment, DietPlan, Progress, ProgressBucket,
+    Appointment, SlotReservation, DoctorPatient, PendingNotification, NamePropagationJob,
+    DeletionJob, get_ist_now
+)
+from identity_cache import identity_cache
+import admin_stats
+import random
+import threading
+import traceback
+import uuid
+
+BATCH_SIZE = 1000
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+BASE_DELAY = timedelta(seconds=30)  # 30s, 1m, 2m, 4m between attempts
+MAX_DELAY = timedelta(minutes=30)
+
+# (step name, document, owner field, roles it applies to - None for every role).
+# Profiles go first so the user disappears from listings immediately; the
+# User record goes last so an unfinished job stays discoverable.
+CASCADE_STEPS = [
+    ('patient', Patient, 'patientId', ('patient',)),
+    ('doctor', Doctor, 'doctorId', ('doctor',)),
+    ('assessmentsAsPatient', Assessment, 'patientId', ('patient',)),
+    ('assessmentsAsDoctor', Assessment, 'doctorId', ('doctor',)),
+    ('dietPlans', DietPlan, 'patientId', ('patient',)),
+    ('progress', Progress, 'patientId', ('patient',)),
+    ('progressBuckets', ProgressBucket, 'patientId', ('patient',)),
+    ('appointmentsAsPatient', Appointment, 'patientId', None),
+    ('appointmentsAsDoctor', Appointment, 'doctorId', None),
+    ('slotReservationsAsPatient', SlotReservation, 'patientId', None),
+    ('slotReservationsAsDoctor', SlotReservation, 'doctorId', None),
+    ('doctorPatientsAsPatient', DoctorPatient, 'patientId', None),
+    ('doctorPatientsAsDoctor', DoctorPatient, 'doctorId', None),
+    ('pendingNotifications', PendingNotification, 'uid', None),
+    ('namePropagationJobs', NamePropagationJob, 'uid', None),
+    ('user', User, 'uid', None),
+]
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='deletion-jobs')
+_queued = set()  # Job IDs waiting in or running on _executor
+_queued_lock = threading.Lock()
+
+
+def _submit(job_id):
+    """Queue a job on the executor unless it is already queued or running here"""
+    with _queued_lock:
+        if job_id in _queued:
+            return False
+        _queued.add(job_id)
+    _executor.submit(_run_queued, job_id)
+    return True
+
+
+def _run_queued(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        with _queued_lock:
+            _queued.discard(job_id)
+
+
+def steps_for(role):
+    """Cascade steps for a role; role=None (orphan cleanup) runs every step"""
+    return [
+        step for step in CASCADE_STEPS
+        if role is None or step[3] is None or role in step[3]
+    ]
+
+
+def job_to_dict(job):
+    """Serialize a DeletionJob for the job-status endpoint"""
+    steps = steps_for(job.role)
+    return {
+        "jobId": job.jobId,
+        "uid": job.uid,
+        "role": job.role,
+        "status": job.status,
+        "step": steps[job.stepIndex][0] if job.stepIndex < len(steps) else None,
+        "stepsCompleted": job.stepIndex,
+        "stepsTotal": len(steps),
+        "deleted": job.deleted or {},
+        "attempts": job.attempts,
+        "error": job.error,
+        "nextAttemptAt": job.nextAttemptAt.isoformat() if job.nextAttemptAt else None,
+        "createdAt": job.createdAt.isoformat() if job.createdAt else None,
+        "startedAt": job.startedAt.isoformat() if job.startedAt else None,
+        "finishedAt": job.finishedAt.isoformat() if job.finishedAt else None
+    }
+
+
+# ==================== ENQUEUE ====================
+
+def _active_job(uid):
+    return DeletionJob.objects(uid=uid, status__in=['pending', 'running']).first()
+
+
+def _create_job(uid, role, was_verified=False):
+    job = DeletionJob(
+        jobId=f"DEL-{uuid.uuid4().hex[:12].upper()}",
+        uid=uid,
+        role=role,
+        wasVerified=was_verified
+    )
+    job.save()
+    _submit(job.jobId)
+    return job
+
+
+def enqueue_user_deletion(user):
+    """
+    Tombstone a user and queue the cascade deletion of their records
+
+    Args:
+        user: User document
+
+    Returns:
+        DeletionJob: The new job, or the one already queued for this user
+    """
+    existing = _active_job(user.uid)
+    if existing:
+        return existing
+
+    was_verified = False
+    if user.role == 'doctor':
+        doctor = Doctor.objects(doctorId=user.uid).only('account').first()
+        was_verified = bool(doctor and (doctor.account or {}).get('status') == 'verified')
+
+    User.objects(uid=user.uid).update_one(set__deletedAt=get_ist_now(), inc__profileVersion=1)
+    identity_cache.invalidate(user.uid)
+    return _create_job(user.uid, user.role, was_verified)
+
+
+# ==================== WORKER ====================
+
+def _claim(job_id):
+    """Take the job's lease; returns the raw job or None if another worker holds it"""
+    now = get_ist_now()
+    return DeletionJob._get_collection().find_one_and_update(
+        {
+            'jobId': job_id,
+            'status': {'$in': ['pending', 'running']},
+            '$and': [
+                {'$or': [{'lockedUntil': None}, {'lockedUntil': {'$lt': now}}]},
+                {'$or': [{'nextAttemptAt': None}, {'nextAttemptAt': {'$lte': now}}]}
+            ]
+        },
+        {
+            '$set': {'status': 'running', 'lockedUntil': now + LEASE, 'error': None},
+            '$min': {'startedAt': now},
+            '$inc': {'attempts': 1}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _delete_batch(document, field, uid):
+    collection = document._get_collection()
+    db_field = document._fields[field].db_field
+    ids = [row['_id'] for row in collection.find({db_field: uid}, {'_id': 1}).limit(BATCH_SIZE)]
+    if not ids:
+        return 0
+    return collection.delete_many({'_id': {'$in': ids}}).deleted_count
+
+
+def run_job(job_id):
+    """Run (or resume) one deletion job until it completes or fails"""
+    job = _claim(job_id)
+    if job is None:
+        return
+
+    jobs = DeletionJob._get_collection()
+    uid = job['uid']
+    try:
+        steps = steps_for(job.get('role'))
+        index = job.get('stepIndex', 0)
+        while index < len(steps):
+            name, document, field, _ = steps[index]
+            while True:
+                deleted = _delete_batch(document, field, uid)
+                if deleted:
+                    jobs.update_one({'_id': job['_id']}, {
+                        '$inc': {f'deleted.{name}': deleted},
+                        '$set': {'lockedUntil': get_ist_now() + LEASE}
+                    })
+                if deleted < BATCH_SIZE:
+                    break
+            index += 1
+            jobs.update_one({'_id': job['_id']}, {'$set': {'stepIndex': index}})
+
+        finished = jobs.find_one_and_update(
+            {'_id': job['_id']},
+            {'$set': {'status': 'completed', 'finishedAt': get_ist_now(), 'lockedUntil': None}},
+            return_document=ReturnDocument.AFTER
+        )
+        identity_cache.invalidate(uid)
+
+        if job.get('role'):
+            counts = finished.get('deleted', {})
+            admin_stats.record_user_deleted(
+                job['role'],
+                job.get('wasVerified', False),
+                counts.get('appointmentsAsPatient', 0) + counts.get('appointmentsAsDoctor', 0)
+            )
+        print(f"✓ Deletion job {job_id} completed for {uid}")
+
+    except Exception as e:
+        attempts = job.get('attempts', 1)
+        status = 'failed' if attempts >= MAX_ATTEMPTS else 'pending'
+        jobs.update_one({'_id': job['_id']}, {
+            '$set': {
+                'status': status,
+                'error': str(e),
+                'lockedUntil': None,
+                'nextAttemptAt': get_ist_now() + backoff(attempts)
+            }
+        })
+        print(f" Error in deletion job {job_id}: {e}")
+        traceback.print_exc()
+
+
+def backoff(attempts):
+    """Delay before the next attempt, doubling per attempt with ±20% jitter"""
+    delay = min(BASE_DELAY * (2 ** (attempts - 1)), MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def resume_deletion_jobs():
+    """
+    Re-queue unfinished jobs whose lease has expired (e.g. after a restart)
+    and failed jobs whose backoff has passed; jobs already queued in this
+    process are skipped
+
+    Returns:
+        int: Number of jobs queued
+    """
+    now = get_ist_now()
+    job_ids = DeletionJob.objects(
+        status__in=['pending', 'running']
+    ).filter(
+        __raw__={'$and': [
+            {'$or': [{'lockedUntil': None}, {'lockedUntil': {'$lt': now}}]},
+            {'$or': [{'nextAttemptAt': None}, {'nextAttemptAt': {'$lte': now}}]}
+        ]}
+    ).scalar('jobId')
+
+    count = 0
+    for job_id in job_ids:
+        if _submit(job_id):
+            count += 1
+    return count
+
+
+def retry_job(job_id):
+    """
+    Reset a failed job and queue it again
+
+    Returns:
+        DeletionJob or None: None if the job does not exist or is not failed
+    """
+    updated = DeletionJob.objects(jobId=job_id, status='failed').update_one(
+        set__status='pending', set__attempts=0, set__lockedUntil=None, set__nextAttemptAt=None
+    )
+    if not updated:
+        return None
+    _submit(job_id)
+    return DeletionJob.objects(jobId=job_id).first()
+
+
+# ==================== ORPHANS ====================
+
+def find_orphans():
+    """
+    Find records whose owner has no User (or only a tombstoned one without an active job)
+
+    Returns:
+        dict: {'steps': {step name: [owner uids]}, 'uids': [...], 'failedJobs': [...]}
+    """
+    user_collection = User._get_collection_name()
+    by_step = {}
+    for name, document, field, _ in CASCADE_STEPS:
+        if document is User:
+            continue
+        db_field = document._fields[field].db_field
+        rows = document._get_collection().aggregate([
+            {'$group': {'_id': f'${db_field}'}},
+            {'$lookup': {
+                'from': user_collection,
+                'localField': '_id',
+                'foreignField': 'uid',
+                'as': 'owner'
+            }},
+            {'$match': {'owner': {'$size': 0}, '_id': {'$ne': None}}},
+            {'$project': {'_id': 1}}
+        ], allowDiskUse=True)
+        uids = [row['_id'] for row in rows]
+        if uids:
+            by_step[name] = uids
+
+    uids = sorted({uid for step_uids in by_step.values() for uid in step_uids})
+    failed = [job_to_dict(job) for job in DeletionJob.objects(status='failed')]
+    return {'steps': by_step, 'uids': uids, 'failedJobs': failed}
+
+
+def cleanup_orphans():
+    """
+    Queue a cascade job for every orphaned owner uid and retry failed jobs
+
+    Returns:
+        list: Job IDs queued
+    """
+    report = find_orphans()
+    job_ids = []
+    for uid in report['uids']:
+        job = _active_job(uid) or _create_job(uid, None)
+        job_ids.append(job.jobId)
+    for failed in report['failedJobs']:
+        if retry_job(failed['jobId']):
+            job_ids.append(failed['jobId'])
+    return job_ids
@@ -0,0 +1,69 @@
+"""
+Utility functions for diet plan management
+"""
+import json
+
+
+def build_plan_summary(content):
+    """
+    Compute the denormalized summary fields stored on a DietPlan.
+
+    Args:
+        content: Plan content as a dict, DietPlanContent or legacy JSON string
+
+    Returns:
+        dict: {totalCalories, dayCount, mealCount, itemCount}
+    """
+    if hasattr(content, 'to_dict'):
+        content = content.to_dict()
+    elif isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except ValueError:
+            content = {}
+    content = content or {}
+
+    calories = 0
+    summary = content.get('summary') or {}
+    if isinstance(summary, dict) and summary.get('totalCalories') is not None:
+        try:
+            calories = int(round(float(summary['totalCalories'])))
+        except (TypeError, ValueError):
+            calories = 0
+
+    days = content.get('mealPlan') or []
+    if not isinstance(days, list):
+        days = []
+
+    meal_count = 0
+    item_count = 0
+    for day in days:
+        meals = day.get('meals', []) if isinstance(day, dict) else []
+        meal_count += len(meals)
+        for meal in meals:
+            items = meal.get('items', []) if isinstance(meal, dict) else []
+            item_count += len(items)
+
+    return {
+        'totalCalories': calories,
+        'dayCount': len(days),
+        'mealCount': meal_count,
+        'itemCount': item_count
+    }
+
+
+def apply_plan_summary(plan, content):
+    """Set the denormalized summary fields on a DietPlan from its content"""
+    summary = build_plan_summary(content)
+    plan.totalCalories = summary['totalCalories']
+    plan.dayCount = summary['dayCount']
+    plan.mealCount = summary['mealCount']
+    plan.itemCount = summary['itemCount']
+    return plan
+
+
+def plan_content_to_dict(content):
+    """Convert stored plan content to a JSON-serializable dict"""
+    if not content:
+        return {}
+    return content.to_dict()
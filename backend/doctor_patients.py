@@ -0,0 +1,169 @@
+"""
+Materialized doctor-patient relationships
+
+One DoctorPatient row per (doctor, patient) pair that has appointments,
+holding first/last care dates, per-status counts and the latest status.
+The roster and relationship checks read it with single indexed queries
+instead of scanning appointments.
+
+Every appointment status change calls refresh_pair(), which recomputes the
+pair's row from that pair's appointments. Recomputing (rather than applying
+$inc deltas) keeps the row correct when writes race or a refresh is missed:
+the next change for the pair, or rebuild(), converges it.
+"""
+from models import Appointment, DoctorPatient, Patient, get_ist_now
+from identity_cache import identity_cache
+import traceback
+
+# Appointments that put a patient on the doctor's roster
+ROSTER_STATUSES = ['confirmed', 'completed']
+RESCHEDULE_STATUSES = ['doctor_rescheduled_pending', 'patient_rescheduled_pending']
+
+
+def refresh_pair(doctor_id, patient_id):
+    """
+    Recompute the relationship row for one doctor/patient pair
+
+    Failures are logged, never raised: the caller's write has already happened.
+    """
+    try:
+        rows = Appointment.objects(doctorId=doctor_id, patientId=patient_id).only(
+            'status', 'startTimestamp'
+        ).as_pymongo()
+
+        counts = {'pending': 0, 'confirmed': 0, 'completed': 0, 'cancelled': 0, 'rescheduling': 0}
+        first = last = last_status = None
+        total = 0
+        for row in rows:
+            total += 1
+            status = row.get('status')
+            if status in RESCHEDULE_STATUSES:
+                counts['rescheduling'] += 1
+            elif status in counts:
+                counts[status] += 1
+            if status in ROSTER_STATUSES:
+                start = row['startTimestamp']
+                if first is None or start < first:
+                    first = start
+                if last is None or start > last:
+                    last, last_status = start, status
+
+        if total == 0:
+            DoctorPatient.objects(doctorId=doctor_id, patientId=patient_id).delete()
+            return
+
+        patient = identity_cache.get_patient(patient_id)
+        DoctorPatient.objects(doctorId=doctor_id, patientId=patient_id).update_one(
+            upsert=True,
+            set__patientRef=patient.id if patient else None,
+            set__patientName=patient.name if patient else None,
+            set__rostered=counts['confirmed'] + counts['completed'] > 0,
+            set__firstAppointmentAt=first,
+            set__lastAppointmentAt=last,
+            set__lastStatus=last_status,
+            set__totalCount=total,
+            set__pendingCount=counts['pending'],
+            set__confirmedCount=counts['confirmed'],
+            set__completedCount=counts['completed'],
+            set__cancelledCount=counts['cancelled'],
+            set__reschedulingCount=counts['rescheduling'],
+            set__updatedAt=get_ist_now()
+        )
+    except Exception as e:
+        print(f" Error refreshing doctor-patient relationship {doctor_id}/{patient_id}: {e}")
+        traceback.print_exc()
+
+
+def has_relationship(doctor_id, patient_id):
+    """
+    True when the doctor treats the patient or has an open request from them:
+    any appointment that is not cancelled
+    """
+    row = DoctorPatient.objects(doctorId=doctor_id, patientId=patient_id).only(
+        'totalCount', 'cancelledCount'
+    ).as_pymongo().first()
+    return bool(row and row.get('totalCount', 0) > row.get('cancelledCount', 0))
+
+
+def rebuild():
+    """
+    Recompute every relationship row from the appointments collection
+
+    One aggregation groups appointments by pair and $merges the rows into
+    DoctorPatient; rows for pairs that no longer have appointments are removed.
+    Rows that refresh_pair() updated while the rebuild ran are newer than
+    its snapshot and are left as they are.
+
+    Returns:
+        int: Number of relationship rows after the rebuild
+    """
+    started = get_ist_now()
+    in_roster = {'$in': ['$status', ROSTER_STATUSES]}
+
+    def count(condition):
+        return {'$sum': {'$cond': [condition, 1, 0]}}
+
+    Appointment._get_collection().aggregate([
+        {'$group': {
+            '_id': {'doctorId': '$doctorId', 'patientId': '$patientId'},
+            'firstAppointmentAt': {'$min': {'$cond': [in_roster, '$startTimestamp', None]}},
+            # Documents compare field by field, so this keeps the latest roster appointment
+            'last': {'$max': {'$cond': [in_roster, {'t': '$startTimestamp', 's': '$status'}, None]}},
+            'totalCount': {'$sum': 1},
+            'pendingCount': count({'$eq': ['$status', 'pending']}),
+            'confirmedCount': count({'$eq': ['$status', 'confirmed']}),
+            'completedCount': count({'$eq': ['$status', 'completed']}),
+            'cancelledCount': count({'$eq': ['$status', 'cancelled']}),
+            'reschedulingCount': count({'$in': ['$status', RESCHEDULE_STATUSES]}),
+        }},
+        {'$lookup': {
+            'from': Patient._get_collection_name(),
+            'localField': '_id.patientId',
+            'foreignField': 'patientId',
+            'as': 'patient'
+        }},
+        {'$project': {
+            '_id': 0,
+            'doctorId': '$_id.doctorId',
+            'patientId': '$_id.patientId',
+            'patientRef': {'$arrayElemAt': ['$patient._id', 0]},
+            'patientName': {'$arrayElemAt': ['$patient.name', 0]},
+            'rostered': {'$gt': [{'$add': ['$confirmedCount', '$completedCount']}, 0]},
+            'firstAppointmentAt': 1,
+            'lastAppointmentAt': '$last.t',
+            'lastStatus': '$last.s',
+            'totalCount': 1,
+            'pendingCount': 1,
+            'confirmedCount': 1,
+            'completedCount': 1,
+            'cancelledCount': 1,
+            'reschedulingCount': 1,
+            'updatedAt': started
+        }},
+        {'$merge': {
+            'into': DoctorPatient._get_collection_name(),
+            'on': ['doctorId', 'patientId'],
+            # A row refreshed by refresh_pair() after the snapshot is newer: keep it
+            'whenMatched': [{'$replaceWith': {'$cond': [
+                {'$gt': ['$updatedAt', started]},
+                '$$ROOT',
+                {'$mergeObjects': ['$$new', {'_id': '$_id'}]}
+            ]}}],
+            'whenNotMatched': 'insert'
+        }}
+    ], allowDiskUse=True)
+
+    DoctorPatient.objects(updatedAt__lt=started).delete()
+    return DoctorPatient.objects.count()
+
+
+def rebuild_safely():
+    """rebuild() for the scheduler; logs instead of raising"""
+    try:
+        rows = rebuild()
+        print(f"✓ Doctor-patient relationships rebuilt ({rows} rows)")
+        return rows
+    except Exception as e:
+        print(f" Error rebuilding doctor-patient relationships: {e}")
+        traceback.print_exc()
+        return None
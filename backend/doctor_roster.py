@@ -0,0 +1,67 @@
+"""
+Doctor patient roster
+
+Patients with at least one confirmed or completed appointment with a doctor,
+newest appointment first. Reads the materialized DoctorPatient rows (see
+doctor_patients.py), so a page is one range scan over the
+(doctorId, rostered, -lastAppointmentAt, -id) index.
+"""
+import re
+from datetime import timedelta, timezone
+from models import DoctorPatient
+from pagination import paginate
+
+IST = timezone(timedelta(hours=5, minutes=30))
+ROSTER_FIELDS = ('patientRef', 'patientId', 'patientName', 'lastAppointmentAt', 'lastStatus')
+
+
+def _to_ist(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(IST).isoformat()
+
+
+def roster_queryset(doctor_id, name=None):
+    """
+    Build the roster query
+
+    Args:
+        doctor_id: Doctor ID
+        name: Optional case-insensitive patient name filter
+
+    Returns:
+        QuerySet: DoctorPatient rows on the doctor's roster
+    """
+    queryset = DoctorPatient.objects(doctorId=doctor_id, rostered=True)
+    if name:
+        queryset = queryset.filter(patientName__iregex=re.escape(name))
+    return queryset.only(*ROSTER_FIELDS)
+
+
+def _serialize(row):
+    return {
+        'id': str(row.patientRef) if row.patientRef else None,
+        'patientId': row.patientId,
+        'name': row.patientName,
+        'lastAppointment': {
+            'date': _to_ist(row.lastAppointmentAt),
+            'status': row.lastStatus
+        }
+    }
+
+
+def get_roster(doctor_id, page=None, name=None):
+    """
+    Fetch the roster
+
+    Returns:
+        tuple: (patients, next_cursor) - next_cursor is None on the last page or without a page
+    """
+    queryset = roster_queryset(doctor_id, name)
+    if page is None:
+        rows, next_cursor = list(queryset.order_by('-lastAppointmentAt', '-id')), None
+    else:
+        rows, next_cursor = paginate(queryset, ['-lastAppointmentAt'], page)
+    return [_serialize(row) for row in rows], next_cursor
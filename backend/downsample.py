@@ -0,0 +1,89 @@
+"""
+Shape-preserving downsampling for chart series
+
+Largest-Triangle-Three-Buckets (LTTB) picks the point in each bucket that
+forms the largest triangle with its neighbours, which keeps the visual
+shape of the line. A min/max envelope per bucket is returned alongside so
+short spikes that LTTB skips are still visible.
+"""
+import numpy as np
+
+
+def _bucket_edges(n, threshold):
+    """Start/end indices of the threshold-2 inner buckets (first/last points are kept as-is)"""
+    edges = np.linspace(1, n - 1, threshold - 1)
+    return np.floor(edges).astype(int)
+
+
+def lttb(x, y, threshold):
+    """
+    Select threshold points from (x, y) with LTTB
+
+    Args:
+        x, y: 1-D numpy arrays of equal length, x ascending
+        threshold: Number of points to keep (>= 3)
+
+    Returns:
+        tuple: (indices, bucket_edges) where bucket_edges[i]:bucket_edges[i+1]
+        is the slice of the i-th inner bucket
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n), None
+
+    edges = _bucket_edges(n, threshold)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = x[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected, edges
+
+
+def downsample_series(x, y, max_points, lows=None, highs=None):
+    """
+    Downsample one series and compute its min/max envelope
+
+    Args:
+        lows, highs: Per-point envelope when (x, y) are already aggregated
+            (e.g. bucket averages); defaults to y itself
+
+    Returns:
+        dict: {x, y, min, max} as lists, one entry per kept point
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    lows = y if lows is None else np.asarray(lows, dtype=float)
+    highs = y if highs is None else np.asarray(highs, dtype=float)
+    indices, edges = lttb(x, y, max_points)
+
+    if edges is None:
+        return {'x': x.tolist(), 'y': y.tolist(), 'min': lows.tolist(), 'max': highs.tolist()}
+
+    envelope_low = [lows[0]]
+    envelope_high = [highs[0]]
+    for i in range(len(edges) - 1):
+        envelope_low.append(lows[edges[i]:edges[i + 1]].min())
+        envelope_high.append(highs[edges[i]:edges[i + 1]].max())
+    envelope_low.append(lows[-1])
+    envelope_high.append(highs[-1])
+
+    return {
+        'x': x[indices].tolist(),
+        'y': y[indices].tolist(),
+        'min': np.asarray(envelope_low).tolist(),
+        'max': np.asarray(envelope_high).tolist()
+    }
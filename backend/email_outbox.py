@@ -0,0 +1,304 @@
+"""
+Persistent email outbox with background sender workers
+
+With the outbox attached, EmailService.send_email only inserts an
+OutboxMessage; request handlers never wait on SMTP. Sender threads claim due
+messages with find_one_and_update (a lease, so several processes can share
+the queue), deliver them, and on failure retry with exponential backoff
+until MAX_ATTEMPTS, after which the message is parked as a dead letter.
+
+Delivery is at-least-once: a worker that dies after the SMTP send but
+before recording it leaves a lease that expires and is claimed again.
+
+Bodies can hold OTP codes and security notices, so they are removed as soon
+as a message is sent; sent rows keep only the envelope for SENT_RETENTION.
+Dead letters keep their bodies so an admin can retry them, but expire after
+DEAD_RETENTION.
+
+Configuration (environment):
+    EMAIL_OUTBOX_ENABLED    'false' sends synchronously as before
+    EMAIL_SENDER_WORKERS    sender threads per process (default 2)
+"""
+from datetime import timedelta, timezone
+from pymongo import ReturnDocument
+from bson import ObjectId
+from models import OutboxMessage, get_ist_now
+from email_service import email_service
+import os
+import random
+import threading
+import traceback
+
+LEASE = timedelta(minutes=2)
+MAX_ATTEMPTS = 6
+BASE_DELAY = timedelta(seconds=30)  # 30s, 1m, 2m, 4m, 8m between attempts
+MAX_DELAY = timedelta(minutes=30)
+SENT_RETENTION = timedelta(days=7)
+DEAD_RETENTION = timedelta(days=3)
+POLL_SECONDS = 5
+LATENCY_WINDOW = timedelta(hours=1)
+
+
+def message_to_dict(row):
+    """Serialize a raw outbox document for the admin endpoints (bodies omitted)"""
+    def iso(value):
+        return value.isoformat() if value else None
+    return {
+        "id": str(row['_id']),
+        "to": row.get('to'),
+        "subject": row.get('subject'),
+        "status": row.get('status'),
+        "attempts": row.get('attempts', 0),
+        "lastError": row.get('lastError'),
+        "createdAt": iso(row.get('createdAt')),
+        "nextAttemptAt": iso(row.get('nextAttemptAt')),
+        "sentAt": iso(row.get('sentAt'))
+    }
+
+
+class EmailOutbox:
+    """Mongo-backed queue of outgoing email and the threads that drain it"""
+    def __init__(self, workers=2, base_delay=BASE_DELAY, max_attempts=MAX_ATTEMPTS,
+                 poll_seconds=POLL_SECONDS, deliver=None):
+        self.workers = workers
+        self.base_delay = base_delay
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.deliver = deliver or email_service.deliver
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self.counters = {'enqueued': 0, 'sent': 0, 'retried': 0, 'dead': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # ==================== PRODUCER ====================
+
+    def enqueue(self, to_email, subject, html_body, text_body=None):
+        """
+        Insert a message for delivery and wake a local sender
+
+        Returns:
+            ObjectId: The message ID
+        """
+        now = get_ist_now()
+        result = OutboxMessage._get_collection().insert_one({
+            'to': to_email,
+            'subject': subject,
+            'htmlBody': html_body,
+            'textBody': text_body,
+            'status': 'pending',
+            'attempts': 0,
+            'nextAttemptAt': now,
+            'createdAt': now
+        })
+        self._count('enqueued')
+        self._wake.set()
+        return result.inserted_id
+
+    # ==================== SENDERS ====================
+
+    def claim(self):
+        """
+        Lease the oldest due message: pending and past its backoff, or a send
+        whose worker lease expired
+
+        Returns:
+            dict or None: The claimed raw message
+        """
+        now = get_ist_now()
+        return OutboxMessage._get_collection().find_one_and_update(
+            {'$or': [
+                {'status': 'pending', 'nextAttemptAt': {'$lte': now}},
+                {'status': 'sending', 'lockedUntil': {'$lt': now}}
+            ]},
+            {
+                '$set': {'status': 'sending', 'lockedUntil': now + LEASE},
+                '$inc': {'attempts': 1}
+            },
+            sort=[('nextAttemptAt', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def backoff(self, attempts):
+        """Delay before the next attempt, doubling per attempt with ±20% jitter"""
+        delay = min(self.base_delay * (2 ** (attempts - 1)), MAX_DELAY)
+        return delay * random.uniform(0.8, 1.2)
+
+    def process(self, message):
+        """Deliver one claimed message and record the outcome"""
+        collection = OutboxMessage._get_collection()
+        try:
+            self.deliver(message['to'], message['subject'], message['htmlBody'], message.get('textBody'))
+        except Exception as e:
+            now = get_ist_now()
+            if message['attempts'] >= self.max_attempts:
+                update = {
+                    'status': 'dead',
+                    'lockedUntil': None,
+                    'lastError': str(e),
+                    'purgeAt': now + DEAD_RETENTION
+                }
+                self._count('dead')
+                print(f"❌ Email {message['_id']} to {message['to']} dead after {message['attempts']} attempts: {e}")
+            else:
+                update = {
+                    'status': 'pending',
+                    'lockedUntil': None,
+                    'lastError': str(e),
+                    'nextAttemptAt': now + self.backoff(message['attempts'])
+                }
+                self._count('retried')
+            collection.update_one({'_id': message['_id'], 'status': 'sending'}, {'$set': update})
+            return False
+
+        now = get_ist_now()
+        collection.update_one({'_id': message['_id']}, {
+            '$set': {
+                'status': 'sent',
+                'sentAt': now,
+                'lockedUntil': None,
+                'lastError': None,
+                'purgeAt': now + SENT_RETENTION
+            },
+            '$unset': {'htmlBody': '', 'textBody': ''}
+        })
+        self._count('sent')
+        return True
+
+    def drain(self):
+        """Deliver due messages until none are left; returns how many were processed"""
+        processed = 0
+        while not self._stop.is_set():
+            message = self.claim()
+            if message is None:
+                break
+            self.process(message)
+            processed += 1
+        return processed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                print(f" Email sender failed: {e}")
+                traceback.print_exc()
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def start(self):
+        """Start the sender threads (no-op if already running)"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'email-sender-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # ==================== ADMIN ====================
+
+    def retry(self, message_id):
+        """
+        Move a dead letter back to the queue (and off its expiry)
+
+        Returns:
+            bool: False if no dead message has this ID
+        """
+        if not ObjectId.is_valid(message_id):
+            return False
+        result = OutboxMessage._get_collection().update_one(
+            {'_id': ObjectId(message_id), 'status': 'dead'},
+            {
+                '$set': {'status': 'pending', 'attempts': 0, 'nextAttemptAt': get_ist_now()},
+                '$unset': {'purgeAt': ''}
+            }
+        )
+        if result.modified_count:
+            self._wake.set()
+        return bool(result.modified_count)
+
+    def dead_letters(self, limit=50):
+        rows = OutboxMessage._get_collection().find(
+            {'status': 'dead'}, {'htmlBody': 0, 'textBody': 0}
+        ).sort('createdAt', -1).limit(limit)
+        return [message_to_dict(row) for row in rows]
+
+    def metrics(self):
+        """
+        Queue depth by status, age of the oldest queued message and delivery
+        latency (enqueue to sent) over the last hour, in one aggregation
+
+        Returns:
+            dict: Metrics plus this process's counters
+        """
+        now = get_ist_now()
+        facets = next(OutboxMessage._get_collection().aggregate([
+            {'$facet': {
+                'byStatus': [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}],
+                'oldest': [
+                    {'$match': {'status': {'$in': ['pending', 'sending']}}},
+                    {'$sort': {'createdAt': 1}},
+                    {'$limit': 1},
+                    {'$project': {'createdAt': 1}}
+                ],
+                'latency': [
+                    {'$match': {'sentAt': {'$gte': now - LATENCY_WINDOW}}},
+                    {'$project': {'ms': {'$subtract': ['$sentAt', '$createdAt']}}},
+                    {'$group': {
+                        '_id': None,
+                        'count': {'$sum': 1},
+                        'avgMs': {'$avg': '$ms'},
+                        'maxMs': {'$max': '$ms'}
+                    }}
+                ]
+            }}
+        ]))
+
+        depth = {status: 0 for status in ('pending', 'sending', 'sent', 'dead')}
+        for row in facets['byStatus']:
+            depth[row['_id']] = row['count']
+
+        oldest_age = None
+        if facets['oldest']:
+            created = facets['oldest'][0]['createdAt']
+            if created.tzinfo is None:  # Datetimes read back from Mongo are naive UTC
+                created = created.replace(tzinfo=timezone.utc)
+            oldest_age = (now - created).total_seconds()
+
+        latency = facets['latency'][0] if facets['latency'] else {'count': 0, 'avgMs': None, 'maxMs': None}
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'depth': depth,
+            'oldestQueuedSeconds': oldest_age,
+            'deliveryLatency': {
+                'windowMinutes': int(LATENCY_WINDOW.total_seconds() // 60),
+                'sent': latency['count'],
+                'avgMs': latency['avgMs'],
+                'maxMs': latency['maxMs']
+            },
+            'process': counters
+        }
+
+
+outbox = EmailOutbox(workers=int(os.getenv("EMAIL_SENDER_WORKERS", "2")))
+
+
+def start():
+    """Route EmailService sends through the outbox and start the senders"""
+    if os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "false":
+        return
+    email_service.outbox = outbox
+    outbox.start()
@@ -0,0 +1,34 @@
+"""
+Background queue for outgoing email
+
+Callers on request and scheduler paths hand off email_service calls here
+instead of blocking on SMTP. A single worker thread sends them in order
+(with the outbox attached, that only renders and inserts the message; see
+email_outbox.py).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from email_service import email_service
+import traceback
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-queue')
+
+
+def _send(method_name, args, kwargs):
+    try:
+        getattr(email_service, method_name)(*args, **kwargs)
+    except Exception as e:
+        print(f" Error sending queued email ({method_name}): {e}")
+        traceback.print_exc()
+
+
+def enqueue_email(method_name, *args, **kwargs):
+    """
+    Queue a call to an EmailService send_* method
+
+    Args:
+        method_name: e.g. 'send_appointment_completed'
+        args, kwargs: Passed through to the method
+    """
+    if not hasattr(email_service, method_name):
+        raise AttributeError(f"EmailService has no method {method_name}")
+    return _executor.submit(_send, method_name, args, kwargs)
@@ -3,7 +3,118 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from contextlib import contextmanager
 import ssl
+import threading
+import time
+import email_templates
+
+SMTP_TIMEOUT = 30
+NOOP_AFTER_SECONDS = 30  # Idle sessions are checked with NOOP before reuse
+MAX_IDLE_SECONDS = 240  # Older idle sessions are dropped (Gmail closes them anyway)
+
+
+def _connection_lost(error):
+    """Socket-level failures (smtplib's own errors also subclass OSError)"""
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPSession:
+    """One pooled SMTP connection"""
+    def __init__(self, connect):
+        self._connect = connect
+        self.server = connect()
+        self.last_used = time.monotonic()
+        self.broken = False
+
+    def reconnect(self):
+        self.close()
+        self.server = self._connect()
+        self.broken = False
+
+    def alive(self):
+        """Cheap liveness check: NOOP only after the session sat idle for a while"""
+        idle = time.monotonic() - self.last_used
+        if idle > MAX_IDLE_SECONDS:
+            return False
+        if idle < NOOP_AFTER_SECONDS:
+            return True
+        try:
+            return self.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of authenticated SMTP sessions
+
+    A session is checked out for one send or batch and returned afterwards,
+    so EHLO/STARTTLS/LOGIN are paid once per session instead of per message.
+    Sessions that fail a NOOP check or break mid-use are replaced. Up to
+    `size` idle sessions are kept; size 0 opens a session per send.
+    """
+    def __init__(self, connect, size):
+        self._connect = connect
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0}
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                break
+            if session.alive():
+                with self._lock:
+                    self.stats['reused'] += 1
+                return session
+            session.close()
+            with self._lock:
+                self.stats['discarded'] += 1
+        return SMTPSession(self._open)
+
+    def _open(self):
+        server = self._connect()
+        with self._lock:
+            self.stats['opened'] += 1
+        return server
+
+    def _checkin(self, session):
+        session.last_used = time.monotonic()
+        with self._lock:
+            if not session.broken and len(self._idle) < self.size:
+                self._idle.append(session)
+                return
+        session.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out a live session for the duration of the block"""
+        session = self._checkout()
+        try:
+            yield session
+        except Exception:
+            session.broken = True
+            raise
+        finally:
+            self._checkin(session)
+
+    def close(self):
+        """Close every idle session"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
 
 class EmailService:
     def __init__(self):
@@ -17,365 +128,203 @@ class EmailService:
         self.smtp_user = os.getenv("SMTP_USER",)
         self.smtp_password = os.getenv("SMTP_PASSWORD",)
 
+        # Reused SMTP sessions (SMTP_POOL_SIZE=0 connects per send)
+        self.pool = SMTPConnectionPool(self._connect, int(os.getenv("SMTP_POOL_SIZE", "4")))
+
+        # Persistent outbox; attached by email_outbox.start() in the web app
+        self.outbox = None
+
     # =============================================
     # Master Send Function
     # =============================================
     def send_email(self, to_email, subject, html_body, text_body=None):
+        """
+        Send an email, or queue it in the outbox when one is attached
+        (see email_outbox.py). Returns False only if a direct send failed.
+        """
+        if self.outbox is not None:
+            try:
+                self.outbox.enqueue(to_email, subject, html_body, text_body)
+                return True
+            except Exception as e:
+                print("❌ Outbox Error:", str(e))
+                return False
+
         try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = f"{self.from_name} <{self.from_email}>"
-            msg["To"] = to_email
-
-            if text_body:
-                msg.attach(MIMEText(text_body, "plain"))
-
-            msg.attach(MIMEText(html_body, "html"))
-
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                code, features = server.ehlo()
-                print("SMTP Features:", features)
-
-                # Detect LOCAL MODE (MailHog / aiosmtpd)
-                local_mode = (
-                    self.smtp_host in ["localhost", "127.0.0.1"] and
-                    self.smtp_port == 1025
-                )
-
-                # Try STARTTLS only if supported and NOT local
-                if "starttls" in str(features).lower() and not local_mode:
-                    print("→ Using STARTTLS")
-                    context = ssl.create_default_context()
-                    server.starttls(context=context)
-                    server.ehlo()
-
-                # Try login only if username + password exist
-                if self.smtp_user and self.smtp_password:
-                    print("→ Using LOGIN")
-                    server.login(self.smtp_user, self.smtp_password)
-
-                # Send message
-                server.send_message(msg)
-                server.quit()
-
-            print(f"📧 SMTP Email sent to {to_email}")
+            self.deliver(to_email, subject, html_body, text_body)
             return True
-
         except Exception as e:
             print("❌ SMTP Error:", str(e))
             return False
+
+    def deliver(self, to_email, subject, html_body, text_body=None):
+        """Send one message over a pooled SMTP session; raises on failure so callers can retry"""
+        error = self.send_many([(to_email, subject, html_body, text_body)])[0]
+        if error is not None:
+            raise error
+
+    def send_many(self, messages):
+        """
+        Send a batch of messages over one authenticated SMTP session
+
+        A session dropped mid-batch is replaced and the message retried once;
+        a refused message does not end the session.
+
+        Args:
+            messages: List of (to_email, subject, html_body, text_body) tuples
+
+        Returns:
+            list: None for each message sent, or the exception that stopped it
+
+        Raises:
+            Exception: If no SMTP session can be opened
+        """
+        messages = list(messages)
+        results = []
+        if not messages:
+            return results
+        with self.pool.connection() as session:
+            for to_email, subject, html_body, text_body in messages:
+                msg = self._build_message(to_email, subject, html_body, text_body)
+                try:
+                    try:
+                        session.server.send_message(msg)
+                    except OSError as e:
+                        if not _connection_lost(e):
+                            raise
+                        session.reconnect()
+                        session.server.send_message(msg)
+                    print(f"📧 SMTP Email sent to {to_email}")
+                    results.append(None)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                    # Refused by the server; smtplib has already reset the session
+                    results.append(e)
+                except Exception as e:
+                    session.broken = True
+                    results.append(e)
+                    break
+        # Anything after a broken session is reported as not sent
+        while len(results) < len(messages):
+            results.append(results[-1])
+        return results
+
+    def _build_message(self, to_email, subject, html_body, text_body=None):
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = f"{self.from_name} <{self.from_email}>"
+        msg["To"] = to_email
+
+        if text_body:
+            msg.attach(MIMEText(text_body, "plain"))
+
+        msg.attach(MIMEText(html_body, "html"))
+        return msg
+
+    def _connect(self):
+        """Open an SMTP session: EHLO, STARTTLS when offered and LOGIN when configured"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=SMTP_TIMEOUT)
+        try:
+            code, features = server.ehlo()
+            print("SMTP Features:", features)
+
+            # Detect LOCAL MODE (MailHog / aiosmtpd)
+            local_mode = (
+                self.smtp_host in ["localhost", "127.0.0.1"] and
+                self.smtp_port == 1025
+            )
+
+            # Try STARTTLS only if supported and NOT local
+            if "starttls" in str(features).lower() and not local_mode:
+                print("→ Using STARTTLS")
+                context = ssl.create_default_context()
+                server.starttls(context=context)
+                server.ehlo()
+
+            # Try login only if username + password exist
+            if self.smtp_user and self.smtp_password:
+                print("→ Using LOGIN")
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
     
     # ==================== APPOINTMENT EMAIL TEMPLATES ====================
+    # Markup lives in email_templates.py; each method maps its arguments to template values.
+
+    def _send_template(self, to_email, template, **values):
+        subject, html_body, text_body = email_templates.render(template, **values)
+        return self.send_email(to_email, subject, html_body, text_body)
     
     def send_new_booking_request(self, doctor_email, doctor_name, patient_name, appointment_time):
         """Email to doctor when patient books appointment"""
-        subject = f"New Appointment Request from {patient_name}"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #2563eb;">New Appointment Request</h2>
-                <p>Dear Dr. {doctor_name},</p>
-                <p>You have received a new appointment request:</p>
-                
-                <div style="background: #f3f4f6; padding: 15px; border-radius: 8px; margin: 20px 0;">
-                    <p><strong>Patient:</strong> {patient_name}</p>
-                    <p><strong>Date & Time:</strong> {appointment_time}</p>
-                    <p><strong>Status:</strong> <span style="color: #f59e0b;">Pending Your Confirmation</span></p>
-                </div>
-                
-                <p>Please log in to your dashboard to confirm or reject this appointment.</p>
-                
-                <a href="https://ayurwell2-o.vercel.app/practitioner/appointments" 
-                   style="display: inline-block; background: #2563eb; color: white; padding: 12px 24px; 
-                          text-decoration: none; border-radius: 6px; margin: 20px 0;">
-                    View Appointments
-                </a>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(doctor_email, subject, html_body)
+        return self._send_template(
+            doctor_email, 'new_booking_request',
+            doctor_name=doctor_name, patient_name=patient_name, appointment_time=appointment_time
+        )
     
     def send_appointment_confirmed(self, patient_email, patient_name, doctor_name, appointment_time):
         """Email to patient when doctor confirms appointment"""
-        subject = "Your Appointment is Confirmed"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #10b981;">Appointment Confirmed ✓</h2>
-                <p>Dear {patient_name},</p>
-                <p>Great news! Your appointment has been confirmed.</p>
-                
-                <div style="background: #ecfdf5; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #10b981;">
-                    <p><strong>Doctor:</strong> Dr. {doctor_name}</p>
-                    <p><strong>Date & Time:</strong> {appointment_time}</p>
-                    <p><strong>Status:</strong> <span style="color: #10b981;">Confirmed</span></p>
-                </div>
-                
-                <p>Please arrive 10 minutes before your scheduled time.</p>
-                
-                <a href="https://ayurwell2-o.vercel.app/patient/appointments" 
-                   style="display: inline-block; background: #10b981; color: white; padding: 12px 24px; 
-                          text-decoration: none; border-radius: 6px; margin: 20px 0;">
-                    View My Appointments
-                </a>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(patient_email, subject, html_body)
+        return self._send_template(
+            patient_email, 'appointment_confirmed',
+            patient_name=patient_name, doctor_name=doctor_name, appointment_time=appointment_time
+        )
     
     def send_appointment_cancelled(self, to_email, to_name, cancelled_by, doctor_name, patient_name, 
                                    appointment_time, reason=None):
         """Email when appointment is cancelled"""
-        subject = "Appointment Cancelled"
-        
-        reason_html = f"<p><strong>Reason:</strong> {reason}</p>" if reason else ""
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #ef4444;">Appointment Cancelled</h2>
-                <p>Dear {to_name},</p>
-                <p>An appointment has been cancelled by {cancelled_by}.</p>
-                
-                <div style="background: #fef2f2; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ef4444;">
-                    <p><strong>Doctor:</strong> Dr. {doctor_name}</p>
-                    <p><strong>Patient:</strong> {patient_name}</p>
-                    <p><strong>Date & Time:</strong> {appointment_time}</p>
-                    {reason_html}
-                </div>
-                
-                <p>If you have any questions, please contact us.</p>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(to_email, subject, html_body)
+        return self._send_template(
+            to_email, 'appointment_cancelled',
+            to_name=to_name, cancelled_by=cancelled_by, doctor_name=doctor_name,
+            patient_name=patient_name, appointment_time=appointment_time, reason=reason
+        )
     
     def send_patient_reschedule_request(self, doctor_email, doctor_name, patient_name, 
                                        old_time, new_time):
         """Email to doctor when patient requests reschedule"""
-        subject = f"Reschedule Request from {patient_name}"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #f59e0b;">Reschedule Request</h2>
-                <p>Dear Dr. {doctor_name},</p>
-                <p>{patient_name} has requested to reschedule their appointment.</p>
-                
-                <div style="background: #fffbeb; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #f59e0b;">
-                    <p><strong>Patient:</strong> {patient_name}</p>
-                    <p><strong>Original Time:</strong> <span style="text-decoration: line-through;">{old_time}</span></p>
-                    <p><strong>Requested Time:</strong> <span style="color: #f59e0b; font-weight: bold;">{new_time}</span></p>
-                </div>
-                
-                <p>Please review and confirm the new time.</p>
-                
-                <a href="https://ayurwell2-o.vercel.app/practitioner/appointments" 
-                   style="display: inline-block; background: #f59e0b; color: white; padding: 12px 24px; 
-                          text-decoration: none; border-radius: 6px; margin: 20px 0;">
-                    Review Request
-                </a>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(doctor_email, subject, html_body)
+        return self._send_template(
+            doctor_email, 'patient_reschedule_request',
+            doctor_name=doctor_name, patient_name=patient_name, old_time=old_time, new_time=new_time
+        )
     
     def send_doctor_reschedule_proposal(self, patient_email, patient_name, doctor_name, 
                                        old_time, new_time, reason):
         """Email to patient when doctor proposes reschedule"""
-        subject = f"Dr. {doctor_name} Proposed a New Appointment Time"
-        
-        reason_html = f"<p><strong>Reason:</strong> {reason}</p>" if reason else ""
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #f59e0b;">Appointment Time Change Requested</h2>
-                <p>Dear {patient_name},</p>
-                <p>Dr. {doctor_name} has proposed a new time for your appointment.</p>
-                
-                <div style="background: #fffbeb; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #f59e0b;">
-                    <p><strong>Original Time:</strong> <span style="text-decoration: line-through;">{old_time}</span></p>
-                    <p><strong>Proposed Time:</strong> <span style="color: #f59e0b; font-weight: bold;">{new_time}</span></p>
-                    <p><strong>Reason:</strong> {reason}</p>
-                </div
-                
-                <p><strong>Please accept or reject this change.</strong></p>
-                
-                <a href="https://ayurwell2-o.vercel.app/patient/appointments" 
-                   style="display: inline-block; background: #10b981; color: white; padding: 12px 24px; 
-                          text-decoration: none; border-radius: 6px; margin: 10px 10px 10px 0;">
-                    Accept
-                </a>
-                <a href="https://ayurwell2-o.vercel.app/patient/appointments" 
-                   style="display: inline-block; background: #ef4444; color: white; padding: 12px 24px; 
-                          text-decoration: none; border-radius: 6px; margin: 10px 0;">
-                    Reject
-                </a>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(patient_email, subject, html_body)
+        return self._send_template(
+            patient_email, 'doctor_reschedule_proposal',
+            patient_name=patient_name, doctor_name=doctor_name,
+            old_time=old_time, new_time=new_time, reason=reason
+        )
     
     def send_reschedule_accepted(self, doctor_email, doctor_name, patient_name, new_time):
         """Email to doctor when patient accepts reschedule"""
-        subject = f"{patient_name} Accepted Reschedule"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #10b981;">Reschedule Accepted ✓</h2>
-                <p>Dear Dr. {doctor_name},</p>
-                <p>{patient_name} has accepted the new appointment time.</p>
-                
-                <div style="background: #ecfdf5; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #10b981;">
-                    <p><strong>Patient:</strong> {patient_name}</p>
-                    <p><strong>Confirmed Time:</strong> {new_time}</p>
-                    <p><strong>Status:</strong> <span style="color: #10b981;">Confirmed</span></p>
-                </div>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(doctor_email, subject, html_body)
+        return self._send_template(
+            doctor_email, 'reschedule_accepted',
+            doctor_name=doctor_name, patient_name=patient_name, new_time=new_time
+        )
     
     def send_reschedule_rejected_to_doctor(self, doctor_email, doctor_name, patient_name, start_time, proposed_time):
         """Email to doctor when patient rejects reschedule"""
-        subject = f"{patient_name} Rejected Reschedule"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #ef4444;">Reschedule Rejected</h2>
-                <p>Dear Dr. {doctor_name},</p>
-                <p>{patient_name} has rejected the proposed appointment time.</p>
-                
-                <div style="background: #fef2f2; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ef4444;">
-                    <p><strong>Patient:</strong> {patient_name}</p>
-                    <p><strong>Rejected Time:</strong><span style="text-decoration: line-through;"> {proposed_time}</span></p>
-                    <p><strong>Original Time:</strong> {start_time}</p>
-                    <p><strong>Status:</strong> <span style="color: #ef4444;">Reschedule Rejected</span></p>
-                </div>
-                
-                <p>The reschedule request has been rejected. You may contact the patient to schedule a new time.</p>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(doctor_email, subject, html_body)
+        return self._send_template(
+            doctor_email, 'reschedule_rejected_to_doctor',
+            doctor_name=doctor_name, patient_name=patient_name,
+            start_time=start_time, proposed_time=proposed_time
+        )
 
     def send_appointment_completed(self, patient_email, patient_name, doctor_name, appointment_time):
         """Email to patient when appointment is marked as completed"""
-        subject = "Appointment Completed - Thank You!"
-        
-        html_body = f""" 
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #2563eb;">Appointment Completed</h2>
-                <p>Dear {patient_name},</p>
-                <p>Thank you for visiting Dr. {doctor_name}. Your appointment on {appointment_time} has been marked as completed.</p>
-                
-                <div style="background: #f3f4f6; padding: 15px; border-radius: 8px; margin: 20px 0;">
-                    <p>We hope you had a good experience. If you have any feedback, please let us know.</p>
-                </div>
-                
-                <p>You can view your appointment history and prescriptions in your dashboard.</p>
-                
-                <a href="https://ayurwell2-o.vercel.app/patient/appointments" 
-                   style="display: inline-block; background: #2563eb; color: white; padding: 12px 24px; 
-                   text-decoration: none; border-radius: 6px; margin: 20px 0;">
-                    View Dashboard
-                </a>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        return self.send_email(patient_email, subject, html_body)
+        return self._send_template(
+            patient_email, 'appointment_completed',
+            patient_name=patient_name, doctor_name=doctor_name, appointment_time=appointment_time
+        )
 
     def send_reschedule_rejected_to_patient(self, patient_email, doctor_name, patient_name, start_time, proposed_time):
         """Email to patient when doctor rejects reschedule"""
-        subject = f"Dr. {doctor_name} Rejected Reschedule"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #ef4444;">Reschedule Rejected</h2>
-                <p>Dear {patient_name},</p>
-                <p>Dr. {doctor_name} has rejected your proposed appointment time.</p>
-                
-                <div style="background: #fef2f2; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ef4444;">
-                    <p><strong>Doctor:</strong> {doctor_name}</p>
-                    <p><strong>Rejected Time:</strong> <span style="text-decoration: line-through;">{proposed_time}</span></p>
-                    <p><strong>Original Time:</strong> {start_time}</p>
-                    <p><strong>Status:</strong> <span style="color: #ef4444;">Remains at Original Time or Canceled</span></p>
-                </div>
-                
-                <p>Please contact the doctor if you need to discuss further.</p>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px;">
-                    This is an automated message from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(patient_email, subject, html_body)
+        return self._send_template(
+            patient_email, 'reschedule_rejected_to_patient',
+            doctor_name=doctor_name, patient_name=patient_name,
+            start_time=start_time, proposed_time=proposed_time
+        )
     
 
     # ==================== OTP VERIFICATION EMAIL TEMPLATES ====================
@@ -392,95 +341,17 @@ class EmailService:
             subject = "Verify Your New Email - AyurWell"
             action_text = "Confirm your email change"
         
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #2E7D32;">Email Verification</h2>
-                <p>Hello,</p>
-                <p>Thank you for using AyurWell. To {action_text}, please use the following verification code:</p>
-                
-                <div style="background: #E9F7EF; padding: 20px; border-radius: 8px; margin: 30px 0; text-align: center;">
-                    <p style="margin: 0; font-size: 14px; color: #666;">Your verification code is:</p>
-                    <h1 style="color: #2E7D32; font-size: 42px; letter-spacing: 8px; margin: 15px 0; font-family: 'Courier New', monospace;">
-                        {otp_code}
-                    </h1>
-                    <p style="margin: 0; font-size: 12px; color: #999;">This code will expire in 5 minutes</p>
-                </div>
-                
-                <p style="color: #666; font-size: 14px;">
-                    If you didn't request this verification code, please ignore this email.
-                </p>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px; border-top: 1px solid #e5e7eb; padding-top: 20px;">
-                    This is an automated message from AyurWell. Please do not reply to this email.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(to_email, subject, html_body)
+        return self._send_template(
+            to_email, 'otp', subject=subject, action_text=action_text, otp_code=otp_code
+        )
     
     def send_email_changed_notification(self, to_email, name):
         """Notify old email address that email has been changed"""
-        subject = "Your AyurWell Email Address Has Been Changed"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #f59e0b;">Email Address Changed</h2>
-                <p>Dear {name},</p>
-                <p>This is to inform you that the email address associated with your AyurWell account has been successfully changed.</p>
-                
-                <div style="background: #fffbeb; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #f59e0b;">
-                    <p><strong>Previous Email:</strong> {to_email}</p>
-                    <p><strong>Status:</strong> <span style="color: #f59e0b;">Email Changed</span></p>
-                </div>
-                
-                <p style="color: #ef4444; font-weight: bold;">
-                    If you did not make this change, please contact our support team immediately.
-                </p>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px; border-top: 1px solid #e5e7eb; padding-top: 20px;">
-                    This is an automated security notification from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(to_email, subject, html_body)
+        return self._send_template(to_email, 'email_changed', name=name, previous_email=to_email)
+
     def send_password_changed_notification(self, to_email, name):   
         """Notify user that their password has been changed"""
-        subject = "Your AyurWell Password Has Been Changed"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #f59e0b;">Password Changed</h2>
-                <p>Dear {name},</p>
-                <p>This is to inform you that the password for your AyurWell account has been successfully changed.</p>
-                
-                <div style="background: #fffbeb; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #f59e0b;">
-                    <p><strong>Status:</strong> <span style="color: #f59e0b;">Password Changed</span></p>
-                </div>
-                
-                <p style="color: #ef4444; font-weight: bold;">
-                    If you did not make this change, please contact our support team immediately.
-                </p>
-                
-                <p style="color: #6b7280; font-size: 14px; margin-top: 30px; border-top: 1px solid #e5e7eb; padding-top: 20px;">
-                    This is an automated security notification from AyurWell.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(to_email, subject, html_body)
+        return self._send_template(to_email, 'password_changed', name=name)
 
 
 # Global email service instance
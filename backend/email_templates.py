@@ -0,0 +1,367 @@
+"""
+Precompiled email templates
+
+Each email is declared once as a list of blocks (heading, paragraphs, a
+details panel, buttons, footer). At import the blocks are compiled, inside
+the shared layout, into two flat segment lists - one for the HTML part, one
+for the plain-text part - where every segment is either a literal string or
+a slot for a variable. Rendering a message only walks those lists and
+substitutes the values; no markup or inline CSS is rebuilt per message.
+
+Values are HTML-escaped in the HTML part. Placeholders use str.format
+syntax ({patient_name}); a block wrapped in optional('name', ...) is left
+out when that value is empty.
+"""
+from html import escape
+from string import Formatter
+
+APP_URL = "https://ayurwell2-o.vercel.app"
+PATIENT_APPOINTMENTS = f"{APP_URL}/patient/appointments"
+PRACTITIONER_APPOINTMENTS = f"{APP_URL}/practitioner/appointments"
+
+BLUE = "#2563eb"
+GREEN = "#10b981"
+AMBER = "#f59e0b"
+RED = "#ef4444"
+BRAND = "#2E7D32"
+
+# Panel background for each accent colour
+TINTS = {GREEN: "#ecfdf5", AMBER: "#fffbeb", RED: "#fef2f2", None: "#f3f4f6"}
+
+AUTOMATED = "This is an automated message from AyurWell."
+SECURITY = "This is an automated security notification from AyurWell."
+
+LAYOUT_HEAD = (
+    '<html>\n'
+    '<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">\n'
+    '<div style="max-width: 600px; margin: 0 auto; padding: 20px;">\n'
+)
+LAYOUT_TAIL = '</div>\n</body>\n</html>\n'
+
+# Inline styles shared by every template, built once
+_BUTTON = ('display: inline-block; background: {color}; color: white; padding: 12px 24px; '
+           'text-decoration: none; border-radius: 6px; margin: 20px 10px 20px 0;')
+_FOOTER = 'color: #6b7280; font-size: 14px; margin-top: 30px;'
+_FOOTER_RULED = _FOOTER + ' border-top: 1px solid #e5e7eb; padding-top: 20px;'
+_VALUE_STYLES = {
+    'plain': None,
+    'struck': 'text-decoration: line-through;',
+    'strong': 'color: {color}; font-weight: bold;',
+    'status': 'color: {color};',
+}
+
+
+# ==================== BLOCKS ====================
+# Each block yields (html, text) source fragments with {placeholders}.
+
+def heading(text, color):
+    return [(f'<h2 style="color: {color};">{text}</h2>\n', f'{text}\n\n')]
+
+
+def para(text, bold=False):
+    html = f'<strong>{text}</strong>' if bold else text
+    return [(f'<p>{html}</p>\n', f'{text}\n\n')]
+
+
+def warning(text):
+    return [(f'<p style="color: {RED}; font-weight: bold;">{text}</p>\n', f'{text}\n\n')]
+
+
+def row(label, value, style='plain', color=None):
+    css = _VALUE_STYLES[style]
+    html_value = f'<span style="{css.format(color=color)}">{value}</span>' if css else value
+    return [(f'<p><strong>{label}:</strong> {html_value}</p>\n', f'{label}: {value}\n')]
+
+
+def panel(*rows, accent=None):
+    border = f' border-left: 4px solid {accent};' if accent else ''
+    style = f'background: {TINTS[accent]}; padding: 15px; border-radius: 8px; margin: 20px 0;{border}'
+    return [(f'<div style="{style}">\n', '')] + [f for r in rows for f in r] + [('</div>\n', '\n')]
+
+
+def code_panel(value, caption, expiry):
+    return [(
+        '<div style="background: #E9F7EF; padding: 20px; border-radius: 8px; margin: 30px 0; text-align: center;">\n'
+        f'<p style="margin: 0; font-size: 14px; color: #666;">{caption}</p>\n'
+        f'<h1 style="color: {BRAND}; font-size: 42px; letter-spacing: 8px; margin: 15px 0; '
+        f"font-family: 'Courier New', monospace;\">{value}</h1>\n"
+        f'<p style="margin: 0; font-size: 12px; color: #999;">{expiry}</p>\n'
+        '</div>\n',
+        f'{caption} {value}\n{expiry}\n\n'
+    )]
+
+
+def button(label, url, color):
+    return [(f'<a href="{url}" style="{_BUTTON.format(color=color)}">{label}</a>\n', f'{label}: {url}\n')]
+
+
+def footer(text, ruled=False):
+    return [(f'<p style="{_FOOTER_RULED if ruled else _FOOTER}">{text}</p>\n', f'\n{text}\n')]
+
+
+def optional(name, *blocks):
+    """Blocks rendered only when the value `name` is non-empty"""
+    return [('optional', name, [f for b in blocks for f in b])]
+
+
+# ==================== COMPILER ====================
+
+class Segments:
+    """Pre-split format string: literals[0] + values[fields[0]] + literals[1] + ..."""
+    __slots__ = ('literals', 'fields')
+
+    def __init__(self, literals, fields):
+        self.literals = literals
+        self.fields = fields
+
+    def fill(self, values):
+        literals = self.literals
+        out = [literals[0]]
+        for i, field in enumerate(self.fields, 1):
+            out.append(values[field])
+            out.append(literals[i])
+        return ''.join(out)
+
+
+class CompiledTemplate:
+    """
+    One email compiled to pre-split segments for the subject, HTML and text
+    parts. Optional blocks become synthetic fields filled from their own
+    segments, so a render is a few list joins (str.format would re-parse
+    the whole markup on every call).
+    """
+    _formatter = Formatter()
+
+    def __init__(self, name, subject, blocks):
+        self.name = name
+        fragments = [f for b in blocks for f in b]
+        self.fields = set()
+        self.optionals = []  # [synthetic field, value name, html segments, text segments]
+
+        html_sources = [LAYOUT_HEAD] + [self._pick(f, 0) for f in fragments] + [LAYOUT_TAIL]
+        text_sources = [self._pick(f, 1) for f in fragments]
+        self.subject = self._compile([subject])
+        self.html = self._compile(html_sources, part=0)
+        self.text = self._compile(text_sources, part=1)
+
+    @staticmethod
+    def _pick(fragment, index):
+        if fragment[0] == 'optional':
+            return ('optional', fragment[1], [CompiledTemplate._pick(f, index) for f in fragment[2]])
+        return fragment[index]
+
+    def _compile(self, sources, part=None):
+        """Split sources into literals and fields, validating placeholders"""
+        literals, fields = [''], []
+        for index, source in enumerate(sources):
+            if isinstance(source, tuple):  # optional(name, ...)
+                slot = f'_optional_{part}_{index}'
+                if part == 0:
+                    self.optionals.append([slot, source[1], self._compile(source[2]), None])
+                else:
+                    # Text optionals pair with the HTML ones in declaration order
+                    pending = next(o for o in self.optionals if o[3] is None and o[1] == source[1])
+                    pending[3] = self._compile(source[2])
+                    slot = pending[0]
+                fields.append(slot)
+                literals.append('')
+                continue
+            for literal, field, spec, conversion in self._formatter.parse(source):
+                literals[-1] += literal
+                if field is not None:
+                    if spec or conversion or not field.isidentifier():
+                        raise ValueError(f"Template {self.name}: unsupported placeholder {{{field}}}")
+                    self.fields.add(field)
+                    fields.append(field)
+                    literals.append('')
+        return Segments(tuple(literals), tuple(fields))
+
+    def render(self, **values):
+        """
+        Returns:
+            tuple: (subject, html_body, text_body)
+        """
+        text_values = {k: '' if v is None else str(v) for k, v in values.items()}
+        html_values = {k: escape(v) for k, v in text_values.items()}
+        for slot, name, html_segments, text_segments in self.optionals:
+            present = bool(values.get(name))
+            html_values[slot] = html_segments.fill(html_values) if present else ''
+            text_values[slot] = text_segments.fill(text_values) if present else ''
+        return (
+            self.subject.fill(text_values),
+            self.html.fill(html_values),
+            self.text.fill(text_values)
+        )
+
+
+# ==================== DEFINITIONS ====================
+
+DEFINITIONS = {
+    'new_booking_request': ("New Appointment Request from {patient_name}", [
+        heading("New Appointment Request", BLUE),
+        para("Dear Dr. {doctor_name},"),
+        para("You have received a new appointment request:"),
+        panel(
+            row("Patient", "{patient_name}"),
+            row("Date & Time", "{appointment_time}"),
+            row("Status", "Pending Your Confirmation", 'status', AMBER),
+        ),
+        para("Please log in to your dashboard to confirm or reject this appointment."),
+        button("View Appointments", PRACTITIONER_APPOINTMENTS, BLUE),
+        footer(AUTOMATED),
+    ]),
+    'appointment_confirmed': ("Your Appointment is Confirmed", [
+        heading("Appointment Confirmed ✓", GREEN),
+        para("Dear {patient_name},"),
+        para("Great news! Your appointment has been confirmed."),
+        panel(
+            row("Doctor", "Dr. {doctor_name}"),
+            row("Date & Time", "{appointment_time}"),
+            row("Status", "Confirmed", 'status', GREEN),
+            accent=GREEN,
+        ),
+        para("Please arrive 10 minutes before your scheduled time."),
+        button("View My Appointments", PATIENT_APPOINTMENTS, GREEN),
+        footer(AUTOMATED),
+    ]),
+    'appointment_cancelled': ("Appointment Cancelled", [
+        heading("Appointment Cancelled", RED),
+        para("Dear {to_name},"),
+        para("An appointment has been cancelled by {cancelled_by}."),
+        panel(
+            row("Doctor", "Dr. {doctor_name}"),
+            row("Patient", "{patient_name}"),
+            row("Date & Time", "{appointment_time}"),
+            optional('reason', row("Reason", "{reason}")),
+            accent=RED,
+        ),
+        para("If you have any questions, please contact us."),
+        footer(AUTOMATED),
+    ]),
+    'patient_reschedule_request': ("Reschedule Request from {patient_name}", [
+        heading("Reschedule Request", AMBER),
+        para("Dear Dr. {doctor_name},"),
+        para("{patient_name} has requested to reschedule their appointment."),
+        panel(
+            row("Patient", "{patient_name}"),
+            row("Original Time", "{old_time}", 'struck'),
+            row("Requested Time", "{new_time}", 'strong', AMBER),
+            accent=AMBER,
+        ),
+        para("Please review and confirm the new time."),
+        button("Review Request", PRACTITIONER_APPOINTMENTS, AMBER),
+        footer(AUTOMATED),
+    ]),
+    'doctor_reschedule_proposal': ("Dr. {doctor_name} Proposed a New Appointment Time", [
+        heading("Appointment Time Change Requested", AMBER),
+        para("Dear {patient_name},"),
+        para("Dr. {doctor_name} has proposed a new time for your appointment."),
+        panel(
+            row("Original Time", "{old_time}", 'struck'),
+            row("Proposed Time", "{new_time}", 'strong', AMBER),
+            optional('reason', row("Reason", "{reason}")),
+            accent=AMBER,
+        ),
+        para("Please accept or reject this change.", bold=True),
+        button("Accept", PATIENT_APPOINTMENTS, GREEN),
+        button("Reject", PATIENT_APPOINTMENTS, RED),
+        footer(AUTOMATED),
+    ]),
+    'reschedule_accepted': ("{patient_name} Accepted Reschedule", [
+        heading("Reschedule Accepted ✓", GREEN),
+        para("Dear Dr. {doctor_name},"),
+        para("{patient_name} has accepted the new appointment time."),
+        panel(
+            row("Patient", "{patient_name}"),
+            row("Confirmed Time", "{new_time}"),
+            row("Status", "Confirmed", 'status', GREEN),
+            accent=GREEN,
+        ),
+        footer(AUTOMATED),
+    ]),
+    'reschedule_rejected_to_doctor': ("{patient_name} Rejected Reschedule", [
+        heading("Reschedule Rejected", RED),
+        para("Dear Dr. {doctor_name},"),
+        para("{patient_name} has rejected the proposed appointment time."),
+        panel(
+            row("Patient", "{patient_name}"),
+            row("Rejected Time", "{proposed_time}", 'struck'),
+            row("Original Time", "{start_time}"),
+            row("Status", "Reschedule Rejected", 'status', RED),
+            accent=RED,
+        ),
+        para("The reschedule request has been rejected. You may contact the patient to schedule a new time."),
+        footer(AUTOMATED),
+    ]),
+    'appointment_completed': ("Appointment Completed - Thank You!", [
+        heading("Appointment Completed", BLUE),
+        para("Dear {patient_name},"),
+        para("Thank you for visiting Dr. {doctor_name}. "
+             "Your appointment on {appointment_time} has been marked as completed."),
+        panel(para("We hope you had a good experience. If you have any feedback, please let us know.")),
+        para("You can view your appointment history and prescriptions in your dashboard."),
+        button("View Dashboard", PATIENT_APPOINTMENTS, BLUE),
+        footer(AUTOMATED),
+    ]),
+    'reschedule_rejected_to_patient': ("Dr. {doctor_name} Rejected Reschedule", [
+        heading("Reschedule Rejected", RED),
+        para("Dear {patient_name},"),
+        para("Dr. {doctor_name} has rejected your proposed appointment time."),
+        panel(
+            row("Doctor", "{doctor_name}"),
+            row("Rejected Time", "{proposed_time}", 'struck'),
+            row("Original Time", "{start_time}"),
+            row("Status", "Remains at Original Time or Canceled", 'status', RED),
+            accent=RED,
+        ),
+        para("Please contact the doctor if you need to discuss further."),
+        footer(AUTOMATED),
+    ]),
+    'otp': ("{subject}", [
+        heading("Email Verification", BRAND),
+        para("Hello,"),
+        para("Thank you for using AyurWell. To {action_text}, please use the following verification code:"),
+        code_panel("{otp_code}", "Your verification code is:", "This code will expire in 5 minutes"),
+        para("If you didn't request this verification code, please ignore this email."),
+        footer("This is an automated message from AyurWell. Please do not reply to this email.", ruled=True),
+    ]),
+    'email_changed': ("Your AyurWell Email Address Has Been Changed", [
+        heading("Email Address Changed", AMBER),
+        para("Dear {name},"),
+        para("This is to inform you that the email address associated with your "
+             "AyurWell account has been successfully changed."),
+        panel(
+            row("Previous Email", "{previous_email}"),
+            row("Status", "Email Changed", 'status', AMBER),
+            accent=AMBER,
+        ),
+        warning("If you did not make this change, please contact our support team immediately."),
+        footer(SECURITY, ruled=True),
+    ]),
+    'password_changed': ("Your AyurWell Password Has Been Changed", [
+        heading("Password Changed", AMBER),
+        para("Dear {name},"),
+        para("This is to inform you that the password for your AyurWell account has been successfully changed."),
+        panel(row("Status", "Password Changed", 'status', AMBER), accent=AMBER),
+        warning("If you did not make this change, please contact our support team immediately."),
+        footer(SECURITY, ruled=True),
+    ]),
+}
+
+# Compiled once at import
+TEMPLATES = {name: CompiledTemplate(name, subject, blocks) for name, (subject, blocks) in DEFINITIONS.items()}
+
+
+def render(template, /, **values):
+    """
+    Render a compiled template
+
+    Returns:
+        tuple: (subject, html_body, text_body)
+    """
+    return TEMPLATES[template].render(**values)
+
+
+def wrap_layout(content_html):
+    """Wrap pre-rendered HTML content in the shared layout (digests)"""
+    return LAYOUT_HEAD + content_html + LAYOUT_TAIL
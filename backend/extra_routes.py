@@ -1,38 +1,37 @@
 from flask import Blueprint, request, jsonify
-from models import Appointment, User, Patient, Doctor, Assessment, get_ist_now
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import Appointment, Assessment, get_ist_now
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime, timedelta, timezone
-from email_service import email_service, format_appointment_time
-from appointment_utils import auto_complete_appointments
+from email_service import format_appointment_time
+from notifications import notify
+from identity_cache import identity_cache
+from admin_stats import record_appointment_created
+from availability import availability_cache, parse_window, SLOT_MINUTES
+import slot_reservations
+from slot_reservations import SlotConflict
+from bson import ObjectId
+from doctor_roster import get_roster
+from doctor_patients import refresh_pair
+from auth_middleware import claims_required, current_role, patient_access_required
+from pagination import get_page_request, paginate, page_envelope
+from serializers import APPOINTMENT_FIELDS, UPCOMING_APPOINTMENT_FIELDS
 
 appt_bp = Blueprint('appointments', __name__)
 
+# Fields returned by the assessment list endpoints
+ASSESSMENT_LIST_FIELDS = (
+    'id', 'assessmentId', 'patientId', 'patientName', 'doctorId', 'doctorName', 'createdAt',
+    'assessment', 'healthHistory', 'medicalConditions', 'lifestyle', 'dietaryHabits',
+    'symptoms', 'notes', 'updatedAt'
+)
+
 # ==================== HELPER FUNCTIONS ====================
 
-def check_appointment_conflict(doctor_id, start_time, exclude_appointment_id=None):
-    """
-    Check if there's a conflicting appointment
-    
-    Args:
-        doctor_id: Doctor's ID
-        start_time: Proposed start time
-        exclude_appointment_id: Appointment ID to exclude (for rescheduling)
-    
-    Returns:
-        bool: True if conflict exists, False otherwise
-    """
-    query = {
-        'doctorId': doctor_id,
-        'startTimestamp': start_time,
-        'status__in': ['pending', 'confirmed', 'doctor_rescheduled_pending', 'patient_rescheduled_pending']
-    }
-    
-    appointments = Appointment.objects(**query)
-    
-    if exclude_appointment_id:
-        appointments = appointments.filter(id__ne=exclude_appointment_id)
-    
-    return appointments.count() > 0
+def appointment_length(appt):
+    """Duration of an existing appointment (30 minutes when no end time is stored)"""
+    if appt.endTimestamp and appt.startTimestamp:
+        return appt.endTimestamp - appt.startTimestamp
+    return timedelta(minutes=SLOT_MINUTES)
 
 
 def validate_status_transition(current_status, new_status):
@@ -61,10 +60,50 @@ def validate_status_transition(current_status, new_status):
 
 def get_user_email(user_id):
     """Get user email from User collection"""
-    user = User.objects(uid=user_id).first()
+    user = identity_cache.get_user(user_id)
     return user.email if user else None
 
 
+def create_appointment(doctor_id, patient_id, doctor_name, patient_name, start_dt, end_dt, notes=''):
+    """
+    Booking write path: reserve every slice of [start_dt, end_dt), then
+    insert the pending appointment (reservations are rolled back if the
+    insert fails)
+
+    Returns:
+        Appointment: The new appointment
+
+    Raises:
+        SlotConflict: If the doctor already has an appointment in the interval
+    """
+    # Reserve first; the unique index rejects overlaps
+    appointment_id = ObjectId()
+    slot_reservations.reserve(doctor_id, patient_id, appointment_id, start_dt, end_dt)
+    
+    appt = Appointment(
+        id=appointment_id,
+        patientId=patient_id,
+        doctorId=doctor_id,
+        patientName=patient_name,
+        doctorName=doctor_name,
+        startTimestamp=start_dt,
+        endTimestamp=end_dt,
+        status='pending',
+        notes=notes,
+        createdAt=get_ist_now(),
+        updatedAt=get_ist_now()
+    )
+    try:
+        appt.save(force_insert=True)
+    except Exception:
+        slot_reservations.release(appointment_id)
+        raise
+    record_appointment_created(appt.createdAt)
+    availability_cache.invalidate(doctor_id, start_dt)
+    refresh_pair(doctor_id, patient_id)
+    return appt
+
+
 # ==================== APPOINTMENT ENDPOINTS ====================
 
 @appt_bp.route('/book', methods=['POST'])
@@ -84,9 +123,14 @@ def book_appointment():
     if not doctor_id or not start_time_str:
         return jsonify({"error": "Missing required fields: doctor_id, startTimestamp"}), 400
     
+    try:
+        duration = slot_reservations.parse_duration(data.get('durationMinutes'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     # Get patient and doctor info
-    patient = Patient.objects(patientId=user_id).first()
-    doctor = Doctor.objects(doctorId=doctor_id).first()
+    patient = identity_cache.get_patient(user_id)
+    doctor = identity_cache.get_doctor(doctor_id)
     
     if not patient or not doctor:
         return jsonify({"error": "Patient or Doctor not found"}), 404
@@ -105,35 +149,22 @@ def book_appointment():
     if start_dt < get_ist_now():
         return jsonify({"warning": "Cannot book appointments in the past."}), 400
     
-    # Check for conflicts
-    if check_appointment_conflict(doctor_id, start_dt):
+    end_dt = start_dt + timedelta(minutes=duration)
+    
+    try:
+        appt = create_appointment(doctor_id, user_id, doctor.name, patient.name, start_dt, end_dt, notes)
+    except SlotConflict:
         return jsonify({
             "warning": "This time slot is already booked",
             "conflict": True
         }), 409
     
-    # Calculate end time (default 30 minutes)
-    end_dt = start_dt + timedelta(minutes=30)
-    
-    # Create appointment
-    appt = Appointment(
-        patientId=user_id,
-        doctorId=doctor_id,
-        patientName=patient.name,
-        doctorName=doctor.name,
-        startTimestamp=start_dt,
-        endTimestamp=end_dt,
-        status='pending',
-        notes=notes,
-        createdAt=get_ist_now(),
-        updatedAt=get_ist_now()
-    )
-    appt.save()
-    
     # Send email to doctor
     doctor_email = get_user_email(doctor_id)
     if doctor_email:
-        email_service.send_new_booking_request(
+        notify(
+            appt.doctorId,
+            'send_new_booking_request',
             doctor_email,
             doctor.name,
             patient.name,
@@ -149,41 +180,35 @@ def book_appointment():
 
 @appt_bp.route('/me', methods=['GET'])
 @jwt_required()
+@claims_required()
 def get_my_appointments():
     """Get appointments for current user (patient or doctor)"""
-    # Auto-complete past confirmed appointments
-    auto_complete_appointments()
-
     user_id = get_jwt_identity()
-    user = User.objects(uid=user_id).first()
     
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    try:
+        page = get_page_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Determine if user is doctor or patient
-    if user.role == 'doctor':
-        appointments = Appointment.objects(doctorId=user_id).order_by('-startTimestamp')
+    if current_role() == 'doctor':
+        appointments = Appointment.objects(doctorId=user_id)
     else:
-        appointments = Appointment.objects(patientId=user_id).order_by('-startTimestamp')
-    
-    return jsonify([{
-        "id": str(a.id),
-        "doctorId": a.doctorId,
-        "patientId": a.patientId,
-        "doctorName": a.doctorName,
-        "patientName": a.patientName,
-        "startTimestamp": a.startTimestamp.isoformat(),
-        "endTimestamp": a.endTimestamp.isoformat() if a.endTimestamp else None,
-        "status": a.status,
-        "notes": a.notes,
-        "cancelReason": a.cancelReason,
-        "rescheduleReason": getattr(a, 'rescheduleReason', None),
-        "isRescheduledBy": a.isRescheduledBy,
-        "proposedStartTimestamp": a.proposedStartTimestamp.isoformat() if a.proposedStartTimestamp else None,
-        "proposedEndTimestamp": a.proposedEndTimestamp.isoformat() if a.proposedEndTimestamp else None,
-        "createdAt": a.createdAt.isoformat(),
-        "updatedAt": a.updatedAt.isoformat()
-    } for a in appointments]), 200
+        appointments = Appointment.objects(patientId=user_id)
+    
+    # Raw projected rows: no Document construction on this hot path
+    appointments = APPOINTMENT_FIELDS.query(appointments)
+    next_cursor = None
+    if page is None:
+        appointments = appointments.order_by('-startTimestamp')
+    else:
+        appointments, next_cursor = paginate(appointments, ['-startTimestamp'], page)
+    
+    results = APPOINTMENT_FIELDS.serialize_many(appointments)
+    
+    if page is None:
+        return jsonify(results), 200
+    return jsonify(page_envelope(results, next_cursor, page)), 200
 
 
 @appt_bp.route('/doctor/<doctor_id>/upcoming', methods=['GET'])
@@ -193,17 +218,41 @@ def get_doctor_upcoming_appointments(doctor_id):
     Get all upcoming appointments for a doctor (for slot availability checking)
     Returns pending and confirmed appointments
     """
-    appointments = Appointment.objects(
+    appointments = UPCOMING_APPOINTMENT_FIELDS.query(Appointment.objects(
         doctorId=doctor_id,
         status__in=['pending', 'confirmed']
-    ).order_by('startTimestamp')
+    )).order_by('startTimestamp')
     
-    return jsonify([{
-        "id": str(a.id),
-        "startTimestamp": a.startTimestamp.isoformat(),
-        "endTimestamp": a.endTimestamp.isoformat() if a.endTimestamp else None,
-        "status": a.status
-    } for a in appointments]), 200
+    return jsonify(UPCOMING_APPOINTMENT_FIELDS.serialize_many(appointments)), 200
+
+
+@appt_bp.route('/doctor/<doctor_id>/availability', methods=['GET'])
+@jwt_required()
+def get_doctor_availability(doctor_id):
+    """
+    Free slots for a doctor (?from=YYYY-MM-DD&to=YYYY-MM-DD, IST; default next 7 days)
+    Computed from clinicHours minus active appointments, see availability.py
+    """
+    try:
+        first_day, last_day = parse_window(request.args.get('from'), request.args.get('to'))
+        duration = slot_reservations.parse_duration(request.args.get('duration'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    doctor = identity_cache.get_doctor(doctor_id)
+    if not doctor:
+        return jsonify({"error": "Doctor not found"}), 404
+    
+    days = availability_cache.get_free_slots(doctor, first_day, last_day, duration)
+    
+    return jsonify({
+        "doctorId": doctor_id,
+        "from": first_day.isoformat(),
+        "to": last_day.isoformat(),
+        "slotMinutes": SLOT_MINUTES,
+        "durationMinutes": duration,
+        "days": days
+    }), 200
 
 
 @appt_bp.route('/<appointment_id>/confirm', methods=['POST'])
@@ -232,6 +281,8 @@ def confirm_appointment(appointment_id):
     # If confirming a reschedule, apply the proposed time
     if appt.status == 'patient_rescheduled_pending':
         if appt.proposedStartTimestamp:
+            availability_cache.invalidate(appt.doctorId, appt.startTimestamp, appt.proposedStartTimestamp)
+            slot_reservations.apply_proposal(appt.id, appt.proposedStartTimestamp, appt.proposedEndTimestamp)
             appt.startTimestamp = appt.proposedStartTimestamp
             appt.endTimestamp = appt.proposedEndTimestamp
             appt.proposedStartTimestamp = None
@@ -240,11 +291,14 @@ def confirm_appointment(appointment_id):
     appt.status = 'confirmed'
     appt.updatedAt = get_ist_now()
     appt.save()
+    refresh_pair(appt.doctorId, appt.patientId)
     
     # Send confirmation email to patient
     patient_email = get_user_email(appt.patientId)
     if patient_email:
-        email_service.send_appointment_confirmed(
+        notify(
+            appt.patientId,
+            'send_appointment_confirmed',
             patient_email,
             appt.patientName,
             appt.doctorName,
@@ -300,13 +354,18 @@ def cancel_appointment(appointment_id):
     appt.cancelReason = reason if reason else f"Cancelled by {cancelled_by}"
     appt.updatedAt = get_ist_now()
     appt.save()
+    slot_reservations.release(appt.id)
+    availability_cache.invalidate(appt.doctorId, appt.startTimestamp, appt.proposedStartTimestamp)
+    refresh_pair(appt.doctorId, appt.patientId)
     
     # Send email to the other party
     if appt.doctorId == user_id:
         # Doctor cancelled, notify patient
         patient_email = get_user_email(appt.patientId)
         if patient_email:
-            email_service.send_appointment_cancelled(
+            notify(
+                appt.patientId,
+                'send_appointment_cancelled',
                 patient_email,
                 appt.patientName,
                 "the doctor",
@@ -319,7 +378,9 @@ def cancel_appointment(appointment_id):
         # Patient cancelled, notify doctor
         doctor_email = get_user_email(appt.doctorId)
         if doctor_email:
-            email_service.send_appointment_cancelled(
+            notify(
+                appt.doctorId,
+                'send_appointment_cancelled',
                 doctor_email,
                 appt.doctorName,
                 "the patient",
@@ -370,16 +431,16 @@ def patient_reschedule(appointment_id):
     except ValueError:
         return jsonify({"error": "Invalid date format"}), 400
     
-    # Check for conflicts (exclude current appointment)
-    if check_appointment_conflict(appt.doctorId, new_start_dt, exclude_appointment_id=appointment_id):
+    # Hold the proposed time (overlap with this appointment's own time is allowed)
+    new_end_dt = new_start_dt + appointment_length(appt)
+    try:
+        slot_reservations.reserve_proposal(appt.doctorId, appt.patientId, appt.id, new_start_dt, new_end_dt)
+    except SlotConflict:
         return jsonify({
             "error": "The new time slot is already booked",
             "conflict": True
         }), 409
     
-    # Calculate new end time
-    new_end_dt = new_start_dt + timedelta(minutes=30)
-    
     # Store proposed time and change status
     appt.proposedStartTimestamp = new_start_dt
     appt.proposedEndTimestamp = new_end_dt
@@ -387,11 +448,15 @@ def patient_reschedule(appointment_id):
     appt.isRescheduledBy = 'patient'
     appt.updatedAt = get_ist_now()
     appt.save()
+    availability_cache.invalidate(appt.doctorId, new_start_dt)
+    refresh_pair(appt.doctorId, appt.patientId)
     
     # Send email to doctor
     doctor_email = get_user_email(appt.doctorId)
     if doctor_email:
-        email_service.send_patient_reschedule_request(
+        notify(
+            appt.doctorId,
+            'send_patient_reschedule_request',
             doctor_email,
             appt.doctorName,
             appt.patientName,
@@ -455,16 +520,16 @@ def doctor_reschedule(appointment_id):
     except ValueError:
         return jsonify({"error": "Invalid date format"}), 400
     
-    # Check for conflicts
-    if check_appointment_conflict(appt.doctorId, new_start_dt, exclude_appointment_id=appointment_id):
+    # Hold the proposed time (overlap with this appointment's own time is allowed)
+    new_end_dt = new_start_dt + appointment_length(appt)
+    try:
+        slot_reservations.reserve_proposal(appt.doctorId, appt.patientId, appt.id, new_start_dt, new_end_dt)
+    except SlotConflict:
         return jsonify({
             "error": "The new time slot is already booked",
             "conflict": True
         }), 409
     
-    # Calculate new end time
-    new_end_dt = new_start_dt + timedelta(minutes=30)
-    
     # Store proposed time, reason, and change status
     appt.proposedStartTimestamp = new_start_dt
     appt.proposedEndTimestamp = new_end_dt
@@ -473,11 +538,15 @@ def doctor_reschedule(appointment_id):
     appt.isRescheduledBy = 'doctor'
     appt.updatedAt = get_ist_now()
     appt.save()
+    availability_cache.invalidate(appt.doctorId, new_start_dt)
+    refresh_pair(appt.doctorId, appt.patientId)
     
     # Send email to patient
     patient_email = get_user_email(appt.patientId)
     if patient_email:
-        email_service.send_doctor_reschedule_proposal(
+        notify(
+            appt.patientId,
+            'send_doctor_reschedule_proposal',
             patient_email,
             appt.patientName,
             appt.doctorName,
@@ -537,6 +606,8 @@ def accept_reschedule(appointment_id):
     if not appt.proposedStartTimestamp:
         return jsonify({"error": "No proposed time found"}), 400
     
+    availability_cache.invalidate(appt.doctorId, appt.startTimestamp, appt.proposedStartTimestamp)
+    slot_reservations.apply_proposal(appt.id, appt.proposedStartTimestamp, appt.proposedEndTimestamp)
     appt.startTimestamp = appt.proposedStartTimestamp
     appt.endTimestamp = appt.proposedEndTimestamp
     appt.proposedStartTimestamp = None
@@ -545,13 +616,16 @@ def accept_reschedule(appointment_id):
     appt.isRescheduledBy = None
     appt.updatedAt = get_ist_now()
     appt.save()
+    refresh_pair(appt.doctorId, appt.patientId)
     
     # Send confirmation email
     if appt.patientId == user_id:
         # Patient accepted, notify doctor
         doctor_email = get_user_email(appt.doctorId)
         if doctor_email:
-            email_service.send_reschedule_accepted(
+            notify(
+                appt.doctorId,
+                'send_reschedule_accepted',
                 doctor_email,
                 appt.doctorName,
                 appt.patientName,
@@ -561,7 +635,9 @@ def accept_reschedule(appointment_id):
         # Doctor accepted, notify patient
         patient_email = get_user_email(appt.patientId)
         if patient_email:
-            email_service.send_reschedule_accepted(
+            notify(
+                appt.patientId,
+                'send_reschedule_accepted',
                 patient_email,
                 appt.patientName,
                 appt.doctorName,
@@ -608,13 +684,18 @@ def reject_reschedule(appointment_id):
     appt.isRescheduledBy = None
     appt.updatedAt = get_ist_now()
     appt.save()
+    slot_reservations.release(appt.id, kind='proposal')
+    availability_cache.invalidate(appt.doctorId, proposedStartTimestamp)
+    refresh_pair(appt.doctorId, appt.patientId)
     
     # Send notification email
     if appt.patientId == user_id:
         # Patient rejected, notify doctor
         doctor_email = get_user_email(appt.doctorId)
         if doctor_email:
-            email_service.send_reschedule_rejected_to_doctor(
+            notify(
+                appt.doctorId,
+                'send_reschedule_rejected_to_doctor',
                 doctor_email,
                 appt.doctorName,
                 appt.patientName,
@@ -625,7 +706,9 @@ def reject_reschedule(appointment_id):
         # Doctor rejected, notify patient
         patient_email = get_user_email(appt.patientId)
         if patient_email:
-            email_service.send_reschedule_rejected_to_patient(
+            notify(
+                appt.patientId,
+                'send_reschedule_rejected_to_patient',
                 patient_email,
                 appt.doctorName,
                 appt.patientName,
@@ -659,14 +742,11 @@ def get_doctor_appointments(doctor_id):
 
 @appt_bp.route('/assessments', methods=['POST'])
 @jwt_required()
+@claims_required('doctor', message='Only doctors can create assessments')
 def create_assessment():
     """Create a new assessment for a patient (doctor only)"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.objects(uid=current_user_id).first()
-        
-        if not user or user.role != 'doctor':
-            return jsonify({'error': 'Only doctors can create assessments'}), 403
         
         data = request.get_json()
         patient_id = data.get('patientId')
@@ -675,7 +755,7 @@ def create_assessment():
             return jsonify({'error': 'Patient ID is required'}), 400
         
         # Verify patient exists
-        patient = Patient.objects(patientId=patient_id).first()
+        patient = identity_cache.get_patient(patient_id)
         if not patient:
             return jsonify({'error': 'Patient not found'}), 404
         
@@ -683,11 +763,18 @@ def create_assessment():
         import uuid
         assessment_id = f"ASMT-{uuid.uuid4().hex[:12].upper()}"
         
-        # Create assessment
+        doctor_name = get_jwt().get('name')
+        if not doctor_name:
+            doctor = identity_cache.get_user(current_user_id)
+            doctor_name = doctor.name if doctor else None
+        
+        # Create assessment (with name snapshots so lists never join)
         assessment = Assessment(
             assessmentId=assessment_id,
             patientId=patient_id,
             doctorId=current_user_id,
+            patientName=patient.name,
+            doctorName=doctor_name,
             assessment=data.get('assessment', {}),
             healthHistory=data.get('healthHistory', ''),
             medicalConditions=data.get('medicalConditions', ''),
@@ -726,19 +813,33 @@ def create_assessment():
 
 @appt_bp.route('/assessments/patient/<patient_id>', methods=['GET'])
 @jwt_required()
+@patient_access_required
 def get_patient_assessments(patient_id):
     """Get all assessments for a specific patient"""
     try:
+        try:
+            page = get_page_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Fetch all assessments for the patient, sorted by newest first
-        assessments = Assessment.objects(patientId=patient_id).order_by('-createdAt')
+        assessments = Assessment.objects(patientId=patient_id).only(*ASSESSMENT_LIST_FIELDS)
+        next_cursor = None
+        if page is None:
+            assessments = assessments.order_by('-createdAt')
+        else:
+            assessments, next_cursor = paginate(assessments, ['-createdAt'], page)
         
-        # Get doctor names for each assessment
+        # Doctor names come from the snapshot on each assessment
         assessment_list = []
         ist_tz = timezone(timedelta(hours=5, minutes=30))
         
         for asmt in assessments:
-            doctor = User.objects(uid=asmt.doctorId).first()
-            doctor_name = doctor.name if doctor else "Unknown Doctor"
+            doctor_name = asmt.doctorName
+            if not doctor_name:
+                # Not yet backfilled (see migrate_assessment_names.py)
+                doctor = identity_cache.get_user(asmt.doctorId)
+                doctor_name = doctor.name if doctor else "Unknown Doctor"
             
             # Ensure timestamps are in IST
             created_at = asmt.createdAt
@@ -769,6 +870,8 @@ def get_patient_assessments(patient_id):
                 'updatedAt': updated_at
             })
         
+        if page is not None:
+            return jsonify(page_envelope(assessment_list, next_cursor, page)), 200
         return jsonify({
             'assessments': assessment_list,
             'count': len(assessment_list)
@@ -780,26 +883,39 @@ def get_patient_assessments(patient_id):
 
 @appt_bp.route('/assessments/doctor/<doctor_id>', methods=['GET'])
 @jwt_required()
+@claims_required()
 def get_doctor_assessments(doctor_id):
     """Get all assessments created by a specific doctor"""
     try:
         current_user_id = get_jwt_identity()
         
         # Verify the requesting user is the doctor or an admin
-        user = User.objects(uid=current_user_id).first()
-        if not user or (user.uid != doctor_id and user.role != 'admin'):
+        if current_user_id != doctor_id and current_role() != 'admin':
             return jsonify({'error': 'Unauthorized'}), 403
         
+        try:
+            page = get_page_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Fetch all assessments by the doctor, sorted by newest first
-        assessments = Assessment.objects(doctorId=doctor_id).order_by('-createdAt')
+        assessments = Assessment.objects(doctorId=doctor_id).only(*ASSESSMENT_LIST_FIELDS)
+        next_cursor = None
+        if page is None:
+            assessments = assessments.order_by('-createdAt')
+        else:
+            assessments, next_cursor = paginate(assessments, ['-createdAt'], page)
         
-        # Get patient names for each assessment
+        # Patient names come from the snapshot on each assessment
         assessment_list = []
         ist_tz = timezone(timedelta(hours=5, minutes=30))
         
         for asmt in assessments:
-            patient = Patient.objects(patientId=asmt.patientId).first()
-            patient_name = patient.name if patient else "Unknown Patient"
+            patient_name = asmt.patientName
+            if not patient_name:
+                # Not yet backfilled (see migrate_assessment_names.py)
+                patient = identity_cache.get_patient(asmt.patientId)
+                patient_name = patient.name if patient else "Unknown Patient"
             
             # Ensure timestamps are in IST
             created_at = asmt.createdAt
@@ -830,6 +946,8 @@ def get_doctor_assessments(doctor_id):
                 'updatedAt': updated_at
             })
         
+        if page is not None:
+            return jsonify(page_envelope(assessment_list, next_cursor, page)), 200
         return jsonify({
             'assessments': assessment_list,
             'count': len(assessment_list)
@@ -849,17 +967,23 @@ def get_assessment(assessment_id):
         if not assessment:
             return jsonify({'error': 'Assessment not found'}), 404
         
-        # Get doctor and patient names
-        doctor = User.objects(uid=assessment.doctorId).first()
-        patient = Patient.objects(patientId=assessment.patientId).first()
+        # Get doctor and patient names (snapshots, falling back for old records)
+        patient_name = assessment.patientName
+        if not patient_name:
+            patient = identity_cache.get_patient(assessment.patientId)
+            patient_name = patient.name if patient else "Unknown"
+        doctor_name = assessment.doctorName
+        if not doctor_name:
+            doctor = identity_cache.get_user(assessment.doctorId)
+            doctor_name = doctor.name if doctor else "Unknown"
         
         return jsonify({
             'assessment': {
                 'assessmentId': assessment.assessmentId,
                 'patientId': assessment.patientId,
-                'patientName': patient.name if patient else "Unknown",
+                'patientName': patient_name,
                 'doctorId': assessment.doctorId,
-                'doctorName': doctor.name if doctor else "Unknown",
+                'doctorName': doctor_name,
                 'createdAt': assessment.createdAt.isoformat(),
                 'assessment': assessment.assessment,
                 'healthHistory': assessment.healthHistory,
@@ -878,14 +1002,11 @@ def get_assessment(assessment_id):
 
 @appt_bp.route('/assessments/<assessment_id>/notes', methods=['PATCH'])
 @jwt_required()
+@claims_required('doctor', message='Only doctors can update assessments')
 def update_assessment_notes(assessment_id):
     """Update notes for an assessment (doctor only)"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.objects(uid=current_user_id).first()
-        
-        if not user or user.role != 'doctor':
-            return jsonify({'error': 'Only doctors can update assessments'}), 403
         
         assessment = Assessment.objects(assessmentId=assessment_id).first()
         
@@ -918,74 +1039,28 @@ def update_assessment_notes(assessment_id):
 
 @appt_bp.route('/doctor/patients', methods=['GET'])
 @jwt_required()
+@claims_required('doctor', message='Only doctors can access this endpoint')
 def get_doctor_patients():
     """
     Get patients who have confirmed or completed appointments with the current doctor.
     Only returns patients with at least one confirmed or completed appointment.
+    Optional ?name= filter; paginated with ?limit=&cursor= (see doctor_roster.py).
     """
     try:
-        # Auto-complete past confirmed appointments
-        auto_complete_appointments()
-        
         current_user_id = get_jwt_identity()
-        user = User.objects(uid=current_user_id).first()
-        
-        if not user or user.role != 'doctor':
-            return jsonify({'error': 'Only doctors can access this endpoint'}), 403
-        
-        # Find all appointments for this doctor with confirmed or completed status
-        appointments = Appointment.objects(
-            doctorId=current_user_id,
-            status__in=['confirmed', 'completed']
-        ).order_by('-startTimestamp')
-        
-        # Extract unique patient IDs and track last appointment for each
-        patient_appointments = {}
-        for appt in appointments:
-            if appt.patientId not in patient_appointments:
-                patient_appointments[appt.patientId] = {
-                    'lastAppointmentDate': appt.startTimestamp,
-                    'lastAppointmentStatus': appt.status
-                }
-        
-        # Fetch patient details for unique patient IDs
-        patient_ids = list(patient_appointments.keys())
-        patients = Patient.objects(patientId__in=patient_ids)
-        
-        # Build response with patient info and last appointment details
-        patient_list = []
-        ist_tz = timezone(timedelta(hours=5, minutes=30))
+        page = get_page_request()
+        name = request.args.get('name', '').strip() or None
         
-        for patient in patients:
-            last_appt_info = patient_appointments.get(patient.patientId, {})
-            
-            # Convert timestamp to IST
-            last_appt_date = last_appt_info.get('lastAppointmentDate')
-            if last_appt_date:
-                if last_appt_date.tzinfo is None:
-                    last_appt_date = last_appt_date.replace(tzinfo=timezone.utc)
-                last_appt_date = last_appt_date.astimezone(ist_tz).isoformat()
-            
-            patient_list.append({
-                'id': str(patient.id),
-                'patientId': patient.patientId,
-                'name': patient.name,
-                'lastAppointment': {
-                    'date': last_appt_date,
-                    'status': last_appt_info.get('lastAppointmentStatus')
-                } if last_appt_info else None
-            })
-        
-        # Sort by last appointment date (most recent first)
-        patient_list.sort(
-            key=lambda x: x['lastAppointment']['date'] if x['lastAppointment'] else '',
-            reverse=True
-        )
+        patient_list, next_cursor = get_roster(current_user_id, page, name)
         
+        if page is not None:
+            return jsonify(page_envelope(patient_list, next_cursor, page)), 200
         return jsonify({
             'patients': patient_list,
             'count': len(patient_list)
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
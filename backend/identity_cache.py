@@ -0,0 +1,145 @@
+"""
+Read-through cache for User / Patient / Doctor identity lookups
+
+Two layers:
+  - a per-request memo on flask.g, so the same lookup never hits Mongo
+    twice within one request
+  - a process-wide LRU with a TTL, shared across requests
+
+Cached documents are shared between requests and threads: callers must
+treat them as read-only. Handlers that modify a profile load it with a
+normal query and call identity_cache.invalidate(uid) after saving.
+
+Each worker process has its own LRU, so invalidation is local to the
+worker that handled the write; the TTL bounds staleness elsewhere.
+Security checks pass a shorter max_age to get_user() to tighten that bound.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_app_context
+from models import User, Patient, Doctor
+
+
+class IdentityCache:
+    """Bounded LRU + TTL cache for identity documents, keyed by (kind, uid)"""
+
+    LOADERS = {
+        'user': lambda uid: User.objects(uid=uid).first(),
+        'patient': lambda uid: Patient.objects(patientId=uid).first(),
+        'doctor': lambda uid: Doctor.objects(doctorId=uid).first(),
+    }
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or int(os.getenv("IDENTITY_CACHE_SIZE", "5000"))
+        self.ttl = ttl or float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+        self._entries = OrderedDict()  # (kind, uid) -> (expires_at, document)
+        self._lock = threading.Lock()
+        self._stats = {
+            'requestHits': 0,
+            'cacheHits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    # ==================== LOOKUPS ====================
+
+    def get_user(self, uid, max_age=None):
+        """max_age (seconds) reloads an entry cached longer ago than that"""
+        return self._get('user', uid, max_age)
+
+    def get_patient(self, uid):
+        return self._get('patient', uid)
+
+    def get_doctor(self, uid):
+        return self._get('doctor', uid)
+
+    def _request_memo(self):
+        if not has_app_context():
+            return None
+        memo = getattr(g, '_identity_memo', None)
+        if memo is None:
+            memo = g._identity_memo = {}
+        return memo
+
+    def _get(self, kind, uid, max_age=None):
+        if not uid:
+            return None
+        key = (kind, uid)
+
+        memo = self._request_memo()
+        if memo is not None and key in memo:
+            with self._lock:
+                self._stats['requestHits'] += 1
+            return memo[key]
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                fresh_until = entry[0] if max_age is None else min(entry[0], entry[0] - self.ttl + max_age)
+                if fresh_until > now:
+                    self._entries.move_to_end(key)
+                    self._stats['cacheHits'] += 1
+                    doc = entry[1]
+                else:
+                    del self._entries[key]
+                    self._stats['expired'] += 1
+                    entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+
+        if entry is None:
+            doc = self.LOADERS[kind](uid)
+            # Misses are not cached: a profile created a moment later must be visible
+            if doc is not None:
+                with self._lock:
+                    self._entries[key] = (now + self.ttl, doc)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self._stats['evictions'] += 1
+
+        if memo is not None:
+            memo[key] = doc
+        return doc
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate(self, uid):
+        """Drop every cached identity record for uid (user, patient and doctor)"""
+        with self._lock:
+            for kind in self.LOADERS:
+                self._entries.pop((kind, uid), None)
+            self._stats['invalidations'] += 1
+        memo = self._request_memo()
+        if memo is not None:
+            for kind in self.LOADERS:
+                memo.pop((kind, uid), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ==================== METRICS ====================
+
+    def stats(self):
+        """Counters plus hit rates, for sizing max_size / ttl"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['requestHits'] + stats['cacheHits'] + stats['misses']
+        stats['maxSize'] = self.max_size
+        stats['ttlSeconds'] = self.ttl
+        stats['lookups'] = lookups
+        stats['hitRate'] = round((stats['requestHits'] + stats['cacheHits']) / lookups, 4) if lookups else 0.0
+        stats['cacheHitRate'] = round(stats['cacheHits'] / (stats['cacheHits'] + stats['misses']), 4) \
+            if stats['cacheHits'] + stats['misses'] else 0.0
+        return stats
+
+
+# Global identity cache instance
+identity_cache = IdentityCache()
@@ -0,0 +1,62 @@
+"""
+Database migration script for assessment name snapshots
+Backfills patientName / doctorName on existing assessments.
+
+Works per person rather than per assessment: one update_many per patient
+and per doctor that still has assessments without a snapshot. Safe to re-run.
+"""
+from models import db, Assessment, Patient, User
+from flask import Flask
+from dotenv import load_dotenv
+import os
+
+BATCH_SIZE = 500
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def _backfill(id_field, name_field, load_names):
+    ids = Assessment.objects(**{f"{name_field}__exists": False}).distinct(id_field)
+    print(f"Found {len(ids)} {id_field} values with assessments missing {name_field}")
+    
+    updated = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        names = load_names(batch)
+        for uid in batch:
+            if uid in names:
+                updated += Assessment.objects(**{
+                    id_field: uid, f"{name_field}__exists": False
+                }).update(**{f"set__{name_field}": names[uid]})
+        print(f"✓ {name_field}: {updated} assessments updated")
+
+def backfill_names():
+    print("\n" + "="*60)
+    print("ASSESSMENT NAME BACKFILL")
+    print("="*60 + "\n")
+    
+    _backfill('patientId', 'patientName', lambda ids: {
+        p.patientId: p.name for p in Patient.objects(patientId__in=ids).only('patientId', 'name')
+    })
+    _backfill('doctorId', 'doctorName', lambda ids: {
+        u.uid: u.name for u in User.objects(uid__in=ids).only('uid', 'name')
+    })
+    
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        backfill_names()
+        
+        print("✅ Migration completed successfully!\n")
@@ -0,0 +1,92 @@
+"""
+Database migration script for diet plan content storage
+Converts DietPlan.content from a JSON string to a native embedded document.
+
+The script is batched and resumable: only documents whose content is still a
+string are selected, and each update is conditional on the original string,
+so concurrent edits made through the API are never overwritten.
+"""
+from models import db, DietPlan
+from flask import Flask
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import os
+
+BATCH_SIZE = 500
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def migrate_content():
+    """Convert string content to embedded documents in _id-ordered batches"""
+    print("\n" + "="*60)
+    print("DIET PLAN CONTENT MIGRATION")
+    print("="*60 + "\n")
+    
+    collection = DietPlan._get_collection()
+    legacy_filter = {'content': {'$type': 'string'}}
+    total = collection.count_documents(legacy_filter)
+    
+    print(f"Found {total} diet plans with JSON string content\n")
+    
+    if total == 0:
+        print("✓ No diet plans to migrate")
+        return
+    
+    migrated = 0
+    errors = 0
+    last_id = None
+    
+    while True:
+        query = dict(legacy_filter)
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(collection.find(query, {'content': 1}).sort('_id', 1).limit(BATCH_SIZE))
+        if not batch:
+            break
+        
+        ops = []
+        for doc in batch:
+            try:
+                raw = doc['content']
+                content = DietPlan.content.to_python(raw)
+                content.validate()
+                ops.append(UpdateOne(
+                    {'_id': doc['_id'], 'content': raw},
+                    {'$set': {'content': content.to_mongo().to_dict()}}
+                ))
+            except Exception as e:
+                errors += 1
+                print(f"✗ Error migrating diet plan {doc['_id']}: {str(e)}")
+        
+        if ops:
+            result = collection.bulk_write(ops, ordered=False)
+            migrated += result.modified_count
+        
+        last_id = batch[-1]['_id']
+        print(f"✓ Migrated {migrated}/{total} diet plans")
+    
+    print(f"\n" + "="*60)
+    print(f"MIGRATION COMPLETE")
+    print(f"="*60)
+    print(f"Total: {total}")
+    print(f"Migrated: {migrated}")
+    print(f"Errors: {errors}")
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        migrate_content()
+        
+        print("✅ Migration completed successfully!\n")
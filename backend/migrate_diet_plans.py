@@ -0,0 +1,87 @@
+"""
+Database migration script for diet plan summary fields
+Backfills denormalized summary fields (patientName, totalCalories,
+dayCount, mealCount, itemCount) on existing diet plans
+"""
+from models import db, DietPlan, Patient
+from diet_plan_utils import build_plan_summary
+from flask import Flask
+from dotenv import load_dotenv
+import os
+
+BATCH_SIZE = 500
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def backfill_summaries():
+    """
+    Fill summary fields for every diet plan, in batches ordered by _id.
+    Safe to re-run: each plan is recomputed from its own content.
+    """
+    print("\n" + "="*60)
+    print("DIET PLAN SUMMARY BACKFILL")
+    print("="*60 + "\n")
+    
+    total = DietPlan.objects.count()
+    print(f"Found {total} diet plans to backfill\n")
+    
+    migrated = 0
+    errors = 0
+    last_id = None
+    
+    while True:
+        query = DietPlan.objects(id__gt=last_id) if last_id else DietPlan.objects()
+        batch = list(query.only('id', 'patientId', 'content').order_by('id').limit(BATCH_SIZE))
+        if not batch:
+            break
+        
+        patient_ids = list({p.patientId for p in batch})
+        names = {
+            pt.patientId: pt.name
+            for pt in Patient.objects(patientId__in=patient_ids).only('patientId', 'name')
+        }
+        
+        for plan in batch:
+            try:
+                summary = build_plan_summary(plan.content)
+                DietPlan.objects(id=plan.id).update_one(
+                    set__patientName=names.get(plan.patientId),
+                    set__totalCalories=summary['totalCalories'],
+                    set__dayCount=summary['dayCount'],
+                    set__mealCount=summary['mealCount'],
+                    set__itemCount=summary['itemCount']
+                )
+                migrated += 1
+            except Exception as e:
+                errors += 1
+                print(f"✗ Error backfilling diet plan {plan.id}: {str(e)}")
+        
+        last_id = batch[-1].id
+        print(f"✓ Backfilled {migrated}/{total} diet plans")
+    
+    print(f"\n" + "="*60)
+    print(f"BACKFILL COMPLETE")
+    print(f"="*60)
+    print(f"Total: {total}")
+    print(f"Migrated: {migrated}")
+    print(f"Errors: {errors}")
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        backfill_summaries()
+        DietPlan.ensure_indexes()
+        
+        print("✅ Migration completed successfully!\n")
@@ -0,0 +1,63 @@
+"""
+Database migration script for the keyset pagination indexes
+Builds the compound indexes that now end in _id and drops the ones they
+replaced, which MongoEngine never removes on its own.
+
+Safe to re-run: indexes that are already gone are skipped.
+"""
+from models import db, Assessment, Appointment, DietPlan
+from flask import Flask
+from dotenv import load_dotenv
+import os
+
+# Index key specs superseded by the (..., _id) versions in models.py
+SUPERSEDED = [
+    (Assessment, [('patientId', 1), ('createdAt', -1)]),
+    (Assessment, [('doctorId', 1), ('createdAt', -1)]),
+    (Appointment, [('doctorId', 1), ('startTimestamp', 1)]),
+    (Appointment, [('patientId', 1), ('startTimestamp', 1)]),
+    (DietPlan, [('patientId', 1), ('lastModified', -1)]),
+    (DietPlan, [('createdBy', 1), ('lastModified', -1)]),
+]
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def migrate_indexes():
+    print("\n" + "="*60)
+    print("PAGINATION INDEX MIGRATION")
+    print("="*60 + "\n")
+    
+    # Replacements first, so no query is left without an index
+    for model in {model for model, _ in SUPERSEDED}:
+        model.ensure_indexes()
+        print(f"✓ {model._get_collection_name()}: indexes ensured")
+    
+    dropped = 0
+    for model, key in SUPERSEDED:
+        collection = model._get_collection()
+        for name, info in collection.index_information().items():
+            if [(field, int(order)) for field, order in info['key']] == key:
+                collection.drop_index(name)
+                dropped += 1
+                print(f"✓ {collection.name}: dropped {name}")
+    
+    print(f"\n✓ Dropped {dropped} superseded indexes")
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        migrate_indexes()
+        
+        print("✅ Migration completed successfully!\n")
@@ -0,0 +1,61 @@
+"""
+Database migration script for monthly progress buckets
+Builds ProgressBucket documents from existing daily Progress records.
+
+Runs entirely in the database ($group + $merge) and can be re-run at any
+time: existing buckets are replaced with the recomputed ones.
+Run migrate_progress_days.py first so every record has its `day` key.
+"""
+from models import db, Progress, ProgressBucket, get_ist_now
+from progress_utils import TREND_METRICS
+from flask import Flask
+from dotenv import load_dotenv
+import os
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def build_buckets():
+    """Group daily records into (patientId, month) buckets"""
+    ProgressBucket.ensure_indexes()
+    
+    metrics = {name: f'${name}' for name in TREND_METRICS}
+    Progress._get_collection().aggregate([
+        {'$match': {'day': {'$type': 'string'}}},
+        {'$group': {
+            '_id': {'patientId': '$patientId', 'month': {'$substrCP': ['$day', 0, 7]}},
+            'entries': {'$push': {'k': {'$substrCP': ['$day', 8, 2]}, 'v': metrics}}
+        }},
+        {'$project': {
+            '_id': 0,
+            'patientId': '$_id.patientId',
+            'month': '$_id.month',
+            'days': {'$arrayToObject': '$entries'},
+            'updatedAt': {'$literal': get_ist_now()}
+        }},
+        {'$merge': {
+            'into': ProgressBucket._get_collection_name(),
+            'on': ['patientId', 'month'],
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert'
+        }}
+    ], allowDiskUse=True)
+    
+    print(f"✓ {ProgressBucket.objects.count()} progress buckets built")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        build_buckets()
+        
+        print("✅ Migration completed successfully!\n")
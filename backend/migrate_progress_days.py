@@ -0,0 +1,88 @@
+"""
+Database migration script for daily progress records
+- Sets the `day` key on progress records written before it existed
+- Merges duplicate records for the same patient and day
+- Creates the unique (patientId, day) index
+
+Each step is batched and safe to re-run.
+"""
+from models import db, Progress
+from progress_utils import LOGGED_FIELDS, stored_day_key
+from flask import Flask
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import os
+
+BATCH_SIZE = 1000
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def backfill_day_keys():
+    """Set `day` on records that don't have it yet"""
+    collection = Progress._get_collection()
+    missing = {'day': {'$exists': False}, 'date': {'$type': 'date'}}
+    total = collection.count_documents(missing)
+    print(f"Found {total} progress records without a day key\n")
+    
+    updated = 0
+    while True:
+        batch = list(collection.find(missing, {'date': 1}).limit(BATCH_SIZE))
+        if not batch:
+            break
+        ops = [
+            UpdateOne({'_id': doc['_id']}, {'$set': {'day': stored_day_key(doc['date'])}})
+            for doc in batch
+        ]
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+        print(f"✓ Set day key on {updated}/{total} records")
+
+def merge_duplicate_days():
+    """Collapse records sharing (patientId, day) into the oldest one"""
+    collection = Progress._get_collection()
+    duplicates = collection.aggregate([
+        {'$match': {'day': {'$type': 'string'}}},
+        {'$group': {'_id': {'patientId': '$patientId', 'day': '$day'},
+                    'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    
+    groups = 0
+    removed = 0
+    for group in duplicates:
+        docs = list(collection.find({'_id': {'$in': group['ids']}}).sort('_id', 1))
+        keeper = docs[0]
+        merged = {}
+        # Later submissions win, but never overwrite a value with null/empty
+        for doc in docs:
+            for name in LOGGED_FIELDS:
+                value = doc.get(name)
+                if value is not None and value != '':
+                    merged[name] = value
+        if merged:
+            collection.update_one({'_id': keeper['_id']}, {'$set': merged})
+        result = collection.delete_many({'_id': {'$in': [d['_id'] for d in docs[1:]]}})
+        groups += 1
+        removed += result.deleted_count
+    
+    print(f"✓ Merged {groups} duplicate days, removed {removed} records")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        backfill_day_keys()
+        merge_duplicate_days()
+        Progress.ensure_indexes()
+        print("✓ Unique (patientId, day) index created")
+        
+        print("✅ Migration completed successfully!\n")
@@ -0,0 +1,74 @@
+"""
+Database migration script for slot reservations
+Creates SlotReservation records for every active, not yet finished appointment
+so the unique (doctorId, slotStart) index protects existing bookings too.
+
+Pending reschedules also reserve their proposed time. Appointments that
+overlap an earlier one (possible under the old exact-start conflict check)
+are reported instead of reserved. Safe to re-run.
+"""
+from models import db, Appointment, get_ist_now
+from flask import Flask
+from dotenv import load_dotenv
+from datetime import timedelta
+from slot_reservations import reserve, SlotConflict
+import os
+
+ACTIVE_STATUSES = ['pending', 'confirmed', 'doctor_rescheduled_pending', 'patient_rescheduled_pending']
+RESCHEDULE_STATUSES = ['doctor_rescheduled_pending', 'patient_rescheduled_pending']
+
+def create_app():
+    """Create Flask app for migration"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+def backfill_reservations():
+    print("\n" + "="*60)
+    print("SLOT RESERVATION BACKFILL")
+    print("="*60 + "\n")
+    
+    now = get_ist_now()
+    appointments = Appointment.objects(
+        status__in=ACTIVE_STATUSES,
+        startTimestamp__gte=now - timedelta(days=1)
+    ).only(
+        'id', 'doctorId', 'patientId', 'status', 'startTimestamp', 'endTimestamp',
+        'proposedStartTimestamp', 'proposedEndTimestamp'
+    ).order_by('doctorId', 'startTimestamp')
+    
+    reserved = 0
+    conflicts = []
+    for appt in appointments:
+        end = appt.endTimestamp or appt.startTimestamp + timedelta(minutes=30)
+        try:
+            reserve(appt.doctorId, appt.patientId, appt.id, appt.startTimestamp, end)
+            if appt.status in RESCHEDULE_STATUSES and appt.proposedStartTimestamp:
+                proposed_end = appt.proposedEndTimestamp or appt.proposedStartTimestamp + (end - appt.startTimestamp)
+                reserve(appt.doctorId, appt.patientId, appt.id,
+                        appt.proposedStartTimestamp, proposed_end, kind='proposal')
+            reserved += 1
+        except SlotConflict as e:
+            conflicts.append((appt, str(e)))
+    
+    print(f"✓ Reserved slots for {reserved} appointments")
+    if conflicts:
+        print(f"✗ {len(conflicts)} appointments overlap an earlier booking and need manual review:")
+        for appt, reason in conflicts:
+            print(f"  - {appt.id} (doctor {appt.doctorId}, {appt.startTimestamp}): {reason}")
+    
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n🚀 Starting migration...\n")
+        
+        backfill_reservations()
+        
+        print("✅ Migration completed successfully!\n")
@@ -1,5 +1,7 @@
 from flask_mongoengine import MongoEngine
+from mongoengine.fields import EmbeddedDocumentField
 from datetime import datetime, timedelta, timezone
+import json
 
 db = MongoEngine()
 
@@ -20,6 +22,9 @@ class User(db.Document):
     pendingEmail = db.StringField(max_length=120)  # For email change requests
     createdAt = db.DateTimeField(default=get_ist_now)
     meta_info = db.DictField(default={})  # phone, verified, etc.
+    profileVersion = db.IntField(default=0)  # Bumped on role/name change; tokens carry it as 'pv'
+    deletedAt = db.DateTimeField()  # Tombstone: set when an admin deletion job is queued
+    notificationDelivery = db.StringField(default='digest', choices=['digest', 'immediate'])  # Appointment emails
 
     def set_password(self, password):
         from flask_bcrypt import generate_password_hash
@@ -41,6 +46,12 @@ class Doctor(db.Document):
     account = db.DictField(default={})
     createdAt = db.DateTimeField(default=get_ist_now)
 
+    meta = {
+        'indexes': [
+            {'fields': ['account.status']},  # Verified doctor listing
+        ]
+    }
+
 class Patient(db.Document):
     patientId = db.StringField(required=True, unique=True)
     name = db.StringField(max_length=100, required=True)
@@ -53,6 +64,8 @@ class Assessment(db.Document):
     assessmentId = db.StringField(required=True, unique=True)
     patientId = db.StringField(required=True)
     doctorId = db.StringField(required=True)
+    patientName = db.StringField(max_length=100)  # Snapshot, kept current by name_propagation
+    doctorName = db.StringField(max_length=100)   # Snapshot, kept current by name_propagation
     createdAt = db.DateTimeField(default=get_ist_now)
     
     # Assessment data
@@ -72,8 +85,8 @@ class Assessment(db.Document):
     # Indexes for efficient querying
     meta = {
         'indexes': [
-            {'fields': ['patientId', '-createdAt']},  # Patient's assessments, newest first
-            {'fields': ['doctorId', '-createdAt']},   # Doctor's assessments, newest first
+            {'fields': ['patientId', '-createdAt', '-id']},  # Patient's assessments, newest first
+            {'fields': ['doctorId', '-createdAt', '-id']},   # Doctor's assessments, newest first
             {'fields': ['assessmentId']},
         ]
     }
@@ -98,27 +111,90 @@ class Appointment(db.Document):
     proposedEndTimestamp = db.DateTimeField()    # For doctor-initiated reschedules
     createdAt = db.DateTimeField(default=get_ist_now)
     updatedAt = db.DateTimeField(default=get_ist_now)
+    completionEmailPending = db.BooleanField()  # Set by the auto-completion sweep, unset once the email is queued
     
     # Indexes for performance
     meta = {
         'indexes': [
-            {'fields': ['doctorId', 'startTimestamp']},
-            {'fields': ['patientId', 'startTimestamp']},
+            {'fields': ['doctorId', 'startTimestamp', 'id']},
+            {'fields': ['patientId', 'startTimestamp', 'id']},
             {'fields': ['status', 'startTimestamp']},
-            {'fields': ['doctorId', 'status','startTimestamp']}
+            {'fields': ['status', 'endTimestamp']},  # Auto-completion sweep
+            {'fields': ['doctorId', 'status','startTimestamp']},
+            {'fields': ['doctorId', 'proposedStartTimestamp']},  # Availability: pending reschedule proposals
+            {'fields': ['startTimestamp', 'id']},
+            {'fields': ['completionEmailPending'],
+             'partialFilterExpression': {'completionEmailPending': True}}
         ]
     }
 
+class DietMeal(db.DynamicEmbeddedDocument):
+    type = db.StringField()
+    time = db.StringField()
+    items = db.ListField()  # food names or {name, calories, dosha, ...}
+
+class DietDay(db.DynamicEmbeddedDocument):
+    day = db.StringField()
+    meals = db.ListField(db.EmbeddedDocumentField(DietMeal))
+
+class DietPlanContent(db.DynamicEmbeddedDocument):
+    """Plan body as produced by the recommendation engine / plan editor"""
+    doshaImbalance = db.StringField()
+    prakriti = db.StringField()
+    recommendedFoods = db.ListField()
+    avoidFoods = db.ListField()
+    mealPlan = db.ListField(db.EmbeddedDocumentField(DietDay))
+    rationale = db.StringField()
+    guidelines = db.ListField()
+    summary = db.DictField()  # {totalCalories, ...}
+
+    def to_dict(self):
+        return self.to_mongo().to_dict()
+
+class PlanContentField(EmbeddedDocumentField):
+    """
+    Embedded DietPlanContent that also accepts plain dicts on assignment and
+    legacy JSON strings on read (plans stored before the BSON migration).
+    """
+    def __init__(self, **kwargs):
+        super().__init__(DietPlanContent, **kwargs)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            try:
+                value = json.loads(value) if value else {}
+            except ValueError:
+                value = {}
+        return super().to_python(value)
+
+    def __set__(self, instance, value):
+        if isinstance(value, (dict, str)):
+            value = self.to_python(value)
+        super().__set__(instance, value)
+
 class DietPlan(db.Document):
     patientId = db.StringField(required=True)
     generatedAt = db.DateTimeField(default=get_ist_now)
-    content = db.StringField()  # JSON string of the plan
+    content = PlanContentField()  # Native embedded plan (legacy rows: JSON string)
     createdBy = db.StringField()  # doctorId
     status = db.StringField(default='draft', choices=['draft', 'active', 'completed', 'cancelled'])
     publishedAt = db.DateTimeField()  # When it was activated/published
     lastModified = db.DateTimeField(default=get_ist_now)
 
-    meta = {'strict': False}
+    # Denormalized summary fields (kept current on every write, see diet_plan_utils)
+    patientName = db.StringField(max_length=100)
+    totalCalories = db.IntField(default=0)
+    dayCount = db.IntField(default=0)
+    mealCount = db.IntField(default=0)
+    itemCount = db.IntField(default=0)
+
+    meta = {
+        'strict': False,
+        'indexes': [
+            {'fields': ['patientId', '-lastModified', '-id']},  # Patient's plans, newest first
+            {'fields': ['createdBy', '-lastModified', '-id']},  # Practitioner's plans, newest first
+        ]
+    }
 
 
 
@@ -145,6 +221,195 @@ class Progress(db.Document):
     sleepHours = db.FloatField()  # New: Sleep duration
     mood = db.StringField()  # New: Mood (e.g., "Happy", "Stressed")
     notes = db.StringField()
+    day = db.StringField()  # YYYY-MM-DD (IST) the record belongs to, see progress_utils
+
+    meta = {
+        'indexes': [
+            {'fields': ['patientId', '-date', '-id']},  # Patient's history, newest first
+            {   # One record per patient per day
+                'fields': ['patientId', 'day'],
+                'unique': True,
+                'partialFilterExpression': {'day': {'$type': 'string'}}
+            },
+        ]
+    }
+
+class ProgressBucket(db.Document):
+    """Monthly bucket of a patient's daily metrics, used for trend queries"""
+    patientId = db.StringField(required=True)
+    month = db.StringField(required=True)  # YYYY-MM
+    days = db.DictField(default={})  # {'DD': {waterIntake, mealAdherence, weight, sleepHours}}
+    updatedAt = db.DateTimeField(default=get_ist_now)
+
+    meta = {
+        'indexes': [
+            {'fields': ['patientId', 'month'], 'unique': True},
+        ]
+    }
+
+class AdminStats(db.Document):
+    """Materialized admin dashboard counters (single document, key='global')"""
+    key = db.StringField(required=True, unique=True)
+    totalPatients = db.IntField(default=0)
+    totalDoctors = db.IntField(default=0)
+    verifiedDoctors = db.IntField(default=0)
+    totalAppointments = db.IntField(default=0)
+    reconciledAt = db.DateTimeField()  # Last exact recount; None until the first reconcile
+    updatedAt = db.DateTimeField(default=get_ist_now)
+
+class DailyStats(db.Document):
+    """Per-day rollup of signups and bookings for the admin time series"""
+    day = db.StringField(required=True, unique=True)  # YYYY-MM-DD (IST)
+    patientSignups = db.IntField(default=0)
+    doctorSignups = db.IntField(default=0)
+    appointments = db.IntField(default=0)
+
+class DeletionJob(db.Document):
+    """Background cascade deletion of a user and their records (see deletion_jobs.py)"""
+    jobId = db.StringField(required=True, unique=True)
+    uid = db.StringField(required=True)
+    role = db.StringField()  # None for orphan cleanup (every step runs)
+    wasVerified = db.BooleanField(default=False)  # Doctor status at enqueue, for admin stats
+    status = db.StringField(default='pending', choices=['pending', 'running', 'completed', 'failed'])
+    stepIndex = db.IntField(default=0)  # Next step to run; steps are idempotent so resuming repeats at most one batch
+    deleted = db.DictField(default={})  # {step name: documents deleted}
+    attempts = db.IntField(default=0)
+    error = db.StringField()
+    lockedUntil = db.DateTimeField()  # Worker lease; expired leases are picked up again
+    nextAttemptAt = db.DateTimeField()  # Backoff after a failed attempt: not resumed before this
+    createdAt = db.DateTimeField(default=get_ist_now)
+    startedAt = db.DateTimeField()
+    finishedAt = db.DateTimeField()
+
+    meta = {
+        'indexes': [
+            {'fields': ['status', 'lockedUntil']},  # Claiming resumable jobs
+            {'fields': ['uid', '-createdAt']},
+        ]
+    }
+
+class NamePropagationJob(db.Document):
+    """Pending rewrite of a user's name snapshots, one row per user (see name_propagation.py)"""
+    uid = db.StringField(required=True, unique=True)
+    role = db.StringField(required=True)
+    name = db.StringField(required=True)  # Latest name; a newer change replaces it
+    version = db.IntField(default=0)  # Bumped per change; only the claimed version can complete
+    status = db.StringField(default='pending', choices=['pending', 'running', 'completed', 'failed'])
+    attempts = db.IntField(default=0)
+    error = db.StringField()
+    lockedUntil = db.DateTimeField()  # Worker lease; expired leases are picked up again
+    updatedAt = db.DateTimeField(default=get_ist_now)
+    finishedAt = db.DateTimeField()
+
+    meta = {
+        'indexes': [
+            {'fields': ['status', 'lockedUntil']},  # Claiming resumable jobs
+        ]
+    }
+
+class SlotReservation(db.Document):
+    """One slice of a doctor's time held by an appointment (see slot_reservations.py)"""
+    doctorId = db.StringField(required=True)
+    slotStart = db.DateTimeField(required=True)  # Aligned to availability.UNIT_MINUTES
+    appointmentId = db.ObjectIdField(required=True)
+    patientId = db.StringField()
+    kind = db.StringField(default='booking', choices=['booking', 'proposal'])
+    expiresAt = db.DateTimeField(required=True)  # TTL: appointment end + retention
+    createdAt = db.DateTimeField(default=get_ist_now)
+
+    meta = {
+        'indexes': [
+            {'fields': ['doctorId', 'slotStart'], 'unique': True},  # The booking arbiter
+            {'fields': ['appointmentId']},
+            {'fields': ['patientId']},
+            {'fields': ['createdAt']},
+            {'fields': ['expiresAt'], 'expireAfterSeconds': 0},
+        ]
+    }
+
+class DoctorPatient(db.Document):
+    """Materialized doctor-patient relationship (see doctor_patients.py)"""
+    doctorId = db.StringField(required=True)
+    patientId = db.StringField(required=True)
+    patientRef = db.ObjectIdField()  # Patient _id, the roster's item id
+    patientName = db.StringField()
+    rostered = db.BooleanField(default=False)  # Has a confirmed or completed appointment
+    firstAppointmentAt = db.DateTimeField()  # Over confirmed/completed appointments
+    lastAppointmentAt = db.DateTimeField()
+    lastStatus = db.StringField()
+    totalCount = db.IntField(default=0)
+    pendingCount = db.IntField(default=0)
+    confirmedCount = db.IntField(default=0)
+    completedCount = db.IntField(default=0)
+    cancelledCount = db.IntField(default=0)
+    reschedulingCount = db.IntField(default=0)
+    updatedAt = db.DateTimeField(default=get_ist_now)
+
+    meta = {
+        'indexes': [
+            {'fields': ['doctorId', 'patientId'], 'unique': True},
+            {'fields': ['doctorId', 'rostered', '-lastAppointmentAt', '-id']},  # Roster pages
+            {'fields': ['patientId', 'doctorId']},  # Patient's doctors
+            {'fields': ['updatedAt']},
+        ]
+    }
+
+class OutboxMessage(db.Document):
+    """Outgoing email awaiting delivery by the sender workers (see email_outbox.py)"""
+    to = db.StringField(required=True)
+    subject = db.StringField(required=True)
+    htmlBody = db.StringField()  # Bodies are removed once sent
+    textBody = db.StringField()
+    status = db.StringField(default='pending', choices=['pending', 'sending', 'sent', 'dead'])
+    attempts = db.IntField(default=0)
+    nextAttemptAt = db.DateTimeField(default=get_ist_now)  # Backoff: not claimable before this
+    lockedUntil = db.DateTimeField()  # Sender lease; expired leases are claimed again
+    lastError = db.StringField()
+    createdAt = db.DateTimeField(default=get_ist_now)
+    sentAt = db.DateTimeField()
+    purgeAt = db.DateTimeField()  # TTL: set once sent or dead
+
+    meta = {
+        'indexes': [
+            {'fields': ['status', 'nextAttemptAt']},  # Claiming due messages
+            {'fields': ['status', 'lockedUntil']},  # Reclaiming abandoned sends
+            {'fields': ['status', 'createdAt']},  # Queue age
+            {'fields': ['sentAt']},  # Delivery latency window
+            {'fields': ['purgeAt'], 'expireAfterSeconds': 0},
+        ]
+    }
+
+class PendingNotification(db.Document):
+    """Appointment email buffered for the recipient's next digest (see notifications.py)"""
+    uid = db.StringField(required=True)
+    to = db.StringField(required=True)
+    kind = db.StringField(required=True)  # EmailService send_* method
+    args = db.ListField()  # Arguments of the send_* call
+    createdAt = db.DateTimeField(default=get_ist_now)
+    flushId = db.StringField()  # Set while a flush is sending this event
+    claimedAt = db.DateTimeField()
+
+    meta = {
+        'indexes': [
+            {'fields': ['flushId', 'to', 'createdAt']},
+            {'fields': ['flushId', 'claimedAt']},
+            {'fields': ['uid']},
+        ]
+    }
+
+class NotificationStats(db.Document):
+    """Hourly notification counters; events - emails = sends saved by coalescing"""
+    hour = db.DateTimeField(required=True, unique=True)
+    events = db.IntField(default=0)
+    emails = db.IntField(default=0)
+    digests = db.IntField(default=0)
+
+class SchedulerLock(db.Document):
+    """Leader lease for the in-process scheduler (see scheduler.py)"""
+    name = db.StringField(required=True, unique=True)
+    owner = db.StringField()
+    lockedUntil = db.DateTimeField()
+    lastRun = db.DictField(default={})  # {job name: last run time}, shared across leaders
 
 class OTPVerification(db.Document):
     """OTP verification for email verification and email change"""
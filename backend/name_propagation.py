@@ -0,0 +1,142 @@
+"""
+Background propagation of profile name changes
+
+Assessment, DietPlan and DoctorPatient store patient/doctor name snapshots so list
+endpoints never join. When a profile name changes, the snapshots are
+rewritten off the request path by a single background worker.
+
+Each change is recorded first as a NamePropagationJob (one row per user,
+holding the latest name), so a crash or restart mid-propagation leaves a
+job that resume_name_propagation() picks up once its lease expires. The
+rewrite is idempotent; a job only completes if no newer name arrived while
+it ran.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pymongo import ReturnDocument
+from models import Assessment, DietPlan, DoctorPatient, NamePropagationJob, get_ist_now
+import threading
+import traceback
+
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='name-propagation')
+_queued = set()  # uids waiting in or running on _executor
+_queued_lock = threading.Lock()
+
+
+def _submit(uid):
+    """Queue uid's job on the executor unless it is already queued or running here"""
+    with _queued_lock:
+        if uid in _queued:
+            return None
+        _queued.add(uid)
+    return _executor.submit(_run_queued, uid)
+
+
+def _run_queued(uid):
+    try:
+        run_job(uid)
+    finally:
+        with _queued_lock:
+            _queued.discard(uid)
+
+
+def _rewrite(uid, role, new_name):
+    if role == 'patient':
+        assessments = Assessment.objects(patientId=uid).update(set__patientName=new_name)
+        plans = DietPlan.objects(patientId=uid).update(set__patientName=new_name)
+        roster = DoctorPatient.objects(patientId=uid).update(set__patientName=new_name)
+        print(f"✓ Propagated name for {uid}: {assessments} assessments, {plans} diet plans, "
+              f"{roster} doctor relationships")
+    elif role == 'doctor':
+        assessments = Assessment.objects(doctorId=uid).update(set__doctorName=new_name)
+        print(f"✓ Propagated name for {uid}: {assessments} assessments")
+
+
+def _claim(uid):
+    """Take the job's lease; returns the raw job or None if another worker holds it"""
+    now = get_ist_now()
+    return NamePropagationJob._get_collection().find_one_and_update(
+        {
+            'uid': uid,
+            'status': {'$in': ['pending', 'running']},
+            '$or': [{'lockedUntil': None}, {'lockedUntil': {'$lt': now}}]
+        },
+        {
+            '$set': {'status': 'running', 'lockedUntil': now + LEASE, 'error': None},
+            '$inc': {'attempts': 1}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def run_job(uid):
+    """Run (or resume) the propagation job for uid"""
+    job = _claim(uid)
+    if job is None:
+        return
+
+    jobs = NamePropagationJob._get_collection()
+    try:
+        _rewrite(uid, job['role'], job['name'])
+        finished = jobs.update_one(
+            {'_id': job['_id'], 'version': job['version']},
+            {'$set': {'status': 'completed', 'finishedAt': get_ist_now(), 'lockedUntil': None}}
+        )
+        if not finished.matched_count:
+            # The name changed again while we ran: rewrite with the newer one
+            jobs.update_one({'_id': job['_id']}, {'$set': {'lockedUntil': None}})
+            run_job(uid)
+    except Exception as e:
+        # Failed jobs wait for resume_name_propagation rather than retrying at once
+        status = 'failed' if job.get('attempts', 1) >= MAX_ATTEMPTS else 'pending'
+        jobs.update_one({'_id': job['_id']}, {
+            '$set': {'status': status, 'error': str(e), 'lockedUntil': None}
+        })
+        print(f" Error propagating name change for {uid}: {e}")
+        traceback.print_exc()
+
+
+def propagate_name_change(uid, role, new_name):
+    """
+    Record a name change and queue an update of every name snapshot that
+    belongs to uid
+
+    Returns:
+        Future or None: completes when the snapshots are rewritten; None when
+        a run for uid is already queued here (it reads the latest name)
+    """
+    NamePropagationJob.objects(uid=uid).update_one(
+        upsert=True,
+        set__role=role,
+        set__name=new_name,
+        set__status='pending',
+        set__attempts=0,
+        set__error=None,
+        set__updatedAt=get_ist_now(),
+        inc__version=1
+    )
+    return _submit(uid)
+
+
+def resume_name_propagation():
+    """
+    Re-queue unfinished jobs whose lease has expired (e.g. after a restart)
+
+    Returns:
+        int: Number of jobs queued
+    """
+    now = get_ist_now()
+    uids = NamePropagationJob.objects(
+        status__in=['pending', 'running']
+    ).filter(
+        __raw__={'$or': [{'lockedUntil': None}, {'lockedUntil': {'$lt': now}}]}
+    ).scalar('uid')
+
+    count = 0
+    for uid in uids:
+        if _submit(uid):
+            count += 1
+    return count
@@ -0,0 +1,216 @@
+"""
+Notification coalescing for appointment emails
+
+Appointment routes call notify() instead of EmailService directly.
+Time-critical kinds, and recipients who chose immediate delivery, are sent
+at once. Everything else is buffered per recipient address in
+PendingNotification: the first buffered event opens a window
+(NOTIFICATION_DIGEST_WINDOW_SECONDS) and when it closes flush_digests()
+sends one email carrying every event of the window - the original email
+unchanged when there was only one.
+
+Digest sections are rendered by the send_* templates through
+TemplateRenderer and placed in the shared layout (see email_templates.py),
+so the wording lives in one place.
+
+Digests are flushed by the scheduler's flushNotificationDigests job. When
+the scheduler is disabled (SCHEDULER_ENABLED=false) nothing would flush
+them, so notify() sends every email immediately instead.
+
+Events and emails sent are counted per hour in NotificationStats; the
+difference is the number of sends saved.
+"""
+from datetime import timedelta
+from models import PendingNotification, NotificationStats, get_ist_now
+from email_service import EmailService, email_service
+from email_templates import BLUE, LAYOUT_HEAD, LAYOUT_TAIL, wrap_layout
+from identity_cache import identity_cache
+from scheduler import scheduler_enabled
+import os
+import traceback
+import uuid
+
+WINDOW = timedelta(seconds=int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "300")))
+FLUSH_LEASE = timedelta(minutes=10)
+FLUSH_BATCH = 500  # Recipients per flush run
+
+# Sent at once whatever the recipient's preference
+IMMEDIATE_KINDS = {
+    'send_otp_email',
+    'send_email_changed_notification',
+    'send_password_changed_notification',
+}
+
+_SEPARATOR = '<hr style="border: 0; border-top: 1px solid #e5e7eb; margin: 30px 0;">\n'
+
+
+class TemplateRenderer(EmailService):
+    """EmailService whose send_email returns (subject, html, text) instead of sending"""
+    def send_email(self, to_email, subject, html_body, text_body=None):
+        return subject, html_body, text_body
+
+
+renderer = TemplateRenderer()
+
+
+# ==================== STATS ====================
+
+def _hour(now):
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def _record(events=0, emails=0, digests=0):
+    try:
+        NotificationStats.objects(hour=_hour(get_ist_now())).update_one(
+            upsert=True, inc__events=events, inc__emails=emails, inc__digests=digests
+        )
+    except Exception as e:
+        print(f" Error recording notification stats: {e}")
+
+
+def get_hourly_stats(hours=24):
+    """
+    Per-hour counters for the last `hours` hours, oldest first
+
+    Returns:
+        dict: {'hours': [...], 'totals': {...}} with sendsSaved per hour and overall
+    """
+    since = _hour(get_ist_now()) - timedelta(hours=hours - 1)
+    rows = NotificationStats.objects(hour__gte=since).order_by('hour').as_pymongo()
+
+    series = []
+    totals = {'events': 0, 'emails': 0, 'digests': 0}
+    for row in rows:
+        item = {key: row.get(key, 0) for key in totals}
+        for key in totals:
+            totals[key] += item[key]
+        item['hour'] = row['hour'].isoformat()
+        item['sendsSaved'] = item['events'] - item['emails']
+        series.append(item)
+
+    totals['sendsSaved'] = totals['events'] - totals['emails']
+    totals['sendsSavedPerHour'] = round(totals['sendsSaved'] / hours, 2)
+    return {'hours': series, 'totals': totals}
+
+
+# ==================== PRODUCER ====================
+
+def wants_digest(uid):
+    user = identity_cache.get_user(uid)
+    return (getattr(user, 'notificationDelivery', None) or 'digest') == 'digest'
+
+
+def notify(uid, method_name, *args):
+    """
+    Send or buffer a call to an EmailService send_* method
+
+    Failures are logged, never raised: the caller's write has already happened.
+
+    Args:
+        uid: Recipient user ID (for the delivery preference)
+        method_name: e.g. 'send_appointment_confirmed'
+        args: Passed through to the method; the first is the recipient email
+
+    Returns:
+        bool: True if the email was sent or buffered
+    """
+    try:
+        if not hasattr(email_service, method_name):
+            raise AttributeError(f"EmailService has no method {method_name}")
+
+        if (method_name in IMMEDIATE_KINDS or not WINDOW or not scheduler_enabled()
+                or not wants_digest(uid)):
+            _record(events=1, emails=1)
+            return getattr(email_service, method_name)(*args)
+
+        PendingNotification(uid=uid, to=args[0], kind=method_name, args=list(args)).save()
+        _record(events=1)
+        return True
+    except Exception as e:
+        print(f" Error sending {method_name} notification to {uid}: {e}")
+        traceback.print_exc()
+        return False
+
+
+# ==================== DIGESTS ====================
+
+def render_digest(events):
+    """
+    Merge buffered events into one email inside the shared layout
+
+    Returns:
+        tuple: (subject, html_body, text_body)
+    """
+    sections, texts = [], []
+    for event in events:
+        subject, html, text = getattr(renderer, event['kind'])(*event['args'])
+        sections.append(html[len(LAYOUT_HEAD):-len(LAYOUT_TAIL)])
+        texts.append(f"{subject}\n\n{text}")
+
+    count = len(events)
+    heading = f"You have {count} appointment updates"
+    html_body = wrap_layout(
+        f'<h2 style="color: {BLUE};">{heading}</h2>\n'
+        + _SEPARATOR.join(sections)
+    )
+    text_body = f"{heading}\n\n" + "\n----------\n\n".join(texts)
+    return f"{count} updates about your AyurWell appointments", html_body, text_body
+
+
+def _send_digest(to_email, events):
+    if len(events) == 1:
+        return getattr(email_service, events[0]['kind'])(*events[0]['args'])
+    subject, html_body, text_body = render_digest(events)
+    return email_service.send_email(to_email, subject, html_body, text_body)
+
+
+def flush_digests():
+    """
+    Send one email per recipient whose digest window has closed
+
+    Each recipient's events are claimed with a flushId first, so events
+    arriving during the send wait for the next digest.
+
+    Returns:
+        int: Emails sent
+    """
+    collection = PendingNotification._get_collection()
+    now = get_ist_now()
+
+    # Release events claimed by a flush that never finished
+    collection.update_many(
+        {'flushId': {'$ne': None}, 'claimedAt': {'$lt': now - FLUSH_LEASE}},
+        {'$set': {'flushId': None, 'claimedAt': None}}
+    )
+
+    due = list(collection.aggregate([
+        {'$match': {'flushId': None}},
+        {'$group': {'_id': '$to', 'opened': {'$min': '$createdAt'}}},
+        {'$match': {'opened': {'$lte': now - WINDOW}}},
+        {'$limit': FLUSH_BATCH}
+    ]))
+
+    sent = 0
+    for row in due:
+        flush_id = uuid.uuid4().hex
+        collection.update_many(
+            {'to': row['_id'], 'flushId': None},
+            {'$set': {'flushId': flush_id, 'claimedAt': now}}
+        )
+        events = list(collection.find({'flushId': flush_id}).sort('createdAt', 1))
+        if not events:
+            continue
+        try:
+            delivered = _send_digest(row['_id'], events)
+        except Exception as e:
+            delivered = False
+            print(f" Error sending digest to {row['_id']}: {e}")
+            traceback.print_exc()
+
+        if delivered:
+            collection.delete_many({'flushId': flush_id})
+            _record(emails=1, digests=1 if len(events) > 1 else 0)
+            sent += 1
+        else:
+            collection.update_many({'flushId': flush_id}, {'$set': {'flushId': None, 'claimedAt': None}})
+    return sent
@@ -0,0 +1,175 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints
+
+A page is requested with ?limit=<n> and/or ?cursor=<token>. When neither
+parameter is present, endpoints keep returning their legacy full response.
+Cursors are opaque tokens that encode the sort-key values of the last row on
+the previous page, so each page is a single indexed range query instead of
+a skip over every earlier row.
+
+Rows missing a sort field (legacy documents) sort as null: first in
+ascending order, last in descending order, and the "after the cursor"
+condition follows the same rule so they are never skipped.
+"""
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PageRequest:
+    """Parsed pagination parameters for the current request"""
+    def __init__(self, limit, cursor=None):
+        self.limit = limit
+        self.cursor = cursor  # decoded list of sort-key values, or None
+
+
+def get_page_request():
+    """
+    Read pagination parameters from the query string
+
+    Returns:
+        PageRequest or None: None when the client did not ask for pagination
+
+    Raises:
+        ValueError: If limit or cursor is malformed
+    """
+    limit_arg = request.args.get('limit')
+    cursor_arg = request.args.get('cursor')
+    if limit_arg is None and cursor_arg is None:
+        return None
+
+    limit = DEFAULT_PAGE_SIZE
+    if limit_arg is not None:
+        try:
+            limit = int(limit_arg)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    cursor = decode_cursor(cursor_arg) if cursor_arg else None
+    return PageRequest(limit, cursor)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if '$date' in value:
+            return datetime.fromisoformat(value['$date'])
+        if '$oid' in value:
+            return ObjectId(value['$oid'])
+    return value
+
+
+def encode_cursor(values):
+    """Encode sort-key values as an opaque URL-safe token"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list):
+            raise ValueError
+        return [_decode_value(v) for v in values]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _sort_keys(document, sort):
+    """Resolve ['-startTimestamp', ...] to [(field_name, db_field, direction)] plus the _id tie-breaker"""
+    keys = []
+    for spec in sort:
+        direction = -1 if spec.startswith('-') else 1
+        name = spec.lstrip('+-')
+        keys.append((name, document._fields[name].db_field, direction))
+    if not any(db_field == '_id' for _, db_field, _ in keys):
+        keys.append(('id', '_id', keys[-1][2] if keys else -1))
+    return keys
+
+
+def _row_value(row, name, db_field):
+    if isinstance(row, dict):
+        return row.get(db_field)
+    return getattr(row, name)
+
+
+def _after(db_field, direction, value):
+    """
+    Condition for values strictly after `value` in Mongo's sort order, where
+    null/missing sorts below everything. None when nothing can follow.
+    """
+    if value is None:
+        return None if direction < 0 else {db_field: {'$ne': None}}
+    if direction > 0:
+        return {db_field: {'$gt': value}}
+    return {'$or': [{db_field: {'$lt': value}}, {db_field: None}]}
+
+
+def paginate(queryset, sort, page):
+    """
+    Fetch one page of a queryset ordered by the given sort keys
+
+    Args:
+        queryset: MongoEngine queryset with filters already applied
+        sort: Sort specs in order_by syntax, e.g. ['-startTimestamp']
+        page: PageRequest from get_page_request()
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+    """
+    keys = _sort_keys(queryset._document, sort)
+
+    if page.cursor is not None:
+        if len(page.cursor) != len(keys):
+            raise ValueError("Invalid cursor")
+        # Lexicographic "after the cursor" condition over the sort keys
+        # ({field: None} also matches rows where the field is missing)
+        clauses = []
+        for i, (_, db_field, direction) in enumerate(keys):
+            after = _after(db_field, direction, page.cursor[i])
+            if after is None:
+                continue
+            clause = {keys[j][1]: page.cursor[j] for j in range(i)}
+            clause.update(after)
+            clauses.append(clause)
+        if not clauses:
+            return [], None
+        queryset = queryset.filter(__raw__={'$or': clauses})
+
+    order = [('-' if direction < 0 else '') + name for name, _, direction in keys]
+    rows = list(queryset.order_by(*order).limit(page.limit + 1))
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, name, db_field) for name, db_field, _ in keys])
+    return rows, next_cursor
+
+
+def page_envelope(items, next_cursor, page, **extra):
+    """Standard paginated response body"""
+    body = {
+        'items': items,
+        'count': len(items),
+        'limit': page.limit,
+        'nextCursor': next_cursor,
+        'hasMore': next_cursor is not None
+    }
+    body.update(extra)
+    return body
@@ -0,0 +1,223 @@
+"""
+Utility functions for daily progress logging
+"""
+from datetime import timedelta, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models import Progress, ProgressBucket, get_ist_now
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Request field -> type cast; only fields present in the request are written
+LOGGED_FIELDS = {
+    'waterIntake': int,
+    'bowelMovement': str,
+    'symptoms': str,
+    'mealAdherence': int,
+    'weight': float,
+    'sleepHours': float,
+    'mood': str,
+    'notes': str,
+}
+
+# Numeric metrics mirrored into monthly ProgressBucket documents for trends
+TREND_METRICS = ['waterIntake', 'sleepHours', 'mealAdherence', 'weight']
+
+TREND_INTERVALS = ('day', 'week', 'month')
+
+# Chart series longer than this many times maxPoints are bucketed in Mongo first
+SERIES_PREAGGREGATE = 4
+
+# Values given to new records for fields the request did not send
+INSERT_DEFAULTS = {
+    'symptoms': '',
+    'notes': '',
+}
+
+
+def day_key(dt):
+    """
+    Calendar day (YYYY-MM-DD, IST) a progress record belongs to.
+    Naive datetimes are treated as local dates as sent by the tracker.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(IST)
+    return dt.date().isoformat()
+
+
+def stored_day_key(dt):
+    """Day key for a date read back from Mongo (naive UTC)"""
+    return (dt.replace(tzinfo=timezone.utc)).astimezone(IST).date().isoformat()
+
+
+def parse_progress_fields(data):
+    """
+    Extract and type-cast the progress fields present in a request body
+
+    Raises:
+        ValueError: If a field has the wrong type
+    """
+    fields = {}
+    for name, cast in LOGGED_FIELDS.items():
+        if name not in data:
+            continue
+        value = data[name]
+        if value is not None and value != '':
+            try:
+                value = cast(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}")
+        elif cast is not str:
+            value = None
+        fields[name] = value
+    return fields
+
+
+def upsert_daily_progress(patient_id, target_date, fields):
+    """
+    Atomically create or update the progress record for one patient-day.
+
+    Only the given fields are $set, so a partial submit (e.g. from the water
+    tracker) never clears fields written by another tracker.
+
+    Returns:
+        tuple: (record_id, updated) where updated is False if a new record was created
+    """
+    collection = Progress._get_collection()
+    day = day_key(target_date)
+    new_id = ObjectId()
+
+    update = {'$setOnInsert': {'_id': new_id, 'date': target_date}}
+    for name, value in INSERT_DEFAULTS.items():
+        if name not in fields:
+            update['$setOnInsert'][name] = value
+    if fields:
+        update['$set'] = fields
+
+    for attempt in range(2):
+        try:
+            doc = collection.find_one_and_update(
+                {'patientId': patient_id, 'day': day},
+                update,
+                projection={'_id': 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            # A concurrent upsert inserted the same day first; retry as an update
+            if attempt:
+                raise
+    
+    record_bucket_day(patient_id, day, fields)
+    return doc['_id'], doc['_id'] != new_id
+
+
+def record_bucket_day(patient_id, day, fields):
+    """Mirror a day's numeric metrics into the patient's monthly bucket"""
+    metrics = {f"days.{day[8:10]}.{name}": fields[name] for name in TREND_METRICS if name in fields}
+    if not metrics:
+        return
+    metrics['updatedAt'] = get_ist_now()
+    collection = ProgressBucket._get_collection()
+    for attempt in range(2):
+        try:
+            collection.update_one(
+                {'patientId': patient_id, 'month': day[:7]},
+                {'$set': metrics},
+                upsert=True
+            )
+            return
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+
+def remove_bucket_day(patient_id, day):
+    """Drop a day from the patient's monthly bucket (after deleting its record)"""
+    ProgressBucket._get_collection().update_one(
+        {'patientId': patient_id, 'month': day[:7]},
+        {'$unset': {f"days.{day[8:10]}": ''}, '$set': {'updatedAt': get_ist_now()}}
+    )
+
+
+def progress_trends(patient_id, start_day, end_day, interval='week'):
+    """
+    Average daily metrics per day/week/month over [start_day, end_day].
+
+    Runs as one aggregation over monthly buckets, so a year of history is
+    at most 13 bucket reads regardless of how many days were logged.
+
+    Args:
+        start_day, end_day: 'YYYY-MM-DD' strings (inclusive)
+        interval: 'day', 'week' (ISO week) or 'month'
+
+    Returns:
+        list: [{period, days, waterIntake, sleepHours, mealAdherence, weight}]
+    """
+    if interval == 'day':
+        period = '$day'
+    elif interval == 'month':
+        period = '$month'
+    else:
+        period = {'$dateToString': {
+            'format': '%G-W%V',
+            'date': {'$dateFromString': {'dateString': '$day', 'format': '%Y-%m-%d'}}
+        }}
+
+    group = {'_id': period, 'days': {'$sum': 1}}
+    for name in TREND_METRICS:
+        group[name] = {'$avg': f'$v.{name}'}
+
+    pipeline = [
+        {'$match': {'patientId': patient_id, 'month': {'$gte': start_day[:7], '$lte': end_day[:7]}}},
+        {'$project': {'month': 1, 'entries': {'$objectToArray': '$days'}}},
+        {'$unwind': '$entries'},
+        {'$project': {
+            'month': 1,
+            'day': {'$concat': ['$month', '-', '$entries.k']},
+            'v': '$entries.v'
+        }},
+        {'$match': {'day': {'$gte': start_day, '$lte': end_day}}},
+        {'$group': group},
+        {'$sort': {'_id': 1}}
+    ]
+
+    points = []
+    for row in ProgressBucket._get_collection().aggregate(pipeline):
+        point = {'period': row['_id'], 'days': row['days']}
+        for name in TREND_METRICS:
+            value = row.get(name)
+            point[name] = round(value, 2) if value is not None else None
+        points.append(point)
+    return points
+
+
+def progress_series_buckets(patient_id, buckets):
+    """
+    Reduce a patient's daily Progress rows to `buckets` date-ordered buckets
+    in Mongo ($bucketAuto), so chart series never load the full history.
+
+    Returns:
+        list: [{'t': epoch seconds, name: avg, f'{name}Min', f'{name}Max',
+        f'{name}Count'}, ...] oldest first
+    """
+    output = {'t': {'$avg': {'$toLong': '$date'}}}
+    for name in TREND_METRICS:
+        output[name] = {'$avg': f'${name}'}
+        output[f'{name}Min'] = {'$min': f'${name}'}
+        output[f'{name}Max'] = {'$max': f'${name}'}
+        output[f'{name}Count'] = {
+            '$sum': {'$cond': [{'$eq': [{'$ifNull': [f'${name}', None]}, None]}, 0, 1]}
+        }
+
+    rows = Progress._get_collection().aggregate([
+        {'$match': {'patientId': patient_id}},
+        {'$bucketAuto': {'groupBy': '$date', 'buckets': buckets, 'output': output}}
+    ], allowDiskUse=True)
+    result = []
+    for row in rows:
+        row['t'] = row['t'] / 1000
+        result.append(row)
+    return result
@@ -0,0 +1,41 @@
+"""
+Rebuild the materialized doctor-patient relationships
+Recomputes every DoctorPatient row from the appointments collection with one
+aggregation. Run it once after deploying (the roster and patient access
+checks read these rows), and whenever the rows need to be re-derived; the
+scheduler also runs it daily to correct any drift.
+"""
+from models import db, DoctorPatient
+from flask import Flask
+from dotenv import load_dotenv
+import doctor_patients
+import os
+import sys
+
+def create_app():
+    """Create Flask app for the rebuild"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n" + "="*60)
+        print("DOCTOR-PATIENT RELATIONSHIP REBUILD")
+        print("="*60 + "\n")
+        
+        DoctorPatient.ensure_indexes()
+        rows = doctor_patients.rebuild_safely()
+        if rows is None:
+            sys.exit(1)
+        
+        print(f"  rostered: {DoctorPatient.objects(rostered=True).count()}")
+        print(f"  total:    {rows}")
+        
+        print("\n✅ Rebuild completed successfully!\n")
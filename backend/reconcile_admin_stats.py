@@ -0,0 +1,39 @@
+"""
+Periodic reconciliation of the materialized admin statistics
+Recomputes the AdminStats counters and DailyStats rollups from the source
+collections with one aggregation. Schedule it (e.g. hourly cron) to correct
+any drift from the incremental $inc updates; also used for the first backfill.
+"""
+from models import db
+from flask import Flask
+from dotenv import load_dotenv
+import admin_stats
+import os
+import sys
+
+def create_app():
+    """Create Flask app for reconciliation"""
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['MONGODB_SETTINGS'] = {
+        'host': os.getenv("MONGODB_URI")
+    }
+    db.init_app(app)
+    return app
+
+if __name__ == '__main__':
+    app = create_app()
+    
+    with app.app_context():
+        print("\n" + "="*60)
+        print("ADMIN STATS RECONCILIATION")
+        print("="*60 + "\n")
+        
+        stats = admin_stats.reconcile_safely()
+        if stats is None:
+            sys.exit(1)
+        
+        for key, value in admin_stats.get_stats().items():
+            print(f"  {key}: {value}")
+        
+        print("\n✅ Reconciliation completed successfully!\n")
@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify
 from models import Patient, DietPlan, Doctor, get_ist_now
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import json
 from ml_service import ml_service
+from diet_plan_utils import apply_plan_summary, plan_content_to_dict, build_plan_summary
+from pagination import get_page_request, paginate, page_envelope
+from serializers import PROGRESS_FIELDS
+from identity_cache import identity_cache
+from availability import availability_cache
+from auth_middleware import issue_access_token, patient_access_required, claims_required
+from name_propagation import propagate_name_change
 
 api_bp = Blueprint('api', __name__)
 
@@ -28,7 +34,7 @@ def add_patient():
 @jwt_required()
 def get_patient(patient_id):
     try:
-        patient = Patient.objects(patientId=patient_id).first()
+        patient = identity_cache.get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
         
@@ -97,7 +103,7 @@ def generate_diet_plan():
         if not assessment_data:
             return jsonify({"error": "Assessment data is required for diet generation"}), 400
             
-        patient = Patient.objects(patientId=patient_id).first()
+        patient = identity_cache.get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
         
@@ -144,42 +150,73 @@ def generate_diet_plan():
 
 @api_bp.route('/diet-plans/<patient_id>', methods=['GET'])
 @jwt_required()
+@patient_access_required
 def get_diet_plans(patient_id):
-    """Get diet plans - only published plans for patients, all for doctors"""
+    """
+    Get diet plans - only published plans for patients, all for doctors
+
+    Query params:
+        summary: 'true' to return only content.summary instead of the full content (list views)
+        limit, cursor: Keyset pagination (see pagination.py)
+    """
     current_user = get_jwt_identity()
     
+    summary_only = request.args.get('summary', 'false').lower() == 'true'
+    try:
+        page = get_page_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     # Check if current user is the patient or a doctor
-    patient = Patient.objects(patientId=patient_id).first()
     is_patient_viewing_own = (current_user == patient_id)
     
     if is_patient_viewing_own:
         # Patients only see active, completed, or cancelled plans
-        plans = DietPlan.objects(patientId=patient_id, status__in=['active', 'completed', 'cancelled']).order_by('-lastModified')
+        plans = DietPlan.objects(patientId=patient_id, status__in=['active', 'completed', 'cancelled'])
     else:
         # Doctors see all plans (drafts + active + etc)
-        plans = DietPlan.objects(patientId=patient_id).order_by('-lastModified')
+        plans = DietPlan.objects(patientId=patient_id)
+    
+    if summary_only:
+        plans = plans.only(
+            'id', 'generatedAt', 'createdBy', 'status', 'publishedAt', 'lastModified', 'content.summary'
+        )
+    
+    next_cursor = None
+    if page is None:
+        plans = list(plans.order_by('-lastModified'))
+    else:
+        plans, next_cursor = paginate(plans, ['-lastModified'], page)
+    
+    # Fetch all doctor names in one query instead of one per plan
+    doctor_ids = list({p.createdBy for p in plans if p.createdBy})
+    doctor_names = {}
+    if doctor_ids:
+        doctor_names = {
+            d.doctorId: d.name
+            for d in Doctor.objects(doctorId__in=doctor_ids).only('doctorId', 'name')
+        }
     
     results = []
     for p in plans:
-        # Fetch doctor name for each plan
-        doctor_name = "Unknown"
-        if p.createdBy:
-            doctor = Doctor.objects(doctorId=p.createdBy).first()
-            if doctor:
-                doctor_name = doctor.name
-        
-        results.append({
+        result = {
             "id": str(p.id),
             "generatedAt": p.generatedAt.isoformat(),
-            "content": json.loads(p.content) if p.content else {},
             "createdBy": p.createdBy,
-            "doctorName": doctor_name,
+            "doctorName": doctor_names.get(p.createdBy, "Unknown"),
             "status": p.status,
             "publishedAt": p.publishedAt.isoformat() if p.publishedAt else None,
             "lastModified": p.lastModified.isoformat() if p.lastModified else None
-        })
+        }
+        if summary_only:
+            result["summary"] = p.content.summary if p.content and p.content.summary else {}
+        else:
+            result["content"] = plan_content_to_dict(p.content)
+        results.append(result)
     
-    return jsonify(results)
+    if page is None:
+        return jsonify(results)
+    return jsonify(page_envelope(results, next_cursor, page))
 
 @api_bp.route('/diet-plans/save-draft', methods=['POST'])
 @jwt_required()
@@ -199,19 +236,23 @@ def save_diet_plan_draft():
         if not plan:
             return jsonify({"error": "Diet plan not found"}), 404
         
-        plan.content = json.dumps(content)
+        plan.content = content
+        apply_plan_summary(plan, content)
         plan.lastModified = get_ist_now()
         plan.save()
         
         return jsonify({"message": "Draft updated", "plan_id": str(plan.id)}), 200
     else:
         # Create new draft
+        patient = identity_cache.get_patient(patient_id)
         new_plan = DietPlan(
             patientId=patient_id,
-            content=json.dumps(content),
+            patientName=patient.name if patient else None,
+            content=content,
             createdBy=current_user,
             status='draft'
         )
+        apply_plan_summary(new_plan, content)
         new_plan.save()
         
         return jsonify({"message": "Draft saved", "plan_id": str(new_plan.id)}), 201
@@ -231,13 +272,16 @@ def save_and_publish_diet_plan():
         return jsonify({"error": "Missing required fields"}), 400
     
     # Create new plan with active status
+    patient = identity_cache.get_patient(patient_id)
     new_plan = DietPlan(
         patientId=patient_id,
-        content=json.dumps(content),
+        patientName=patient.name if patient else None,
+        content=content,
         createdBy=current_user,
         status='active',
         publishedAt=get_ist_now()
     )
+    apply_plan_summary(new_plan, content)
     new_plan.save()
     
     return jsonify({
@@ -250,35 +294,50 @@ def save_and_publish_diet_plan():
 def get_all_diet_plans():
     """Get all diet plans created by the current practitioner"""
     current_user = get_jwt_identity()
+    try:
+        page = get_page_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Filter plans by current doctor
-    plans = DietPlan.objects(createdBy=current_user).order_by('-lastModified')
+    # Filter plans by current doctor; summary fields are denormalized on the
+    # plan so the content blob is never loaded here
+    plans = DietPlan.objects(createdBy=current_user).only(
+        'id', 'patientId', 'patientName', 'generatedAt', 'lastModified', 'status',
+        'totalCalories', 'dayCount', 'mealCount', 'itemCount'
+    )
+    next_cursor = None
+    if page is None:
+        plans = list(plans.order_by('-lastModified'))
+    else:
+        plans, next_cursor = paginate(plans, ['-lastModified'], page)
+    
+    # Plans written before the summary backfill may lack patientName
+    missing_ids = list({p.patientId for p in plans if not p.patientName})
+    patient_names = {}
+    if missing_ids:
+        patient_names = {
+            pt.patientId: pt.name
+            for pt in Patient.objects(patientId__in=missing_ids).only('patientId', 'name')
+        }
     
-    # We need to fetch patient names for display
     results = []
     for p in plans:
-        patient = Patient.objects(patientId=p.patientId).first()
-        content = json.loads(p.content) if p.content else {}
-        
-        # Calculate total calories if available in the plan
-        calories = 0
-        if 'summary' in content and 'totalCalories' in content['summary']:
-            calories = content['summary']['totalCalories']
-        elif 'mealPlan' in content:
-            # Estimate or extract from first day if not in summary
-            pass
-            
         results.append({
             "id": str(p.id),
             "patientId": p.patientId,
-            "patientName": patient.name if patient else "Unknown",
+            "patientName": p.patientName or patient_names.get(p.patientId, "Unknown"),
             "generatedAt": p.generatedAt.isoformat(),
             "lastModified": p.lastModified.isoformat() if p.lastModified else p.generatedAt.isoformat(),
             "status": p.status,
-            "calories": calories
+            "calories": p.totalCalories or 0,
+            "dayCount": p.dayCount or 0,
+            "mealCount": p.mealCount or 0,
+            "itemCount": p.itemCount or 0
         })
-        
-    return jsonify(results)
+    
+    if page is None:
+        return jsonify(results)
+    return jsonify(page_envelope(results, next_cursor, page))
 
 @api_bp.route('/diet-plans/single/<plan_id>', methods=['GET'])
 @jwt_required()
@@ -288,7 +347,7 @@ def get_single_diet_plan(plan_id):
     if not plan:
         return jsonify({"error": "Diet plan not found"}), 404
     
-    patient = Patient.objects(patientId=plan.patientId).first()
+    patient = identity_cache.get_patient(plan.patientId)
     
     result = {
         "id": str(plan.id),
@@ -297,7 +356,7 @@ def get_single_diet_plan(plan_id):
         "generatedAt": plan.generatedAt.isoformat(),
         "lastModified": plan.lastModified.isoformat() if plan.lastModified else plan.generatedAt.isoformat(),
         "status": plan.status,
-        "content": json.loads(plan.content) if plan.content else {},
+        "content": plan_content_to_dict(plan.content),
         "publishedAt": plan.publishedAt.isoformat() if plan.publishedAt else None
     }
     return jsonify(result)
@@ -402,13 +461,63 @@ def update_diet_plan(plan_id):
         return jsonify({"error": "Diet plan not found"}), 404
     
     if 'content' in data:
-        plan.content = json.dumps(data['content'])
+        plan.content = data['content']
+        apply_plan_summary(plan, data['content'])
     
     plan.lastModified = get_ist_now()
     plan.save()
     
     return jsonify({"message": "Diet plan updated"}), 200
 
+@api_bp.route('/diet-plans/<plan_id>/days/<int:day_index>/meals/<int:meal_index>', methods=['PUT'])
+@jwt_required()
+@claims_required('doctor', message='Only doctors can edit diet plans')
+def update_diet_plan_meal(plan_id, day_index, meal_index):
+    """Replace a single meal in place without rewriting the whole plan"""
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    from pymongo import ReturnDocument
+    from models import DietMeal
+    data = request.get_json(silent=True)
+    current_user = get_jwt_identity()
+    
+    try:
+        plan_oid = ObjectId(plan_id)
+    except (InvalidId, TypeError):
+        return jsonify({"error": "Diet plan not found"}), 404
+    
+    if not isinstance(data, dict):
+        return jsonify({"error": "Meal must be a JSON object"}), 400
+    try:
+        meal = DietMeal._from_son(data)
+        meal.validate()
+    except Exception as e:
+        return jsonify({"error": f"Invalid meal: {str(e)}"}), 400
+    
+    meal_path = f"content.mealPlan.{day_index}.meals.{meal_index}"
+    collection = DietPlan._get_collection()
+    # Only the doctor who created the plan may edit it
+    updated = collection.find_one_and_update(
+        {'_id': plan_oid, 'createdBy': current_user, meal_path: {'$exists': True}},
+        {'$set': {meal_path: meal.to_mongo().to_dict(), 'lastModified': get_ist_now()}},
+        projection={'content.mealPlan.meals.items': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        plan = collection.find_one({'_id': plan_oid}, {'createdBy': 1})
+        if plan and plan.get('createdBy') != current_user:
+            return jsonify({"error": "Unauthorized to edit this plan"}), 403
+        return jsonify({"error": "Diet plan or meal not found"}), 404
+    
+    # Item counts are denormalized on the plan; refresh them from the projected items
+    summary = build_plan_summary(updated.get('content') or {})
+    collection.update_one(
+        {'_id': plan_oid},
+        {'$set': {'mealCount': summary['mealCount'], 'itemCount': summary['itemCount']}}
+    )
+    
+    return jsonify({"message": "Meal updated"}), 200
+
 @api_bp.route('/diet-plans/<plan_id>', methods=['DELETE'])
 @jwt_required()
 def delete_diet_plan(plan_id):
@@ -430,75 +539,151 @@ def delete_diet_plan(plan_id):
 @api_bp.route('/progress', methods=['POST'])
 @jwt_required()
 def log_progress():
-    from models import Progress
-    from datetime import datetime, timedelta
+    from datetime import datetime
+    from progress_utils import parse_progress_fields, upsert_daily_progress
     data = request.json
     current_user = get_jwt_identity()
     
     # Parse the date from request or use today
     date_str = data.get('date')
-    if date_str:
-        # Convert to datetime at start of day
-        target_date = datetime.fromisoformat(date_str).replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        target_date = get_ist_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        if date_str:
+            # Convert to datetime at start of day
+            target_date = datetime.fromisoformat(date_str).replace(hour=0, minute=0, second=0, microsecond=0)
+        else:
+            target_date = get_ist_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        fields = parse_progress_fields(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     patient_id = data.get('patientId', current_user)
     
-    # Check for existing record on this date
-    existing = Progress.objects(
-        patientId=patient_id,
-        date__gte=target_date,
-        date__lt=target_date + timedelta(days=1)
-    ).first()
-    
-    if existing:
-        # Update existing record
-        existing.waterIntake = data.get('waterIntake')
-        existing.bowelMovement = data.get('bowelMovement')
-        existing.symptoms = data.get('symptoms', '')
-        existing.mealAdherence = data.get('mealAdherence')
-        existing.weight = data.get('weight')
-        existing.sleepHours = data.get('sleepHours')
-        existing.mood = data.get('mood')
-        existing.notes = data.get('notes', '')
-        existing.save()
-        return jsonify({"message": "Progress updated", "id": str(existing.id), "updated": True}), 200
-    else:
-        # Create new record
-        progress = Progress(
-            patientId=patient_id,
-            date=target_date,
-            waterIntake=data.get('waterIntake'),
-            bowelMovement=data.get('bowelMovement'),
-            symptoms=data.get('symptoms', ''),
-            mealAdherence=data.get('mealAdherence'),
-            weight=data.get('weight'),
-            sleepHours=data.get('sleepHours'),
-            mood=data.get('mood'),
-            notes=data.get('notes', '')
-        )
-        progress.save()
-        return jsonify({"message": "Progress logged", "id": str(progress.id), "updated": False}), 201
+    # Single atomic upsert keyed on (patientId, day)
+    record_id, updated = upsert_daily_progress(patient_id, target_date, fields)
+    
+    if updated:
+        return jsonify({"message": "Progress updated", "id": str(record_id), "updated": True}), 200
+    return jsonify({"message": "Progress logged", "id": str(record_id), "updated": False}), 201
 
 @api_bp.route('/progress/<patient_id>', methods=['GET'])
 @jwt_required()
+@patient_access_required
 def get_progress(patient_id):
     from models import Progress
-    progress_records = Progress.objects(patientId=patient_id).order_by('-date')
+    if 'maxPoints' in request.args:
+        return get_progress_series(patient_id)
     
-    return jsonify([{
-        "id": str(p.id),
-        "date": p.date.isoformat(),
-        "waterIntake": p.waterIntake,
-        "bowelMovement": p.bowelMovement,
-        "symptoms": p.symptoms,
-        "mealAdherence": p.mealAdherence,
-        "weight": p.weight,
-        "sleepHours": p.sleepHours,
-        "mood": p.mood,
-        "notes": p.notes
-    } for p in progress_records])
+    try:
+        page = get_page_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    progress_records = PROGRESS_FIELDS.query(Progress.objects(patientId=patient_id))
+    next_cursor = None
+    if page is None:
+        progress_records = progress_records.order_by('-date')
+    else:
+        progress_records, next_cursor = paginate(progress_records, ['-date'], page)
+    
+    results = PROGRESS_FIELDS.serialize_many(progress_records)
+    
+    if page is None:
+        return jsonify(results)
+    return jsonify(page_envelope(results, next_cursor, page))
+
+def get_progress_series(patient_id):
+    """
+    Per-metric chart series downsampled to at most maxPoints points (LTTB),
+    with a min/max envelope per point so spikes are not lost
+
+    Long histories are first reduced in Mongo to SERIES_PREAGGREGATE x
+    maxPoints date buckets, so the work here is bounded by maxPoints
+    rather than by the length of the history.
+    """
+    import numpy as np
+    from datetime import datetime, timezone
+    from models import Progress
+    from downsample import downsample_series
+    from progress_utils import TREND_METRICS, SERIES_PREAGGREGATE, progress_series_buckets
+    
+    max_points = request.args.get('maxPoints', type=int)
+    if not max_points or max_points < 3:
+        return jsonify({"error": "maxPoints must be an integer >= 3"}), 400
+    max_points = min(max_points, 5000)
+    
+    buckets = max_points * SERIES_PREAGGREGATE
+    aggregated = Progress.objects(patientId=patient_id).count() > buckets
+    if aggregated:
+        rows = progress_series_buckets(patient_id, buckets)
+        timestamps = np.array([r['t'] for r in rows], dtype=float)
+    else:
+        rows = list(Progress.objects(patientId=patient_id)
+                    .only('date', *TREND_METRICS).as_pymongo().order_by('date'))
+        timestamps = np.array([r['date'].replace(tzinfo=timezone.utc).timestamp() for r in rows], dtype=float)
+    
+    # Column-wise arrays of the numeric fields (NaN where not logged)
+    series = {}
+    for name in TREND_METRICS:
+        values = np.array([r.get(name) for r in rows], dtype=float)
+        mask = ~np.isnan(values)
+        if aggregated:
+            lows = np.array([r[f'{name}Min'] for r in rows], dtype=float)[mask]
+            highs = np.array([r[f'{name}Max'] for r in rows], dtype=float)[mask]
+            total = sum(r[f'{name}Count'] for r in rows)
+        else:
+            lows = highs = None
+            total = int(mask.sum())
+        sampled = downsample_series(timestamps[mask], values[mask], max_points, lows, highs)
+        series[name] = {
+            "dates": [datetime.fromtimestamp(t, timezone.utc).isoformat() for t in sampled['x']],
+            "values": sampled['y'],
+            "min": sampled['min'],
+            "max": sampled['max'],
+            "total": total
+        }
+    
+    return jsonify({
+        "patientId": patient_id,
+        "maxPoints": max_points,
+        "series": series
+    })
+
+@api_bp.route('/progress/<patient_id>/trends', methods=['GET'])
+@jwt_required()
+@patient_access_required
+def get_progress_trends(patient_id):
+    """
+    Averaged progress metrics computed in the database
+
+    Query params:
+        interval: 'day', 'week' (default) or 'month'
+        from, to: YYYY-MM-DD window (default: last 90 days)
+    """
+    from datetime import date, timedelta
+    from progress_utils import progress_trends, TREND_INTERVALS, IST
+    
+    interval = request.args.get('interval', 'week')
+    if interval not in TREND_INTERVALS:
+        return jsonify({"error": f"interval must be one of {', '.join(TREND_INTERVALS)}"}), 400
+    
+    try:
+        today = get_ist_now().astimezone(IST).date()
+        end = date.fromisoformat(request.args['to']) if 'to' in request.args else today
+        start = date.fromisoformat(request.args['from']) if 'from' in request.args else end - timedelta(days=89)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    
+    if start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+    
+    points = progress_trends(patient_id, start.isoformat(), end.isoformat(), interval)
+    return jsonify({
+        "patientId": patient_id,
+        "interval": interval,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": points
+    })
 
 @api_bp.route('/progress/<progress_id>', methods=['DELETE'])
 @jwt_required()
@@ -509,7 +694,10 @@ def delete_progress(progress_id):
     if not progress:
         return jsonify({"error": "Progress entry not found"}), 404
     
+    from progress_utils import remove_bucket_day, stored_day_key
+    day = progress.day or stored_day_key(progress.date)
     progress.delete()
+    remove_bucket_day(progress.patientId, day)
     return jsonify({"message": "Progress entry deleted successfully"}), 200
 
 
@@ -518,19 +706,19 @@ def delete_progress(progress_id):
 @jwt_required()
 def get_patient_profile():
     current_user_id = get_jwt_identity()
-    patient = Patient.objects(patientId=current_user_id).first()
+    patient = identity_cache.get_patient(current_user_id)
     
     if not patient:
         return jsonify({"error": "Patient profile not found"}), 404
     
     # Fetch email and name from User collection to ensure sync
-    from models import User
-    user = User.objects(uid=current_user_id).first()
+    user = identity_cache.get_user(current_user_id)
     email = user.email if user else ""
     name = user.name if user else patient.name
         
     # Merge email/name into personalInfo for frontend convenience
-    personal_info = patient.personalInfo or {}
+    # (copy: cached documents are shared between requests)
+    personal_info = dict(patient.personalInfo or {})
     personal_info['email'] = email
     personal_info['name'] = name
     
@@ -554,6 +742,7 @@ def update_patient_profile():
     data = request.json
     
     patient = Patient.objects(patientId=current_user_id).first()
+    user = None
     
     if not patient:
         return jsonify({"error": "Patient profile not found"}), 404
@@ -567,14 +756,16 @@ def update_patient_profile():
         patient.personalInfo = data['personalInfo']
         
         # Sync Name with User collection if changed
-        if 'name' in data['personalInfo']:
+        if 'name' in data['personalInfo'] and data['personalInfo']['name'] != patient.name:
             new_name = data['personalInfo']['name']
             patient.name = new_name
+            propagate_name_change(current_user_id, 'patient', new_name)
             
             from models import User
             user = User.objects(uid=current_user_id).first()
             if user:
                 user.name = new_name
+                user.profileVersion = (user.profileVersion or 0) + 1
                 user.save()
                 
     # Update Medical Info
@@ -582,8 +773,13 @@ def update_patient_profile():
         patient.medicalInfo = data['medicalInfo']
         
     patient.save()
+    identity_cache.invalidate(current_user_id)
     
-    return jsonify({"message": "Profile updated successfully"}), 200
+    response = {"message": "Profile updated successfully"}
+    if user:
+        # Name is a token claim: hand back a token with the new profile version
+        response["access_token"] = issue_access_token(user)
+    return jsonify(response), 200
 
 
 # Practitioner Profile Endpoints
@@ -591,19 +787,19 @@ def update_patient_profile():
 @jwt_required()
 def get_practitioner_profile():
     current_user_id = get_jwt_identity()
-    doctor = Doctor.objects(doctorId=current_user_id).first()
+    doctor = identity_cache.get_doctor(current_user_id)
     
     if not doctor:
         return jsonify({"error": "Doctor profile not found"}), 404
     
     # Fetch email and name from User collection to ensure sync
-    from models import User
-    user = User.objects(uid=current_user_id).first()
+    user = identity_cache.get_user(current_user_id)
     email = user.email if user else ""
     name = user.name if user else doctor.name
         
     # Merge email/name into personalInfo for frontend convenience
-    personal_info = doctor.personalInfo or {}
+    # (copy: cached documents are shared between requests)
+    personal_info = dict(doctor.personalInfo or {})
     personal_info['email'] = email
     personal_info['name'] = name
         
@@ -626,6 +822,7 @@ def update_practitioner_profile():
     data = request.json
     
     doctor = Doctor.objects(doctorId=current_user_id).first()
+    user = None
     
     if not doctor:
         return jsonify({"error": "Doctor profile not found"}), 404
@@ -641,14 +838,16 @@ def update_practitioner_profile():
         doctor.personalInfo = data['personalInfo']
         
         # Sync Name with User collection if changed
-        if 'name' in data['personalInfo']:
+        if 'name' in data['personalInfo'] and data['personalInfo']['name'] != doctor.name:
             new_name = data['personalInfo']['name']
             doctor.name = new_name
+            propagate_name_change(current_user_id, 'doctor', new_name)
             
             from models import User
             user = User.objects(uid=current_user_id).first()
             if user:
                 user.name = new_name
+                user.profileVersion = (user.profileVersion or 0) + 1
                 user.save()
             
     if 'professionalInfo' in data:
@@ -669,5 +868,11 @@ def update_practitioner_profile():
         doctor.account = data['account']
         
     doctor.save()
-    
-    return jsonify({"message": "Profile updated successfully"}), 200
+    identity_cache.invalidate(current_user_id)
+    availability_cache.invalidate(current_user_id)
+    
+    response = {"message": "Profile updated successfully"}
+    if user:
+        # Name is a token claim: hand back a token with the new profile version
+        response["access_token"] = issue_access_token(user)
+    return jsonify(response), 200
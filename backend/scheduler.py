@@ -0,0 +1,162 @@
+"""
+In-process periodic scheduler with leader election
+
+Every worker process starts a daemon thread, but only the holder of the
+'scheduler' lease in the SchedulerLock collection runs jobs. The lease is
+taken and renewed with a single find_one_and_update; if the leader dies, the
+lease expires and another process takes over. Last-run times are stored on
+the lock document so a new leader keeps the same cadence.
+
+While a job runs, a heartbeat thread renews the lease every tick, and
+leadership is re-confirmed before each job starts, so a job that outlasts
+LEASE is never started a second time by another process.
+
+Disable with SCHEDULER_ENABLED=false (e.g. for one-off scripts).
+"""
+from datetime import timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models import SchedulerLock, get_ist_now
+import os
+import socket
+import threading
+import traceback
+import uuid
+
+LOCK_NAME = 'scheduler'
+TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "15"))
+LEASE = timedelta(seconds=TICK_SECONDS * 4)
+
+
+class Scheduler:
+    """Runs registered jobs at fixed intervals on the elected leader only"""
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs = {}  # name -> (interval timedelta, fn)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_job(self, name, interval_seconds, fn):
+        """Register fn to run every interval_seconds"""
+        self.jobs[name] = (timedelta(seconds=interval_seconds), fn)
+
+    def _acquire(self, now):
+        """
+        Take or renew the leader lease
+
+        Returns:
+            dict or None: The lock document when this process is leader
+        """
+        try:
+            return SchedulerLock._get_collection().find_one_and_update(
+                {
+                    'name': LOCK_NAME,
+                    '$or': [
+                        {'owner': self.owner},
+                        {'lockedUntil': None},
+                        {'lockedUntil': {'$lt': now}}
+                    ]
+                },
+                {'$set': {'owner': self.owner, 'lockedUntil': now + LEASE}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another process holds a live lease (the upsert collided with its document)
+            return None
+
+    def _renew(self, now):
+        """
+        Extend the lease only if this process still holds it unexpired
+
+        Returns:
+            bool: False when leadership was lost
+        """
+        renewed = SchedulerLock._get_collection().update_one(
+            {'name': LOCK_NAME, 'owner': self.owner, 'lockedUntil': {'$gt': now}},
+            {'$set': {'lockedUntil': now + LEASE}}
+        )
+        return bool(renewed.matched_count)
+
+    def _heartbeat(self, name, done):
+        """Keep renewing the lease while a job runs, so no other process takes over"""
+        while not done.wait(TICK_SECONDS):
+            try:
+                if not self._renew(get_ist_now()):
+                    print(f" Scheduler lease lost while {name} was running")
+                    return
+            except Exception as e:
+                print(f" Scheduler heartbeat failed: {e}")
+
+    def _run_job(self, name, fn):
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(name, done), name=f'scheduler-heartbeat-{name}', daemon=True
+        )
+        heartbeat.start()
+        try:
+            fn()
+        except Exception as e:
+            print(f" Scheduled job {name} failed: {e}")
+            traceback.print_exc()
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def tick(self):
+        """Run every due job if this process is the leader"""
+        lock = self._acquire(get_ist_now())
+        if lock is None:
+            return
+
+        last_run = lock.get('lastRun', {})
+        for name, (interval, fn) in self.jobs.items():
+            now = get_ist_now()
+            previous = last_run.get(name)
+            if previous is not None and _as_aware(previous) + interval > now:
+                continue
+            # Re-confirm leadership right before starting: an earlier job may have outlived the lease
+            if not self._renew(now):
+                return
+            self._run_job(name, fn)
+            # Record the run and renew the lease in one write; stop if leadership was lost meanwhile
+            finished = get_ist_now()
+            renewed = SchedulerLock._get_collection().update_one(
+                {'name': LOCK_NAME, 'owner': self.owner},
+                {'$set': {f'lastRun.{name}': finished, 'lockedUntil': finished + LEASE}}
+            )
+            if not renewed.matched_count:
+                return
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f" Scheduler tick failed: {e}")
+            self._stop.wait(TICK_SECONDS)
+
+    def start(self):
+        """Start the scheduler thread (no-op if disabled or already running)"""
+        if not scheduler_enabled():
+            return
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def scheduler_enabled():
+    """False when SCHEDULER_ENABLED=false: no periodic jobs run in this process"""
+    return os.getenv("SCHEDULER_ENABLED", "true").lower() != "false"
+
+
+def _as_aware(dt):
+    """Datetimes read back from Mongo are naive UTC"""
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+scheduler = Scheduler()
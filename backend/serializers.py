@@ -0,0 +1,80 @@
+"""
+Raw-document serialization for read-heavy endpoints
+
+Each FieldMap is defined once per response shape. Queries go through
+.only(...).as_pymongo() so rows come back as plain dicts, and serialize()
+converts datetimes and ObjectIds in a single pass without constructing
+MongoEngine documents.
+"""
+from mongoengine.fields import DateTimeField, ObjectIdField
+from models import Appointment, Progress
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _str(value):
+    return str(value) if value is not None else None
+
+
+class FieldMap:
+    """Response field map for one document type"""
+    def __init__(self, document, fields):
+        """
+        Args:
+            document: MongoEngine Document class
+            fields: Field names, output key = field name (id -> "id")
+        """
+        self.document = document
+        self.field_names = list(fields)
+        self._plan = []
+        for name in self.field_names:
+            field = document._fields[name]
+            if isinstance(field, DateTimeField):
+                convert = _iso
+            elif isinstance(field, ObjectIdField):
+                convert = _str
+            else:
+                convert = None
+            self._plan.append((name, field.db_field, convert))
+
+    def query(self, queryset):
+        """Project the queryset to this map's fields and return raw dicts"""
+        return queryset.only(*self.field_names).as_pymongo()
+
+    def serialize(self, row):
+        """Convert one raw row to the response dict"""
+        out = {}
+        get = row.get
+        for key, db_field, convert in self._plan:
+            value = get(db_field)
+            out[key] = convert(value) if convert is not None and value is not None else value
+        return out
+
+    def serialize_many(self, rows):
+        return [self.serialize(row) for row in rows]
+
+
+# ==================== FIELD MAPS ====================
+
+APPOINTMENT_FIELDS = FieldMap(Appointment, [
+    'id', 'doctorId', 'patientId', 'doctorName', 'patientName',
+    'startTimestamp', 'endTimestamp', 'status', 'notes', 'cancelReason',
+    'rescheduleReason', 'isRescheduledBy', 'proposedStartTimestamp',
+    'proposedEndTimestamp', 'createdAt', 'updatedAt'
+])
+
+ADMIN_APPOINTMENT_FIELDS = FieldMap(Appointment, [
+    'id', 'doctorId', 'doctorName', 'patientId', 'patientName',
+    'startTimestamp', 'endTimestamp', 'status', 'notes', 'createdAt'
+])
+
+UPCOMING_APPOINTMENT_FIELDS = FieldMap(Appointment, [
+    'id', 'startTimestamp', 'endTimestamp', 'status'
+])
+
+PROGRESS_FIELDS = FieldMap(Progress, [
+    'id', 'date', 'waterIntake', 'bowelMovement', 'symptoms', 'mealAdherence',
+    'weight', 'sleepHours', 'mood', 'notes'
+])
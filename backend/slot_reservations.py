@@ -0,0 +1,208 @@
+"""
+Race-free booking through slot reservations
+
+Every appointment holds one SlotReservation per UNIT_MINUTES slice of the
+doctor's time it covers. The unique (doctorId, slotStart) index makes Mongo
+the arbiter: two overlapping bookings always share at least one slice, so at
+most one of them can insert it, no matter how many requests race.
+
+Reservations are written before the appointment, using a pre-generated
+appointment _id, and rolled back if the appointment insert fails. Pending
+reschedules hold their proposed time as 'proposal' reservations, so the
+proposed slot cannot be taken while the other party decides. A TTL index
+drops reservations a day after they end; release_stale_reservations() (run
+by the scheduler) removes any left behind by a crash between the two writes.
+"""
+from datetime import timedelta, timezone
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from models import SlotReservation, Appointment, get_ist_now
+from availability import UNIT_MINUTES, SLOT_MINUTES, MAX_DURATION_MINUTES
+
+RETENTION = timedelta(days=1)
+STALE_AFTER = timedelta(minutes=10)
+DUPLICATE_KEY = 11000
+
+
+class SlotConflict(Exception):
+    """The requested interval overlaps time already held by another appointment"""
+
+
+def parse_duration(value):
+    """
+    Validate an appointment length in minutes
+
+    Returns:
+        int: SLOT_MINUTES when value is empty
+
+    Raises:
+        ValueError: If not a multiple of UNIT_MINUTES between UNIT_MINUTES and MAX_DURATION_MINUTES
+    """
+    if value in (None, ''):
+        return SLOT_MINUTES
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("durationMinutes must be an integer")
+    if minutes < UNIT_MINUTES or minutes > MAX_DURATION_MINUTES or minutes % UNIT_MINUTES:
+        raise ValueError(
+            f"durationMinutes must be a multiple of {UNIT_MINUTES} between {UNIT_MINUTES} and {MAX_DURATION_MINUTES}"
+        )
+    return minutes
+
+
+def _as_utc(dt):
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)  # Mongo returns naive UTC
+    return dt.astimezone(timezone.utc)
+
+
+def slot_starts(start, end):
+    """
+    Slice starts covering [start, end), aligned to UNIT_MINUTES (UTC, naive as stored)
+
+    Returns:
+        list: datetimes
+    """
+    start, end = _as_utc(start), _as_utc(end)
+    unit = timedelta(minutes=UNIT_MINUTES)
+    current = start.replace(second=0, microsecond=0) - timedelta(minutes=start.minute % UNIT_MINUTES)
+    starts = []
+    while current < end:
+        starts.append(current.replace(tzinfo=None))
+        current += unit
+    return starts
+
+
+def reserve(doctor_id, patient_id, appointment_id, start, end, kind='booking'):
+    """
+    Atomically hold [start, end) for an appointment
+
+    Slices already held by the same appointment (a reschedule overlapping its
+    current time) are accepted; any slice held by another appointment makes the
+    whole reservation fail and every slice inserted here is rolled back.
+
+    Raises:
+        SlotConflict: If another appointment holds part of the interval
+    """
+    collection = SlotReservation._get_collection()
+    now = get_ist_now()
+    expires = _as_utc(end) + RETENTION
+    pending = slot_starts(start, end)
+    inserted = []
+
+    for _ in range(3):
+        docs = [{
+            '_id': ObjectId(),
+            'doctorId': doctor_id,
+            'slotStart': slot,
+            'appointmentId': appointment_id,
+            'patientId': patient_id,
+            'kind': kind,
+            'expiresAt': expires,
+            'createdAt': now
+        } for slot in pending]
+        if not docs:
+            return
+
+        try:
+            collection.insert_many(docs, ordered=False)
+            return
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            failed = {err['index'] for err in errors}
+            inserted.extend(doc['_id'] for i, doc in enumerate(docs) if i not in failed)
+            if any(err.get('code') != DUPLICATE_KEY for err in errors):
+                release_ids(inserted)
+                raise
+
+            taken = [docs[i]['slotStart'] for i in failed]
+            holders = collection.find(
+                {'doctorId': doctor_id, 'slotStart': {'$in': taken}},
+                {'slotStart': 1, 'appointmentId': 1}
+            )
+            held_by_self = set()
+            for holder in holders:
+                if holder['appointmentId'] != appointment_id:
+                    release_ids(inserted)
+                    raise SlotConflict(f"Slot at {holder['slotStart'].isoformat()}Z is already booked")
+                held_by_self.add(holder['slotStart'])
+            # Slices released between the failed insert and the lookup are retried
+            pending = [slot for slot in taken if slot not in held_by_self]
+
+    release_ids(inserted)
+    raise SlotConflict("Could not reserve the slot, please retry")
+
+
+def release_ids(reservation_ids):
+    if reservation_ids:
+        SlotReservation._get_collection().delete_many({'_id': {'$in': list(reservation_ids)}})
+
+
+def release(appointment_id, kind=None):
+    """Free every slice held by an appointment (optionally only one kind)"""
+    query = {'appointmentId': appointment_id}
+    if kind:
+        query['kind'] = kind
+    return SlotReservation._get_collection().delete_many(query).deleted_count
+
+
+def reserve_proposal(doctor_id, patient_id, appointment_id, start, end):
+    """
+    Hold [start, end) as the appointment's reschedule proposal, replacing any
+    earlier proposal: its slices outside the new interval are released once
+    the new ones are held, so a superseded proposal never blocks the doctor.
+
+    Raises:
+        SlotConflict: If another appointment holds part of the interval
+            (the earlier proposal is then left as it was)
+    """
+    reserve(doctor_id, patient_id, appointment_id, start, end, kind='proposal')
+    SlotReservation._get_collection().delete_many({
+        'appointmentId': appointment_id,
+        'kind': 'proposal',
+        'slotStart': {'$nin': slot_starts(start, end)}
+    })
+
+
+def apply_proposal(appointment_id, start, end):
+    """
+    Make an accepted reschedule the appointment's booking
+
+    Slices outside the new interval are dropped first, then the remaining
+    (proposal and overlapping booking) slices become the booking; the new time
+    is never unheld in between.
+    """
+    collection = SlotReservation._get_collection()
+    keep = slot_starts(start, end)
+    collection.delete_many({'appointmentId': appointment_id, 'slotStart': {'$nin': keep}})
+    collection.update_many(
+        {'appointmentId': appointment_id},
+        {'$set': {'kind': 'booking', 'expiresAt': _as_utc(end) + RETENTION}}
+    )
+
+
+def release_stale_reservations():
+    """
+    Remove reservations whose appointment was never written (crash between the two inserts)
+
+    Returns:
+        int: Reservations removed
+    """
+    cutoff = get_ist_now() - STALE_AFTER
+    rows = SlotReservation._get_collection().aggregate([
+        {'$match': {'createdAt': {'$lt': cutoff}}},
+        {'$group': {'_id': '$appointmentId'}},
+        {'$lookup': {
+            'from': Appointment._get_collection_name(),
+            'localField': '_id',
+            'foreignField': '_id',
+            'as': 'appointment'
+        }},
+        {'$match': {'appointment': {'$size': 0}}},
+        {'$project': {'_id': 1}}
+    ], allowDiskUse=True)
+    orphaned = [row['_id'] for row in rows]
+    if not orphaned:
+        return 0
+    return SlotReservation._get_collection().delete_many({'appointmentId': {'$in': orphaned}}).deleted_count
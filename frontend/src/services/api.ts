@@ -16,4 +16,13 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+// Profile changes re-issue the token (claims carry name/role); keep the stored one current
+api.interceptors.response.use((response) => {
+    const refreshed = response.data?.access_token;
+    if (refreshed && Cookies.get('token')) {
+        Cookies.set('token', refreshed, { expires: 7 });
+    }
+    return response;
+});
+
 export default api;